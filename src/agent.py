@@ -1,7 +1,8 @@
 from __future__ import annotations
-import os, json, re
+import json, re
 from typing import Any, Dict
-import google.generativeai as genai
+from src import models
+from src.llm_client import generate as llm_generate
 
 def _first(x, default=None):
     if isinstance(x, list) and x:
@@ -17,24 +18,20 @@ def _to_bool(x, default=True):
         if s in ("false","0","no","n"): return False
     return default
 
-def _model():
-    api_key = os.getenv("GOOGLE_API_KEY")
-    if not api_key:
-        raise RuntimeError("GOOGLE_API_KEY not set")
-    genai.configure(api_key=api_key)
-    name = os.getenv("GEMINI_MODEL", "gemini-1.5-flash")
-    return genai.GenerativeModel(name, generation_config={"temperature": 0.2})
-
 PLAN_SCHEMA = {
     "preprocess": {
         "impute_numeric": ["median", "mean"],
         "impute_categorical": ["most_frequent"],
         "scale_numeric": [True, False],
-        "one_hot_encode": [True, False]
+        "one_hot_encode": [True, False],
+        "onehot_max_cardinality": "integer (10-200): wider categoricals use high_cardinality_encoding",
+        "onehot_min_frequency": "integer >= 1 or null: rarer levels share one 'infrequent' column",
+        "high_cardinality_encoding": ["target", "ordinal", "hashing", "drop"],
+        "drop_id_columns": [True, False]
     },
     "modeling": {
-        "strategy": ["autosklearn", "baseline"],
-        "candidates": ["LogisticRegression","RandomForestClassifier","Ridge","RandomForestRegressor"]
+        "strategy": ["autosklearn", "baseline", "streaming"],
+        "candidates": models.all_candidate_names()
     },
     "evaluation": {
         "primary_metric": ["f1_macro","accuracy","rmse"],
@@ -54,17 +51,20 @@ def plan(overview: Dict[str,Any], problem: str) -> Dict[str,Any]:
     """
     Ask Gemini to produce a JSON plan constrained to PLAN_SCHEMA.
     """
-    mdl = _model()
     sys = (
         "You are an ML planner. Output ONLY valid JSON matching the schema. "
         "Choose practical defaults when uncertain. Respect task type."
     )
+    n_unique = overview.get("n_unique", {})
     ctx = {
         "problem": problem,
         "n_rows": overview.get("n_rows"),
         "n_cols": overview.get("n_cols"),
-        "missing_top": dict(sorted(overview.get("missing_perc",{}).items(), key=lambda kv: kv[1], reverse=True)[:5]),
+        "missing_top": dict(sorted(overview.get("missing_percentage",{}).items(), key=lambda kv: kv[1], reverse=True)[:5]),
         "dtypes": overview.get("dtypes", {}),
+        "n_numeric": len(overview.get("numeric_cols", [])),
+        "n_categorical": len(overview.get("categorical_cols", [])),
+        "categorical_cardinality": {c: n_unique.get(c) for c in overview.get("categorical_cols", [])[:20]},
         "target_counts": overview.get("target_value_counts", {})
     }
     schema_hint = json.dumps(PLAN_SCHEMA, indent=2)
@@ -77,11 +77,16 @@ def plan(overview: Dict[str,Any], problem: str) -> Dict[str,Any]:
         "- If regression: primary_metric=rmse.\n"
         "- time_budget_sec: 120-300 for demos.\n"
         "- If many categoricals: one_hot_encode=true. If many numerics: scale_numeric=true.\n"
+        "- Categoricals wider than onehot_max_cardinality: high_cardinality_encoding=target for most data, "
+        "hashing for very many wide columns, ordinal if only tree models are used, drop for free text.\n"
         "- If Windows (likely no autosklearn): set strategy='baseline' and choose 2 candidates.\n"
+        "- Baseline candidates: above ~100k rows prefer HistGradientBoosting* (and SGD*/LogisticRegression "
+        "for wide sparse data) over RandomForest*/ExtraTrees*, which are slow on many rows.\n"
+        "- strategy='streaming' trains out-of-core with partial_fit for tables too large for memory; its "
+        "candidates are SGDClassifier/GaussianNB (classification) or SGDRegressor/MLPRegressor (regression).\n"
         "Return ONLY JSON. No commentary."
     )
-    resp = mdl.generate_content(prompt)
-    js = _extract_json(getattr(resp, "text", "") or "")
+    js = _extract_json(llm_generate(prompt, kind="plan"))
     # Light validation + defaults
     pp = js.get("preprocess", {})
     md = js.get("modeling", {})
@@ -92,18 +97,27 @@ def plan(overview: Dict[str,Any], problem: str) -> Dict[str,Any]:
     pp["impute_categorical"] = _first(pp.get("impute_categorical"), "most_frequent")
     pp["scale_numeric"] = _to_bool(pp.get("scale_numeric"), True)
     pp["one_hot_encode"] = _to_bool(pp.get("one_hot_encode"), True)
+    pp["high_cardinality_encoding"] = _first(pp.get("high_cardinality_encoding"), "target")
+    if pp["high_cardinality_encoding"] not in PLAN_SCHEMA["preprocess"]["high_cardinality_encoding"]:
+        pp["high_cardinality_encoding"] = "target"
+    try:
+        pp["onehot_max_cardinality"] = min(200, max(10, int(_first(pp.get("onehot_max_cardinality"), 50))))
+    except Exception:
+        pp["onehot_max_cardinality"] = 50
+    try:
+        mf = _first(pp.get("onehot_min_frequency"))
+        pp["onehot_min_frequency"] = max(1, int(mf)) if mf is not None else None
+    except Exception:
+        pp["onehot_min_frequency"] = None
+    pp["drop_id_columns"] = _to_bool(pp.get("drop_id_columns"), True)
 
 
     md.setdefault("strategy", "autosklearn")
     
-    if problem == "classification":
-        allowed = {"LogisticRegression","RandomForestClassifier"}
-        default_cands = ["LogisticRegression","RandomForestClassifier"]
-        ev.setdefault("primary_metric", "f1_macro")
-    else:
-        allowed = {"Ridge","RandomForestRegressor"}
-        default_cands = ["Ridge","RandomForestRegressor"]
-        ev.setdefault("primary_metric", "rmse")
+    ev.setdefault("primary_metric", "f1_macro" if problem == "classification" else "rmse")
+    # streaming only allows partial_fit learners; defaults follow the data size
+    allowed = set(models.candidate_names(problem, md["strategy"]))
+    default_cands = models.default_candidates(problem, int(overview.get("n_rows") or 0), md["strategy"])
 
     cands = md.get("candidates") or default_cands
     cands = [c for c in (cands if isinstance(cands, list) else [cands]) if c in allowed] or default_cands
@@ -126,12 +140,10 @@ def repair(last_action: str, error_message: str, problem: str) -> Dict[str,Any]:
     Ask Gemini for a minimal fix to the plan section that failed.
     Returns a tiny JSON patch e.g. {"preprocess":{...}} or {"modeling":{...}}.
     """
-    mdl = _model()
     prompt = (
         "You are debugging a failing ML pipeline plan. Output ONLY JSON patch (subset keys).\n"
         f"FAILED_ACTION: {last_action}\nERROR:\n```{error_message}```\n"
         "Fix by adjusting parameters or choosing alternative model(s). If Windows, prefer baseline over autosklearn.\n"
         "Return ONLY JSON patch like {\"preprocess\":{...}} or {\"modeling\":{...}}."
     )
-    resp = mdl.generate_content(prompt)
-    return _extract_json(getattr(resp, "text", "") or "")
+    return _extract_json(llm_generate(prompt, kind="repair"))
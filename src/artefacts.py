@@ -0,0 +1,153 @@
+from __future__ import annotations
+import os, copy, json, time
+import numpy as np
+from typing import Any, Dict, Optional, Tuple
+
+from src.io_utils import write_json
+
+FOREST_TYPES = ("RandomForestClassifier", "RandomForestRegressor", "ExtraTreesClassifier", "ExtraTreesRegressor")
+
+def manifest_path(model_path: str) -> str:
+    return os.path.splitext(model_path)[0] + ".manifest.json"
+
+def _compress_spec(value) -> Any:
+    # "0" -> uncompressed (memory-mappable); "3" -> zlib level 3; "lz4" / "lz4:3" / "xz:6" -> (method, level)
+    value = str(value or "0").strip()
+    if value.isdigit():
+        return int(value)
+    method, _, level = value.partition(":")
+    return (method, int(level or 3))
+
+def _mapped_mb(obj, seen: Optional[set] = None) -> float:
+    # bytes of the loaded model's arrays that are views of the file instead of private copies
+    seen = set() if seen is None else seen
+    if id(obj) in seen:
+        return 0.0
+    seen.add(id(obj))
+    if isinstance(obj, np.ndarray):
+        return obj.nbytes / 2**20 if isinstance(obj, np.memmap) or isinstance(obj.base, np.memmap) else 0.0
+    if isinstance(obj, dict):
+        return sum(_mapped_mb(v, seen) for v in obj.values())
+    if isinstance(obj, (list, tuple)):
+        return sum(_mapped_mb(v, seen) for v in obj)
+    return _mapped_mb(vars(obj), seen) if hasattr(obj, "__dict__") else 0.0
+
+def load_model(path: str, mmap: bool = True):
+    """
+    Load a saved Pipeline. Uncompressed artefacts are opened with mmap_mode="r", so their large arrays
+    (HistGradientBoosting predictor nodes, coefficients, encoder categories) stay in the page cache and are
+    shared by every process that loads the same file. Forest trees are always copied by sklearn on load.
+    """
+    import joblib
+    mp = manifest_path(path)
+    compressed = False
+    if os.path.exists(mp):
+        with open(mp, encoding="utf-8") as f:
+            compressed = bool(json.load(f).get("compress"))
+    return joblib.load(path, mmap_mode="r" if mmap and not compressed else None)
+
+def save_model(model, path: str, *, compress: Any = 0, extra: Optional[Dict[str, Any]] = None,
+               verify: bool = False) -> Dict[str, Any]:
+    """
+    Dump model to path (atomically) and write <path stem>.manifest.json next to it with the format,
+    size, write and load time, the memory-mapped share and the library versions. Uncompressed files are
+    always reloaded memory-mapped to time the load; compressed ones only with verify, since that is a
+    full decompression. Forest trees are copied on load, so a forest's mapped_mb stays near 0 (noted in
+    the manifest). Returns the manifest.
+    """
+    import joblib
+    from src.memo import environment
+    spec = _compress_spec(compress)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    t0 = time.perf_counter()
+    joblib.dump(model, tmp, compress=spec)
+    os.replace(tmp, path)
+    write_sec = time.perf_counter() - t0
+    manifest = {"path": path, "format": "compressed" if spec else "mmap", "compress": spec,
+                "size_mb": round(os.path.getsize(path) / 2**20, 3), "write_sec": round(write_sec, 4),
+                "environment": environment(), "created": time.strftime("%Y-%m-%dT%H:%M:%S"), **(extra or {})}
+    est = model.steps[-1][1] if hasattr(model, "steps") else model
+    if type(est).__name__ in FOREST_TYPES:
+        manifest["note"] = "forest trees are copied on load, not memory-mapped: workers do not share them"
+    write_json(manifest, manifest_path(path))
+    if verify or not spec:
+        t0 = time.perf_counter()
+        loaded = load_model(path)  # also checks the file round-trips
+        manifest["load_sec"] = round(time.perf_counter() - t0, 4)
+        manifest["mapped_mb"] = round(_mapped_mb(loaded), 3)
+        write_json(manifest, manifest_path(path))
+    return manifest
+
+def _score(problem: str, model, X, y, primary_metric: str) -> float:
+    from src.automl_or_baseline import _metric
+    return _metric(problem, y, model.predict(X))[primary_metric]
+
+def _worse_by(before: float, after: float, primary_metric: str) -> float:
+    # relative degradation (positive = worse) of after vs before
+    from src.cv_eval import LOWER_IS_BETTER
+    sign = 1.0 if primary_metric in LOWER_IS_BETTER else -1.0
+    return sign * (after - before) / max(abs(before), 1e-12)
+
+def _with_trees(est, k: int):
+    # the same fitted forest restricted to its first k trees (no refit)
+    out = copy.copy(est)
+    out.estimators_, out.n_estimators = est.estimators_[:k], k
+    return out
+
+def reduce_model(model, problem: str, X_train, y_train, *,
+                 primary_metric: str,
+                 tolerance: float = 0.01,
+                 max_depth: Optional[int] = None,
+                 val_size: float = 0.2) -> Tuple[Any, Dict[str, Any]]:
+    """
+    Optional post-training size reduction for tree models, judged on a validation slice of the training
+    rows (val_size) so the test split stays untouched: a reference copy of the Pipeline is fitted on the
+    rest; with max_depth, a depth-capped copy is compared against it; then trees are dropped from the
+    forest (halving while it keeps at least 10). A step is kept only if the primary metric on the slice is
+    at most `tolerance` (relative) worse than the reference. The kept steps are applied to the model
+    fitted on all training rows (the depth cap by a refit). Returns the model and the slice metrics per step.
+    """
+    from sklearn.base import clone
+    from sklearn.pipeline import Pipeline
+    from src.preprocess import make_splits
+    X_fit, X_val, y_fit, y_val = make_splits(X_train, y_train, test_size=val_size)
+    report: Dict[str, Any] = {"metric": primary_metric, "tolerance": tolerance, "val_rows": int(len(y_val))}
+    t0 = time.perf_counter()
+    ref = clone(model).fit(X_fit, y_fit)
+    base = _score(problem, ref, X_val, y_val, primary_metric)
+    report["before"] = base
+
+    depth_keys = [k for k in model.get_params() if k.startswith(f"{model.steps[-1][0]}__") and k.endswith("max_depth")]
+    cap = None
+    if max_depth and depth_keys:
+        capped = clone(model).set_params(**{depth_keys[-1]: int(max_depth)}).fit(X_fit, y_fit)
+        after = _score(problem, capped, X_val, y_val, primary_metric)
+        kept = _worse_by(base, after, primary_metric) <= tolerance
+        report["max_depth"] = {"cap": int(max_depth), "after": after, "delta": after - base, "kept": kept}
+        if kept:
+            ref, cap = capped, {depth_keys[-1]: int(max_depth)}
+
+    name, est = ref.steps[-1]
+    n = best = None
+    if type(est).__name__ in FOREST_TYPES:
+        Xt = ref[:-1].transform(X_val)
+        n = best = len(est.estimators_)
+        k = n // 2
+        while k >= 10:
+            after = _score(problem, _with_trees(est, k), Xt, y_val, primary_metric)
+            if _worse_by(base, after, primary_metric) > tolerance:
+                break
+            best, k = k, k // 2
+        report["trees"] = {"from": n, "to": best}
+        if best < n:
+            ref = Pipeline(ref.steps[:-1] + [(name, _with_trees(est, best))])
+    report["after"] = _score(problem, ref, X_val, y_val, primary_metric)
+    report["delta"] = report["after"] - base
+
+    if cap:
+        model = clone(model).set_params(**cap).fit(X_train, y_train)
+    if best is not None and best < n:
+        name, est = model.steps[-1]
+        model = Pipeline(model.steps[:-1] + [(name, _with_trees(est, best))])
+    report["sec"] = round(time.perf_counter() - t0, 4)
+    return model, report
@@ -1,19 +1,12 @@
 from __future__ import annotations
-import warnings, numpy as np
+import time, warnings, numpy as np
+import scipy.sparse as sp
 from typing import List, Optional
+from sklearn.base import clone
 from sklearn.metrics import accuracy_score, f1_score, mean_squared_error
 from sklearn.pipeline import Pipeline
-from sklearn.linear_model import LogisticRegression, Ridge
-from sklearn.ensemble import RandomForestClassifier, RandomForestRegressor
-
-CLF_POOL = {
-    "LogisticRegression": LogisticRegression(max_iter=300),
-    "RandomForestClassifier": RandomForestClassifier(n_estimators=300, random_state=42),
-}
-REG_POOL = {
-    "Ridge": Ridge(alpha=1.0),
-    "RandomForestRegressor": RandomForestRegressor(n_estimators=300, random_state=42),
-}
+from src import models
+from src.parallel import run_tasks, resolve_n_jobs, threads_per_worker
 
 def _metric(problem, y_true, y_pred):
     if problem=="classification":
@@ -24,12 +17,81 @@ def _metric(problem, y_true, y_pred):
     else:
         return {"rmse": float(np.sqrt(mean_squared_error(y_true, y_pred)))}
 
+def _is_better(problem, metrics, best_metrics) -> bool:
+    # Selection: for clf by f1_macro then accuracy; for reg by rmse lower is better
+    if problem=="classification":
+        cur_f1, best_f1 = metrics["f1_macro"], best_metrics["f1_macro"]
+        cur_acc, best_acc = metrics["accuracy"], best_metrics["accuracy"]
+        return (cur_f1 > best_f1) or (cur_f1 == best_f1 and cur_acc > best_acc)
+    return metrics["rmse"] < best_metrics["rmse"]
+
+def _with_threads(est, n_threads: int):
+    # give estimators with their own parallelism (forests) only their share of the cores; others are left
+    # alone (LogisticRegression ignores n_jobs for most solvers and warns when it is set)
+    from sklearn.ensemble import (RandomForestClassifier, RandomForestRegressor,
+                                  ExtraTreesClassifier, ExtraTreesRegressor)
+    forests = (RandomForestClassifier, RandomForestRegressor, ExtraTreesClassifier, ExtraTreesRegressor)
+    params = est.get_params()
+    keys = [k for k in params if k == "n_jobs" or k.endswith("__n_jobs")]
+    keys = [k for k in keys if isinstance(params[k[:-len("__n_jobs")]] if "__" in k else est, forests)]
+    return est.set_params(**{k: n_threads for k in keys}) if keys else est
+
+def _output_is_sparse(preprocessor, X, y, n_rows: int = 1000) -> bool:
+    # whether the transformer emits a sparse matrix, judged from a small fit (solver choice for large data)
+    idx = np.random.default_rng(42).choice(len(X), min(n_rows, len(X)), replace=False)
+    return sp.issparse(clone(preprocessor).fit_transform(X.iloc[idx], y.iloc[idx]))
+
+def _fit_candidate(problem, name, pipe, X_train, y_train, X_test, y_test, n_threads=None):
+    """
+    Fit one candidate (a full Pipeline, or a bare estimator on pre-transformed matrices) and score it;
+    runs in a worker process when n_jobs > 1.
+    """
+    from threadpoolctl import threadpool_limits
+    if n_threads:
+        pipe = _with_threads(pipe, n_threads)  # estimator n_jobs too (registry models ask for all cores)
+    with threadpool_limits(limits=n_threads):  # cap BLAS/OpenMP threads as well
+        t0 = time.perf_counter()
+        pipe.fit(X_train, y_train)
+        t1 = time.perf_counter()
+        y_pred = pipe.predict(X_test)
+        t2 = time.perf_counter()
+    metrics = _metric(problem, y_test, y_pred)
+    metrics["timing"] = {"fit_sec": round(t1 - t0, 4), "predict_sec": round(t2 - t1, 4),
+                         "predict_rows_per_sec": round(len(y_test) / (t2 - t1), 1) if t2 > t1 else None}
+    return name, pipe, metrics
+
 def run_automl_or_baseline(problem: str, preprocessor, X_train, y_train, X_test, y_test,
                            strategy: str = "autosklearn",
                            candidates: Optional[List[str]] = None,
-                           time_budget_sec: int = 180):
+                           time_budget_sec: int = 180,
+                           n_jobs: int | None = 1,
+                           share_preprocessing: bool = True,
+                           cv_folds: int = 0,
+                           primary_metric: Optional[str] = None,
+                           cv_prune: bool = True,
+                           enforce_budget: bool = False,
+                           selection: str = "full",
+                           hpo_trials: int = 0,
+                           trial_store=None,
+                           dataset_key: Optional[str] = None,
+                           memo=None):
     """
     If strategy=='autosklearn', try it; otherwise use baselines limited by candidates list.
+    n_jobs > 1 (or -1 for all cores) fits the baseline candidates in parallel worker processes.
+    share_preprocessing fits the transformer once and trains every candidate on the cached matrices.
+    cv_folds >= 2 selects the baseline by K-fold CV on the training split (primary_metric), then refits
+    only the winner; the CV summary is added to the returned metrics.
+    enforce_budget applies time_budget_sec to the baseline path as well: candidates are sized from a
+    subsample probe fit and fits still running at the deadline are cancelled (best finished model wins).
+    selection='subsample' ranks candidates on growing stratified subsamples with learning curves
+    instead (takes precedence over cv_folds) and refits only the winner on the full training split;
+    the estimated compute saved versus fitting every candidate on all rows is added to the metrics.
+    hpo_trials > 0 tunes each candidate by random search with successive halving (src.hpo) before
+    anything else; trials and warm-start states are reused from trial_store (an hpo.TrialStore) for
+    the same dataset_key, and only the tuned winner is refit on the full training split.
+    memo (a memo.MemoStore, with dataset_key identifying the training data) reuses fitted candidates
+    from earlier runs in the default all-candidates path with shared preprocessing: only candidates
+    whose configuration changed are fitted again.
     """
     # Try autosklearn if requested
     if strategy == "autosklearn":
@@ -54,34 +116,150 @@ def run_automl_or_baseline(problem: str, preprocessor, X_train, y_train, X_test,
         except Exception as e:
             warnings.warn(f"Auto-sklearn unavailable or failed, falling back. Reason: {e}")
 
-    # Baseline path
-    pool = CLF_POOL if problem=="classification" else REG_POOL
-    # Filter to known candidates
-    chosen = []
-    for name in (candidates or []):
-        if name in pool:
-            chosen.append((name, pool[name]))
-    if not chosen:
+    # Baseline path: fresh estimators from the registry, sized for the training data
+    n_rows = len(X_train)
+    known = models.candidate_names(problem)
+    names = [name for name in (candidates or []) if name in known]
+    if not names:
         # default fallback
-        chosen = [("RandomForestClassifier", pool.get("RandomForestClassifier"))] if problem=="classification" \
-                 else [("RandomForestRegressor", pool.get("RandomForestRegressor"))]
+        names = models.default_candidates(problem, n_rows)[:1]
+    sparse = _output_is_sparse(preprocessor, X_train, y_train) if n_rows >= models.LARGE_ROWS else None
+    chosen = [(name, models.make(name, problem, n_rows, sparse)) for name in names]
+
+    budget, probes, budget_log = None, {}, None
+    workers = resolve_n_jobs(n_jobs, len(chosen))
+    if enforce_budget:
+        from src.budget import Budget, schedule
+        budget = Budget(time_budget_sec)
+        n_fits = int(cv_folds) if cv_folds and cv_folds >= 2 else 1
+        chosen, probes, decisions = schedule(preprocessor, chosen, X_train, y_train, budget,
+                                             n_fits=n_fits, workers=workers)
+        budget_log = {"time_budget_sec": time_budget_sec, "candidates": decisions}
+        if not chosen and not probes:
+            raise RuntimeError(f"time budget of {time_budget_sec}s exhausted before any candidate could be sized")
+    deadline = budget.deadline if budget else None
+
+    def finish(model, metrics, name, timed_out=(), candidate_timing=None):
+        if candidate_timing:
+            metrics["candidate_timing"] = candidate_timing  # fit/predict seconds of every finished candidate
+        if budget_log is not None:
+            budget_log["elapsed_sec"] = round(budget.elapsed(), 3)
+            budget_log["timed_out"] = list(timed_out)
+            metrics["budget"] = budget_log
+        return model, metrics, name
+
+    def best_probe(timed_out):
+        # deadline hit before any full fit finished: the subsample probes are the best models found so far
+        scored = [(n, p, _metric(problem, y_test, p.predict(X_test))) for n, p in probes.items()]
+        if not scored:
+            raise RuntimeError(f"time budget of {time_budget_sec}s exhausted before any candidate finished")
+        best = scored[0]
+        for cur in scored[1:]:
+            if _is_better(problem, cur[2], best[2]):
+                best = cur
+        budget_log["fallback"] = "probe"
+        return finish(best[1], best[2], best[0], timed_out)
+
+    if chosen and hpo_trials and hpo_trials > 0:
+        from src import hpo
+        metric = primary_metric or ("f1_macro" if problem=="classification" else "rmse")
+        res = hpo.search(problem, preprocessor, chosen, X_train, y_train, n_trials=int(hpo_trials),
+                         primary_metric=metric, store=trial_store, dataset_key=dataset_key, n_jobs=n_jobs,
+                         deadline=deadline)
+        if res["winner"] is None:
+            return best_probe(list(dict(chosen)))
+        win = res["winner"]
+        est = clone(dict(chosen)[win]).set_params(**res["candidates"][win]["best_params"])
+        pipe = Pipeline([("pre", clone(preprocessor)), ("est", _with_threads(est, threads_per_worker(1)))])
+        resource = models.WARM_START.get(win)
+        state_key = None
+        if trial_store is not None and dataset_key is not None and resource:
+            # same data, preprocessing and params; the grown parameter itself is left out of the key
+            state_key = hpo.trial_key(dataset_key, hpo.config_key(pipe, exclude=(f"est__{resource}",)), len(X_train))
+        refit = run_tasks(hpo.fit_warm, [(trial_store, state_key, resource, problem, win, pipe,
+                                          X_train, y_train, X_test, y_test)], deadline=deadline)[0]
+        if refit is None:
+            return best_probe([win])
+        name, model, metrics = refit
+        metrics["hpo"] = res
+        return finish(model, metrics, name, (), {name: metrics["timing"]})
+
+    if len(chosen) > 1 and selection == "subsample":
+        from src.learning_curve import select_by_learning_curve
+        metric = primary_metric or ("f1_macro" if problem=="classification" else "rmse")
+        lc = select_by_learning_curve(problem, preprocessor, chosen, X_train, y_train, primary_metric=metric,
+                                      n_jobs=n_jobs, deadline=deadline)
+        if lc["winner"] is None:
+            return best_probe(list(dict(chosen)))
+        est = _with_threads(clone(dict(chosen)[lc["winner"]]), threads_per_worker(1))
+        refit = run_tasks(_fit_candidate, [(problem, lc["winner"], Pipeline([("pre", clone(preprocessor)), ("est", est)]),
+                                            X_train, y_train, X_test, y_test)], deadline=deadline)[0]
+        if refit is None:
+            return best_probe([lc["winner"]])
+        name, model, metrics = refit
+        # exhaustive = the other candidates' full-data fits (extrapolated) + the winner's measured refit
+        exhaustive = metrics["timing"]["fit_sec"] + sum(v for n, v in lc["estimated_full_fit_sec"].items() if n != name)
+        actual = lc["selection_fit_sec"] + metrics["timing"]["fit_sec"]
+        lc.update(refit_fit_sec=metrics["timing"]["fit_sec"], estimated_exhaustive_fit_sec=round(exhaustive, 4),
+                  saved_sec=round(exhaustive - actual, 4),
+                  saved_frac=round(1 - actual / exhaustive, 3) if exhaustive else None)
+        metrics["learning_curve"] = lc
+        return finish(model, metrics, name, (), {name: metrics["timing"]})
+
+    if chosen and cv_folds and cv_folds >= 2:
+        from src.cv_eval import cross_validate
+        metric = primary_metric or ("f1_macro" if problem=="classification" else "rmse")
+        cv = cross_validate(problem, preprocessor, chosen, X_train, y_train, folds=int(cv_folds),
+                            primary_metric=metric, n_jobs=n_jobs, prune=cv_prune, deadline=deadline)
+        timed_out = [n for n, r in cv["candidates"].items() if r["folds_run"] < cv["folds"] and not r["pruned"]]
+        if cv["winner"] is None:
+            return best_probe(timed_out)
+        est = _with_threads(clone(dict(chosen)[cv["winner"]]), threads_per_worker(1))
+        refit = run_tasks(_fit_candidate, [(problem, cv["winner"], Pipeline([("pre", clone(preprocessor)), ("est", est)]),
+                                            X_train, y_train, X_test, y_test)], deadline=deadline)[0]
+        if refit is None:
+            return best_probe(timed_out + [cv["winner"]])
+        name, model, metrics = refit
+        win = cv["candidates"][name]
+        metrics[f"cv_{metric}_mean"], metrics[f"cv_{metric}_std"] = win["mean"], win["std"]
+        metrics["cv"] = cv
+        return finish(model, metrics, name, timed_out, {name: metrics["timing"]})
+
+    # Fit all candidates at once; cores are split between workers so inner n_jobs don't oversubscribe
+    n_threads = threads_per_worker(workers)
+    keys, reused = {}, {}
+    if memo is not None and dataset_key is not None and share_preprocessing:
+        from src.memo import config_key
+        pre_key = config_key(preprocessor)
+        keys = {name: memo.key("candidate", dataset_key, problem, len(X_train), pre_key, config_key(est))
+                for name, est in chosen}
+        reused = {name: r for name in keys if (r := memo.get("candidate", keys[name])) is not None}
+    todo = [(name, est) for name, est in chosen if name not in reused]
+    if share_preprocessing:
+        # impute/scale/encode once; every estimator trains on the same cached train/test matrices
+        pre = clone(preprocessor)
+        Xt_train = pre.fit_transform(X_train, y_train)
+        Xt_test = pre.transform(X_test) if todo else None
+        tasks = [(problem, name, _with_threads(clone(est), n_threads), Xt_train, y_train, Xt_test, y_test, n_threads)
+                 for name, est in todo]
+    else:
+        tasks = [(problem, name, Pipeline([("pre", clone(preprocessor)), ("est", _with_threads(clone(est), n_threads))]),
+                  X_train, y_train, X_test, y_test, n_threads)
+                 for name, est in todo]
+    fitted = dict(zip([name for name, _ in todo], run_tasks(_fit_candidate, tasks, n_jobs=workers, deadline=deadline)))
+    for name, r in fitted.items():
+        if r is not None and name in keys:
+            memo.put("candidate", keys[name], r)
+    results = [reused.get(name) or fitted.get(name) for name, _ in chosen]
+    timed_out = [name for (name, _), r in zip(chosen, results) if r is None]
 
     best = None  # (name, model, metrics)
-    for name, est in chosen:
-        pipe = Pipeline([("pre", preprocessor), ("est", est)])
-        pipe.fit(X_train, y_train)
-        y_pred = pipe.predict(X_test)
-        metrics = _metric(problem, y_test, y_pred)
-        if best is None:
-            best = (name, pipe, metrics)
-        else:
-            # Selection: for clf by f1_macro then accuracy; for reg by rmse lower is better
-            if problem=="classification":
-                cur_f1, best_f1 = metrics["f1_macro"], best[2]["f1_macro"]
-                cur_acc, best_acc = metrics["accuracy"], best[2]["accuracy"]
-                if (cur_f1 > best_f1) or (cur_f1 == best_f1 and cur_acc > best_acc):
-                    best = (name, pipe, metrics)
-            else:
-                if metrics["rmse"] < best[2]["rmse"]:
-                    best = (name, pipe, metrics)
-    return best[1], best[2], best[0]
+    for r in results:  # task order, so ties resolve as in the serial loop
+        if r is not None and (best is None or _is_better(problem, r[2], best[2])):
+            best = r
+    if best is None:
+        return best_probe(timed_out)
+    model = Pipeline([("pre", pre), ("est", best[1])]) if share_preprocessing else best[1]
+    if reused:
+        best[2]["memo_reused"] = list(reused)  # candidates taken from earlier runs instead of refitted
+    return finish(model, best[2], best[0], timed_out, {r[0]: r[2]["timing"] for r in results if r is not None})
@@ -0,0 +1,113 @@
+from __future__ import annotations
+import os, csv, json, time, argparse, traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Dict, List
+
+from src.io_utils import RUN_TS, ensure_dirs, write_json
+from src.parallel import cpu_count
+
+def read_manifest(path: str) -> List[Dict[str, Any]]:
+    """
+    Jobs from a CSV (header csv,target[,name]), JSONL (one object per line) or YAML (a list of
+    mappings, or {"jobs": [...]}) manifest. Relative CSV paths are resolved against the manifest
+    folder when they do not exist relative to the working directory.
+    """
+    ext = os.path.splitext(path)[1].lower()
+    with open(path, encoding="utf-8") as f:
+        if ext == ".csv":
+            jobs = list(csv.DictReader(f))
+        elif ext in (".jsonl", ".ndjson"):
+            jobs = [json.loads(line) for line in f if line.strip()]
+        elif ext in (".yaml", ".yml"):
+            try:
+                import yaml
+            except ImportError:
+                raise RuntimeError("YAML manifests need PyYAML (pip install pyyaml); use CSV or JSONL instead")
+            data = yaml.safe_load(f) or []
+            jobs = data.get("jobs", []) if isinstance(data, dict) else data
+        else:
+            raise ValueError(f"unsupported manifest format '{ext}' (expected .csv, .jsonl or .yaml)")
+
+    base = os.path.dirname(os.path.abspath(path))
+    out = []
+    for i, job in enumerate(jobs):
+        if not job.get("csv") or not job.get("target"):
+            raise ValueError(f"manifest entry {i} needs 'csv' and 'target': {job}")
+        csv_path = str(job["csv"])
+        if not os.path.isabs(csv_path) and not os.path.exists(csv_path):
+            csv_path = os.path.join(base, csv_path)
+        out.append({"csv": csv_path, "target": str(job["target"]), "name": job.get("name") or None})
+    return out
+
+def _init_worker(n_jobs: int):
+    # each worker pays the heavy imports once and reuses them (and the LLM client) for every job it runs
+    os.environ.setdefault("AGENT_N_JOBS", str(n_jobs))
+    from src.main import import_stage_modules
+    import_stage_modules()
+
+def _run_job(job: Dict[str, Any], run_id: str, use_cache: bool) -> Dict[str, Any]:
+    from src.main import main
+    t0 = time.perf_counter()
+    rec = {"csv": job["csv"], "target": job["target"], "name": job["name"], "run_id": run_id}
+    try:
+        rec.update(main(job["csv"], job["target"], job["name"], use_cache=use_cache, run_id=run_id))
+        rec["status"] = "ok"
+    except Exception as e:
+        # one bad dataset must not take the rest of the batch down
+        rec.update(status="failed", error=f"{type(e).__name__}: {e}", traceback=traceback.format_exc())
+    rec["wall_sec"] = round(time.perf_counter() - t0, 3)
+    return rec
+
+def run_batch(jobs: List[Dict[str, Any]], concurrency: int | None = None, use_cache: bool = True,
+              batch_id: str | None = None) -> Dict[str, Any]:
+    """
+    Run main() for every job with at most `concurrency` jobs in flight. Jobs share long-lived worker
+    processes; the cores are split between them (AGENT_N_JOBS per job, unless set explicitly).
+    Writes the aggregated summary to logs/batch_<id>.json and returns it.
+    """
+    ensure_dirs()
+    batch_id = batch_id or RUN_TS()
+    concurrency = max(1, min(concurrency or cpu_count(), len(jobs) or 1))
+    per_job = max(1, cpu_count() // concurrency)
+    t0 = time.perf_counter()
+    run_ids = [f"{batch_id}-{i:03d}" for i in range(len(jobs))]  # unique even when jobs start in the same second
+
+    if concurrency == 1:
+        _init_worker(per_job)
+        results = [_run_job(job, rid, use_cache) for job, rid in zip(jobs, run_ids)]
+    else:
+        results = [None] * len(jobs)
+        with ProcessPoolExecutor(max_workers=concurrency, initializer=_init_worker, initargs=(per_job,)) as ex:
+            futs = {ex.submit(_run_job, job, rid, use_cache): i for i, (job, rid) in enumerate(zip(jobs, run_ids))}
+            for fut in as_completed(futs):
+                i = futs[fut]
+                try:
+                    results[i] = fut.result()
+                except Exception as e:  # worker process died (e.g. out of memory)
+                    results[i] = {**jobs[i], "run_id": run_ids[i], "status": "failed",
+                                  "error": f"{type(e).__name__}: {e}", "wall_sec": None}
+                r = results[i]
+                print(f"[batch] {r['status']:6s} {r.get('name') or r['csv']} ({r['wall_sec']}s)")
+
+    summary = {
+        "batch_id": batch_id,
+        "concurrency": concurrency,
+        "n_jobs_per_run": per_job,
+        "n_total": len(jobs),
+        "n_ok": sum(r["status"] == "ok" for r in results),
+        "n_failed": sum(r["status"] != "ok" for r in results),
+        "wall_sec": round(time.perf_counter() - t0, 3),
+        "jobs": results,
+    }
+    write_json(summary, f"logs/batch_{batch_id}.json")
+    return summary
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--manifest", required=True, help="CSV, JSONL or YAML list of csv/target/name entries")
+    ap.add_argument("--concurrency", type=int, default=int(os.getenv("AGENT_BATCH_CONCURRENCY", "0")) or None,
+                    help="jobs in flight at once (default: number of cores)")
+    ap.add_argument("--no-cache", action="store_true", help="re-parse the CSVs instead of using the dataset cache")
+    args = ap.parse_args()
+    s = run_batch(read_manifest(args.manifest), args.concurrency, use_cache=not args.no_cache)
+    print(f"Batch {s['batch_id']}: {s['n_ok']}/{s['n_total']} ok in {s['wall_sec']}s -> logs/batch_{s['batch_id']}.json")
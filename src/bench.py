@@ -0,0 +1,201 @@
+from __future__ import annotations
+import os, sys, json, time, shutil, argparse, platform
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from typing import Any, Dict, List
+
+from src.parallel import cpu_count
+
+BENCH_DIR = "artefacts/bench"
+STAGES = ["load_csv", "quick_overview", "plot_distribution", "build_transformer_fit", "run_automl_or_baseline", "pipeline"]
+OPTIONAL_STAGES = ["preprocess_memory"]  # standard vs low-memory preprocessing under tracemalloc (slow)
+GEN_CHUNK = 250_000  # rows generated/written per block, so 10M-row files never sit in memory at once
+
+def _case(rows: int, cols: int, cat_frac: float = 0.3, cardinality: int = 20, missing: float = 0.05,
+          problem: str = "classification") -> Dict[str, Any]:
+    name = f"{problem[:3]}_{rows}x{cols}_card{cardinality}_miss{int(missing * 100)}"
+    return {"name": name, "rows": rows, "cols": cols, "cat_frac": cat_frac, "cardinality": cardinality,
+            "missing": missing, "problem": problem}
+
+PRESETS = {
+    "smoke": [_case(10_000, 10)],
+    "default": [_case(10_000, 10), _case(100_000, 50), _case(100_000, 50, cardinality=10_000, missing=0.2),
+                _case(100_000, 20, problem="regression"), _case(1_000_000, 20)],
+    "rows": [_case(n, 20) for n in (10_000, 100_000, 1_000_000, 10_000_000)],
+    "cols": [_case(10_000, p) for p in (10, 100, 500, 2_000)],
+    "cardinality": [_case(100_000, 20, cat_frac=0.5, cardinality=k) for k in (10, 1_000, 100_000)],
+    "missing": [_case(100_000, 20, missing=m) for m in (0.0, 0.2, 0.5)],
+}
+
+def make_dataset(case: Dict[str, Any], out_dir: str = BENCH_DIR, seed: int = 42) -> str:
+    """
+    Write the synthetic CSV for a case (reused when it already exists): numeric columns partly tied
+    to the target, Zipf-distributed string categories, missing cells spread over every feature.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    path = os.path.join(out_dir, f"{case['name']}_s{seed}.csv")
+    if os.path.exists(path):
+        return path
+    n_cat = int(round(case["cols"] * case["cat_frac"]))
+    n_num = case["cols"] - n_cat
+    w = np.random.default_rng(seed).normal(size=n_num) * (np.arange(n_num) % 3 == 0)  # a third of them matter
+    tmp = f"{path}.{os.getpid()}.tmp"
+    for start in range(0, case["rows"], GEN_CHUNK):
+        n = min(GEN_CHUNK, case["rows"] - start)
+        rng = np.random.default_rng([seed, start])  # same data whatever the chunk boundaries
+        num = rng.normal(size=(n, n_num)).astype(np.float32)
+        ranks = np.minimum(rng.zipf(1.3, size=(n, n_cat)), case["cardinality"]) - 1
+        score = num @ w + 0.5 * (ranks[:, 0] % 2 if n_cat else 0) + rng.normal(scale=0.5, size=n)
+        df = pd.DataFrame(num, columns=[f"num_{i}" for i in range(n_num)])
+        for j in range(n_cat):
+            df[f"cat_{j}"] = np.char.add("c", ranks[:, j].astype(str))
+        if case["missing"]:
+            mask = rng.random(size=df.shape) < case["missing"]
+            df = df.mask(mask)
+        df["target"] = (score > 0).astype(int) if case["problem"] == "classification" else score.round(4)
+        df.to_csv(tmp, mode="a", header=start == 0, index=False, float_format="%.5g")
+    os.replace(tmp, path)
+    return path
+
+def _run_case(case: Dict[str, Any], path: str, stages: List[str], n_jobs: int, work_dir: str,
+              low_memory: bool = False) -> Dict[str, Any]:
+    """
+    Time each stage on one dataset; runs in a fresh process so the peak RSS belongs to this case.
+    """
+    os.environ["LLM_BACKEND"] = "stub"  # no network, no SDK import
+    os.environ.setdefault("ENABLE_LLM_NARRATIVE", "0")
+    from src.instrument import Recorder
+    from src.io_utils import load_csv, detect_problem_type
+    from src.eda import quick_overview, plot_distribution
+    from src.data_profile import profile_frame
+    from src.preprocess import split_xy, build_transformer, make_splits, memory_report
+    from src.automl_or_baseline import run_automl_or_baseline
+
+    rec, rows = Recorder(), case["rows"]
+    df = prof = None
+    if "load_csv" in stages:
+        with rec.stage("load_csv", rows=rows):
+            df = load_csv(path)  # cache off: measure parsing
+    else:
+        df = load_csv(path)  # later stages still need the frame
+    problem = detect_problem_type(df, "target")
+    if "quick_overview" in stages:
+        with rec.stage("quick_overview", rows=rows):
+            prof = profile_frame(df, "target")
+            quick_overview(df, "target", profile=prof)
+    elif "plot_distribution" in stages:
+        prof = profile_frame(df, "target")  # the plots need the profile; not timed as a stage
+    if "plot_distribution" in stages:
+        plot_dir = os.path.join(work_dir, "plots", case["name"])
+        shutil.rmtree(plot_dir, ignore_errors=True)  # always render, never hash-skip
+        with rec.stage("plot_distribution", rows=rows):
+            plot_distribution(df, "target", profile=prof, out_dir=plot_dir, n_jobs=n_jobs)
+    if "build_transformer_fit" in stages or "run_automl_or_baseline" in stages:
+        X, y = split_xy(df, "target")
+        X_tr, X_te, y_tr, y_te = make_splits(X, y)
+        with rec.stage("build_transformer_fit", rows=len(X_tr)):
+            pre, *_ = build_transformer(X, profile=prof, low_memory=low_memory)
+            pre.fit_transform(X_tr, y_tr)
+    if "run_automl_or_baseline" in stages:
+        with rec.stage("run_automl_or_baseline", rows=len(X_tr)) as r:
+            _, metrics, name = run_automl_or_baseline(problem, pre, X_tr, y_tr, X_te, y_te, strategy="baseline",
+                                                      candidates=None, n_jobs=n_jobs)
+            r.update(model=name, candidate_timing=metrics.get("candidate_timing"))
+    extra = {}
+    if "preprocess_memory" in stages:
+        extra["preprocess_memory"] = memory_report(df, "target", profile=prof)
+    del df
+    if "pipeline" in stages:
+        from src.main import main
+        cwd = os.getcwd()
+        os.makedirs(work_dir, exist_ok=True)
+        os.chdir(work_dir)  # reports/logs/artefacts of the end-to-end run stay inside the bench folder
+        try:
+            os.environ.setdefault("AGENT_CV_FOLDS", "0")  # single holdout unless asked otherwise
+            os.environ["AGENT_LOW_MEMORY"] = "1" if low_memory else "0"
+            with rec.stage("pipeline", rows=rows):
+                main(os.path.join(cwd, path), "target", case["name"], use_cache=False)
+        finally:
+            os.chdir(cwd)
+    return {**case, "problem": problem, "file_mb": round(os.path.getsize(path) / 2**20, 2), "stages": rec.summary(),
+            **extra}
+
+def run_bench(cases: List[Dict[str, Any]], stages: List[str] = STAGES, n_jobs: int = 1,
+              seed: int = 42, work_dir: str = BENCH_DIR, low_memory: bool = False) -> Dict[str, Any]:
+    from sklearn import __version__ as sk_version
+    out = {"created": time.strftime("%Y-%m-%d %H:%M:%S"), "python": platform.python_version(),
+           "versions": {"numpy": np.__version__, "pandas": pd.__version__, "sklearn": sk_version},
+           "cpu_count": cpu_count(), "n_jobs": n_jobs, "seed": seed, "low_memory": low_memory, "cases": {}}
+    for case in cases:
+        path = make_dataset(case, work_dir, seed)
+        print(f"[bench] {case['name']} ...", flush=True)
+        with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as ex:
+            out["cases"][case["name"]] = ex.submit(_run_case, case, path, stages, n_jobs, work_dir, low_memory).result()
+        for stage, r in out["cases"][case["name"]]["stages"].items():
+            print(f"  {stage:24s} {r['wall_sec']:9.3f}s  {r['rows_per_sec'] or 0:12.0f} rows/s  "
+                  f"peak {r['peak_rss_mb']} MB")
+        mem = out["cases"][case["name"]].get("preprocess_memory")
+        if mem:
+            print(f"  preprocessing peak: standard {mem['standard']['peak_mb']} MB, "
+                  f"low-memory {mem['low_memory']['peak_mb']} MB")
+    return out
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float = 0.2,
+            min_sec: float = 0.05, min_mb: float = 5.0) -> List[Dict[str, Any]]:
+    """
+    Stages whose wall time grew by more than `tolerance` (and by at least min_sec, to ignore noise
+    on tiny stages) or whose own peak-RSS growth (peak_rss_delta_mb, not the process peak every later
+    stage inherits) grew by more than `tolerance` and at least min_mb versus the baseline run.
+    """
+    regressions = []
+    for name, case in current["cases"].items():
+        base = baseline.get("cases", {}).get(name)
+        if not base:
+            continue
+        for stage, r in case["stages"].items():
+            b = base["stages"].get(stage)
+            if not b:
+                continue
+            if r["wall_sec"] > b["wall_sec"] * (1 + tolerance) and r["wall_sec"] - b["wall_sec"] >= min_sec:
+                regressions.append({"case": name, "stage": stage, "what": "wall_sec",
+                                    "baseline": b["wall_sec"], "current": r["wall_sec"]})
+            rd, bd = r.get("peak_rss_delta_mb"), b.get("peak_rss_delta_mb")
+            if rd is not None and bd is not None and rd > bd * (1 + tolerance) and rd - bd >= min_mb:
+                regressions.append({"case": name, "stage": stage, "what": "peak_rss_delta_mb",
+                                    "baseline": bd, "current": rd})
+    return regressions
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Benchmark the pipeline stages on synthetic datasets")
+    ap.add_argument("--preset", default="smoke", choices=sorted(PRESETS))
+    ap.add_argument("--stages", default=",".join(STAGES), help=f"comma-separated subset of {STAGES + OPTIONAL_STAGES}")
+    ap.add_argument("--low-memory", action="store_true", help="use the float32 low-memory preprocessing path")
+    ap.add_argument("--n-jobs", type=int, default=1)
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--out", default=None, help="results JSON (default artefacts/bench/bench_<time>.json)")
+    ap.add_argument("--baseline", default=None, help="baseline JSON to compare against; exits 1 on regressions")
+    ap.add_argument("--save-baseline", default=None, help="also write the results to this baseline path")
+    ap.add_argument("--tolerance", type=float, default=0.2, help="allowed relative slowdown / memory growth")
+    args = ap.parse_args()
+
+    stages = [s for s in args.stages.split(",") if s]
+    unknown = set(stages) - set(STAGES + OPTIONAL_STAGES)
+    if unknown:
+        ap.error(f"unknown stages: {sorted(unknown)}")
+    res = run_bench(PRESETS[args.preset], stages, n_jobs=args.n_jobs, seed=args.seed, low_memory=args.low_memory)
+    res["preset"] = args.preset
+    out = args.out or os.path.join(BENCH_DIR, f"bench_{time.strftime('%Y%m%d-%H%M%S')}.json")
+    for p in filter(None, [out, args.save_baseline]):
+        os.makedirs(os.path.dirname(p) or ".", exist_ok=True)
+        with open(p, "w") as f:
+            json.dump(res, f, indent=2)
+    print(f"Results: {out}")
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(res, json.load(f), args.tolerance)
+        for r in regressions:
+            print(f"[regression] {r['case']} / {r['stage']}: {r['what']} {r['baseline']} -> {r['current']}")
+        print(f"{len(regressions)} regression(s) vs {args.baseline}")
+        sys.exit(1 if regressions else 0)
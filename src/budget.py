@@ -0,0 +1,113 @@
+from __future__ import annotations
+import time, numpy as np
+from typing import Any, Dict, List, Tuple
+from sklearn.base import BaseEstimator, clone
+from sklearn.pipeline import Pipeline
+from src.parallel import run_tasks, threads_per_worker
+
+SAFETY = 1.3      # tree fits grow a bit faster than linear in rows
+HEADROOM = 0.8    # keep part of the budget for preprocessing, scoring and the refit
+MIN_RATIO = 0.05  # a candidate needing >20x its allowance is skipped rather than shrunk
+
+class Budget:
+    """
+    Wall-clock deadline shared by every step of one modeling call.
+    """
+    def __init__(self, seconds: float):
+        self.seconds = float(seconds)
+        self.start = time.monotonic()
+        self.deadline = self.start + self.seconds
+
+    def remaining(self) -> float:
+        return max(0.0, self.deadline - time.monotonic())
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self.start
+
+class RowSubsample(BaseEstimator):
+    """
+    Fit the wrapped estimator on at most max_rows random training rows (budget down-sizing).
+    """
+    def __init__(self, estimator=None, max_rows: int = 10000, random_state: int = 42):
+        self.estimator = estimator
+        self.max_rows = max_rows
+        self.random_state = random_state
+
+    def fit(self, X, y):
+        if X.shape[0] > self.max_rows:
+            idx = np.sort(np.random.default_rng(self.random_state).choice(X.shape[0], self.max_rows, replace=False))
+            X = X.iloc[idx] if hasattr(X, "iloc") else X[idx]
+            y = y.iloc[idx] if hasattr(y, "iloc") else y[idx]
+        self.estimator_ = clone(self.estimator).fit(X, y)
+        if hasattr(self.estimator_, "classes_"):
+            self.classes_ = self.estimator_.classes_
+        return self
+
+    def predict(self, X):
+        return self.estimator_.predict(X)
+
+    def predict_proba(self, X):
+        return self.estimator_.predict_proba(X)
+
+def _probe(pipe, X, y, n_rows: int, random_state: int = 42):
+    idx = np.sort(np.random.default_rng(random_state).choice(len(X), n_rows, replace=False))
+    t0 = time.perf_counter()
+    pipe.fit(X.iloc[idx], y.iloc[idx])
+    return pipe, time.perf_counter() - t0
+
+def schedule(preprocessor, chosen: List[Tuple[str, Any]], X, y, budget: Budget, *,
+             n_fits: int = 1,
+             workers: int = 1,
+             probe_frac: float = 0.02,
+             min_probe_rows: int = 500):
+    """
+    Estimate each candidate's full fit time from a small subsample fit, then keep, down-size
+    (fewer trees, or a row subsample) or skip it so the whole plan fits in the remaining budget.
+    Returns (chosen, probes, decisions); probes are the fitted subsample pipelines, kept as a
+    last-resort model if the deadline hits before any full fit finishes.
+    """
+    n = len(X)
+    n_probe = min(n, max(min_probe_rows, int(n * probe_frac)))
+    from src.automl_or_baseline import _with_threads
+    n_threads = threads_per_worker(workers)
+    tasks = [(Pipeline([("pre", clone(preprocessor)), ("est", _with_threads(clone(est), n_threads))]), X, y, n_probe)
+             for _, est in chosen]
+    fitted = run_tasks(_probe, tasks, n_jobs=workers, deadline=budget.deadline)
+    probes = {name: p[0] for (name, _), p in zip(chosen, fitted) if p is not None}
+
+    # each candidate gets an equal share of the parallel wall time, split over its n_fits fits
+    slots = max(1, min(workers, len(chosen)))
+    allowance = budget.remaining() * HEADROOM * slots / len(chosen) / max(1, n_fits)
+    ratios = {}
+    decisions: Dict[str, Dict[str, Any]] = {}
+    for (name, _), p in zip(chosen, fitted):
+        if p is None:
+            decisions[name] = {"action": "skip", "reason": "probe fit hit the deadline"}
+            continue
+        est_sec = p[1] * n / n_probe * SAFETY
+        ratios[name] = allowance / est_sec if est_sec > 0 else 1.0
+        decisions[name] = {"probe_rows": n_probe, "probe_sec": round(p[1], 4),
+                           "est_fit_sec": round(est_sec, 3), "allowed_sec": round(allowance, 3)}
+    # never skip everything: the most affordable candidate is shrunk instead
+    keep_anyway = max(ratios, key=ratios.get) if ratios and max(ratios.values()) < MIN_RATIO else None
+
+    out = []
+    for name, est in chosen:
+        if name not in ratios:
+            continue
+        ratio, d = ratios[name], decisions[name]
+        if ratio >= 1.0:
+            d["action"] = "keep"
+        elif ratio < MIN_RATIO and name != keep_anyway:
+            d["action"] = "skip"
+            continue
+        elif "n_estimators" in est.get_params():
+            k = max(10, int(est.get_params()["n_estimators"] * ratio))
+            est = clone(est).set_params(n_estimators=k)
+            d["action"], d["n_estimators"] = "fewer_trees", k
+        else:
+            rows = max(n_probe, int(n * ratio))
+            est = RowSubsample(clone(est), max_rows=rows)
+            d["action"], d["max_rows"] = "subsample", rows
+        out.append((name, est))
+    return out, probes, decisions
@@ -0,0 +1,90 @@
+from __future__ import annotations
+import numpy as np
+import pandas as pd
+from typing import Any, Dict, List
+
+def _standardize(df: pd.DataFrame, cols: List[str]):
+    """
+    Column-by-column float32 z-scores (missing -> 0, i.e. mean-imputed), so only one n x p float32
+    matrix is ever allocated. Constant/empty columns are dropped.
+    """
+    Z = np.empty((len(df), len(cols)), dtype=np.float32)
+    keep = []
+    for c in cols:
+        x = pd.to_numeric(df[c], errors="coerce").to_numpy(dtype=np.float32, na_value=np.nan)
+        mu, sd = np.nanmean(x) if len(x) else np.nan, np.nanstd(x) if len(x) else np.nan
+        if not np.isfinite(sd) or sd == 0:
+            continue
+        z = Z[:, len(keep)]
+        np.subtract(x, mu, out=z)
+        z /= sd
+        z[np.isnan(z)] = 0.0
+        keep.append(c)
+    return Z[:, :len(keep)], keep
+
+def _cluster_order(C: np.ndarray) -> np.ndarray:
+    # hierarchical clustering on 1-|r| so correlated columns sit next to each other in the heatmap
+    if len(C) < 3:
+        return np.arange(len(C))
+    from scipy.cluster.hierarchy import leaves_list, linkage
+    from scipy.spatial.distance import squareform
+    D = np.clip(1.0 - np.abs(C), 0.0, None).astype(np.float64)
+    np.fill_diagonal(D, 0.0)
+    return leaves_list(linkage(squareform(D, checks=False), method="average"))
+
+def correlation_summary(df: pd.DataFrame, cols: List[str], *,
+                        sample_rows: int = 50_000,
+                        block_size: int = 256,
+                        top_k: int = 20,
+                        max_heatmap_cols: int = 30,
+                        seed: int = 42) -> Dict[str, Any]:
+    """
+    Pearson correlations for wide numeric tables with bounded memory: float32 z-scores on an
+    optional row subsample, the p x p matrix is computed block_size columns at a time and only the
+    top_k strongest pairs are kept. The heatmap subset is the columns of those pairs (or all
+    columns when they fit), ordered by hierarchical clustering.
+    """
+    if len(df) > sample_rows:
+        df = df.sample(n=sample_rows, random_state=seed)
+    Z, names = _standardize(df, list(cols))
+    n, p = Z.shape
+    out = {"n_rows_used": int(n), "n_cols": int(p), "pairs": [], "columns": [], "matrix": []}
+    if n < 2 or p < 2:
+        return out
+
+    best_r = np.empty(0, dtype=np.float32)
+    best_i = np.empty(0, dtype=np.int64)
+    best_j = np.empty(0, dtype=np.int64)
+    for start in range(0, p, block_size):
+        stop = min(p, start + block_size)
+        C = (Z[:, start:stop].T @ Z[:, start:]) / n  # block rows vs. every column from `start` on
+        ii, jj = np.triu_indices(stop - start, k=1, m=p - start)  # upper triangle only (j > i)
+        r = C[ii, jj]
+        if len(r) > top_k:
+            idx = np.argpartition(-np.abs(r), top_k - 1)[:top_k]
+            r, ii, jj = r[idx], ii[idx], jj[idx]
+        best_r = np.concatenate([best_r, r])
+        best_i = np.concatenate([best_i, ii + start])
+        best_j = np.concatenate([best_j, jj + start])
+        if len(best_r) > top_k:
+            idx = np.argpartition(-np.abs(best_r), top_k - 1)[:top_k]
+            best_r, best_i, best_j = best_r[idx], best_i[idx], best_j[idx]
+
+    order = np.argsort(-np.abs(best_r))
+    out["pairs"] = [{"a": str(names[best_i[k]]), "b": str(names[best_j[k]]), "r": round(float(best_r[k]), 4)}
+                    for k in order]
+
+    if p <= max_heatmap_cols:
+        sel = list(range(p))
+    else:
+        sel = []
+        for k in order:
+            for c in (best_i[k], best_j[k]):
+                if c not in sel and len(sel) < max_heatmap_cols:
+                    sel.append(int(c))
+    Zs = Z[:, sel]
+    C = np.clip((Zs.T @ Zs) / n, -1.0, 1.0)
+    perm = _cluster_order(C)
+    out["columns"] = [str(names[sel[k]]) for k in perm]
+    out["matrix"] = np.round(C[np.ix_(perm, perm)].astype(float), 6).tolist()
+    return out
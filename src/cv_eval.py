@@ -0,0 +1,113 @@
+from __future__ import annotations
+import time, numpy as np
+from typing import Any, Dict, List, Tuple
+from sklearn.base import clone
+from sklearn.model_selection import KFold, StratifiedKFold
+from src.preprocess import stratify_labels
+from src.parallel import run_tasks, resolve_n_jobs, threads_per_worker
+
+LOWER_IS_BETTER = {"rmse"}
+
+def make_folds(y, folds: int, random_state: int = 42) -> List[Tuple[np.ndarray, np.ndarray]]:
+    strat = stratify_labels(y)
+    # StratifiedKFold needs every class to appear in every fold
+    if strat is not None and strat.value_counts().min() >= folds:
+        splitter = StratifiedKFold(n_splits=folds, shuffle=True, random_state=random_state)
+        return list(splitter.split(np.zeros(len(y)), strat))
+    splitter = KFold(n_splits=folds, shuffle=True, random_state=random_state)
+    return list(splitter.split(np.zeros(len(y))))
+
+def _prepare_fold(preprocessor, X, y, tr_idx, va_idx):
+    """
+    Fit the transformer on one fold's train rows; the matrices are shared by every candidate on that fold.
+    """
+    t0 = time.perf_counter()
+    pre = clone(preprocessor)
+    Xt_tr = pre.fit_transform(X.iloc[tr_idx], y.iloc[tr_idx])
+    Xt_va = pre.transform(X.iloc[va_idx])
+    return Xt_tr, Xt_va, y.iloc[tr_idx], y.iloc[va_idx], time.perf_counter() - t0
+
+def _fit_fold(problem, name, est, fold, Xt_tr, y_tr, Xt_va, y_va, n_threads):
+    from src.automl_or_baseline import _fit_candidate
+    t0 = time.perf_counter()
+    _, _, metrics = _fit_candidate(problem, name, est, Xt_tr, y_tr, Xt_va, y_va, n_threads)
+    return name, fold, metrics, time.perf_counter() - t0
+
+def _summarise(res: Dict[str, Any], metric: str):
+    scores = [m[metric] for m in res["fold_metrics"]]
+    res["mean"] = float(np.mean(scores)) if scores else None  # None: no fold finished before the deadline
+    res["std"] = float(np.std(scores)) if scores else None
+    res["folds_run"] = len(scores)
+
+def _prune(results: Dict[str, Dict[str, Any]], metric: str) -> List[str]:
+    """
+    Successive-halving style cut: drop candidates whose mean+std cannot reach the leader's mean-std.
+    """
+    sign = -1.0 if metric in LOWER_IS_BETTER else 1.0
+    scored = {n: r for n, r in results.items() if r["mean"] is not None}
+    best = max(scored.values(), key=lambda r: sign * r["mean"])
+    floor = sign * best["mean"] - best["std"]
+    return [n for n, r in results.items() if r["mean"] is None or sign * r["mean"] + r["std"] < floor]
+
+def cross_validate(problem: str, preprocessor, estimators: List[Tuple[str, Any]], X, y, *,
+                   folds: int = 5,
+                   primary_metric: str = "f1_macro",
+                   n_jobs: int | None = 1,
+                   prune: bool = True,
+                   min_folds: int = 2,
+                   random_state: int = 42,
+                   deadline: float | None = None) -> Dict[str, Any]:
+    """
+    K-fold evaluation of every candidate. Fold preprocessing is fitted once per fold and shared,
+    (fold, candidate) fits run in parallel, and after the first min_folds folds candidates that are
+    clearly behind are pruned so the remaining folds are only spent on contenders.
+    With a deadline, unfinished fits are cancelled and the winner is picked from completed folds
+    (winner is None if nothing finished).
+    """
+    splits = make_folds(y, folds, random_state)
+    workers = resolve_n_jobs(n_jobs, max(len(splits), len(estimators)))
+    n_threads = threads_per_worker(workers)
+
+    prepared = run_tasks(_prepare_fold, [(preprocessor, X, y, tr, va) for tr, va in splits],
+                         n_jobs=workers, deadline=deadline)
+    fold_prep_sec = [float(p[4]) for p in prepared if p is not None]
+    fold_ids = [f for f, p in enumerate(prepared) if p is not None]
+
+    results = {name: {"fold_metrics": [], "fold_sec": [], "pruned": False} for name, _ in estimators}
+    ests = dict(estimators)
+
+    def run_folds(names, fold_ids):
+        if deadline is not None and time.monotonic() >= deadline:
+            return
+        tasks = [(problem, n, clone(ests[n]), f, prepared[f][0], prepared[f][2], prepared[f][1], prepared[f][3], n_threads)
+                 for f in fold_ids for n in names]
+        done = [r for r in run_tasks(_fit_fold, tasks, n_jobs=workers, deadline=deadline) if r is not None]
+        for name, f, metrics, sec in sorted(done, key=lambda r: r[1]):
+            results[name]["fold_metrics"].append(metrics)
+            results[name]["fold_sec"].append(float(sec))
+        for n in names:
+            _summarise(results[n], primary_metric)
+
+    first = fold_ids[:min_folds] if prune and len(estimators) > 1 else fold_ids
+    run_folds(list(ests), first)
+    alive = [n for n in ests if results[n]["mean"] is not None]
+    if alive and len(first) < len(fold_ids):
+        for n in _prune(results, primary_metric):
+            results[n]["pruned"] = True
+        alive = [n for n in ests if not results[n]["pruned"]]
+        run_folds(alive, fold_ids[len(first):])
+
+    sign = -1.0 if primary_metric in LOWER_IS_BETTER else 1.0
+    # max keeps candidate order on ties
+    winner = max(alive, key=lambda n: sign * results[n]["mean"]) if alive else None
+    return {
+        "folds": len(splits),
+        "folds_prepared": len(fold_ids),
+        "metric": primary_metric,
+        "winner": winner,
+        "fold_prep_sec": fold_prep_sec,
+        "candidates": {n: {"mean": r["mean"], "std": r["std"], "folds_run": r["folds_run"], "pruned": r["pruned"],
+                           "fold_scores": [m[primary_metric] for m in r["fold_metrics"]],
+                           "fold_sec": r["fold_sec"]}
+                       for n, r in results.items()},
+    }
@@ -0,0 +1,58 @@
+from __future__ import annotations
+import asyncio, functools, time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Tuple
+
+Stages = Dict[str, Tuple[Callable[..., Any], List[str]]]
+
+def _check(stages: Stages):
+    seen, done = set(), set()
+    def visit(n):
+        if n in done:
+            return
+        if n in seen:
+            raise ValueError(f"dependency cycle at stage '{n}'")
+        seen.add(n)
+        for d in stages[n][1]:
+            if d not in stages:
+                raise ValueError(f"stage '{n}' depends on unknown stage '{d}'")
+            visit(d)
+        done.add(n)
+    for n in stages:
+        visit(n)
+
+async def _run(stages: Stages, pool: ThreadPoolExecutor, timings: Dict[str, Dict[str, float]]):
+    loop = asyncio.get_running_loop()
+    t0 = time.perf_counter()
+    tasks: Dict[str, asyncio.Task] = {}
+
+    async def run_stage(name):
+        fn, deps = stages[name]
+        kwargs = {d: await tasks[d] for d in deps}
+        start = time.perf_counter() - t0
+        result = await loop.run_in_executor(pool, functools.partial(fn, **kwargs))
+        end = time.perf_counter() - t0
+        timings[name] = {"start": round(start, 4), "end": round(end, 4), "sec": round(end - start, 4)}
+        return result
+
+    for name in stages:  # every task exists before any of them awaits its dependencies
+        tasks[name] = asyncio.ensure_future(run_stage(name))
+    try:
+        results = await asyncio.gather(*tasks.values())
+    except BaseException:
+        for t in tasks.values():
+            t.cancel()  # stages still waiting on the failed one never start
+        raise
+    return dict(zip(tasks, results))
+
+def run_dag(stages: Stages, max_workers: int = 4) -> Tuple[Dict[str, Any], Dict[str, Dict[str, float]]]:
+    """
+    Run {name: (fn, [deps])} with each stage in a worker thread as soon as its dependencies finish;
+    fn is called with the dependencies' results as keyword arguments. Returns (results, timings),
+    where timings hold each stage's start/end offsets so the critical path is visible.
+    """
+    _check(stages)
+    timings: Dict[str, Dict[str, float]] = {}
+    with ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="stage") as pool:
+        results = asyncio.run(_run(stages, pool, timings))
+    return results, timings
@@ -0,0 +1,186 @@
+from __future__ import annotations
+import numpy as np
+import pandas as pd
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional
+
+SAMPLE_ROWS = 10_000  # uniform row sample kept for quantiles, histograms and correlations
+KMV_K = 1024          # sketch size for distinct counts (exact below this many distinct values)
+TOP_KEEP = 50         # value counts kept per categorical column
+TARGET_KEEP = 1000    # value counts kept for the target
+
+def _kmv(hashes: np.ndarray, k: int = KMV_K) -> np.ndarray:
+    """
+    k-minimum-values sketch: the k smallest distinct 64-bit hashes (mergeable distinct-count estimate).
+    """
+    u = pd.unique(hashes)
+    if len(u) > k:
+        u = np.partition(u, k - 1)[:k]
+    return np.sort(u)
+
+def _kmv_estimate(sk: np.ndarray, k: int = KMV_K) -> int:
+    if len(sk) < k:
+        return int(len(sk))
+    return int(round((k - 1) / (float(sk[-1]) / 2.0**64)))
+
+def _top(counts: pd.Series, keep: int) -> Dict[Any, int]:
+    return {k: int(v) for k, v in counts.head(keep).to_dict().items()}  # to_dict boxes numpy scalars
+
+@dataclass
+class Profile:
+    """
+    Column statistics computed once and shared by EDA, preprocessing, the planner and the report.
+    Every field is a mergeable accumulator, so chunk profiles combine with merge().
+    """
+    n_rows: int
+    columns: List[str]
+    dtypes: Dict[str, str]
+    numeric_cols: List[str]      # features only, target excluded
+    categorical_cols: List[str]  # features only, target excluded
+    target: Optional[str]
+    missing: Dict[str, int]                  # null counts
+    num: Dict[str, Dict[str, float]]         # count / mean / m2 / min / max (Welford-mergeable)
+    kmv: Dict[str, np.ndarray]               # distinct-count sketches
+    top: Dict[str, Dict[Any, int]]           # top value counts for categorical columns
+    target_counts: Dict[Any, int]
+    sample: pd.DataFrame = field(repr=False)
+    seed: int = 42
+
+    def missing_rate(self) -> Dict[str, float]:
+        return {c: (self.missing[c] / self.n_rows if self.n_rows else 0.0) for c in self.columns}
+
+    def n_unique(self) -> Dict[str, int]:
+        return {c: _kmv_estimate(self.kmv[c]) for c in self.columns}
+
+    def std(self, c: str) -> float:
+        s = self.num[c]
+        return float(np.sqrt(s["m2"] / s["count"])) if s["count"] else float("nan")
+
+    def quantiles(self, c: str, qs=(0.25, 0.5, 0.75)) -> List[float]:
+        vals = pd.to_numeric(self.sample[c], errors="coerce").dropna()
+        return [float(v) for v in np.quantile(vals, qs)] if len(vals) else [float("nan")] * len(qs)
+
+    def numeric_summary(self) -> Dict[str, Dict[str, float]]:
+        out = {}
+        for c in self.numeric_cols:
+            s = self.num[c]
+            q25, q50, q75 = self.quantiles(c)
+            out[c] = {"min": s["min"], "p25": q25, "median": q50, "p75": q75, "max": s["max"],
+                      "mean": s["mean"], "std": self.std(c)}
+        return out
+
+    def to_overview(self, top_k: int = 5) -> Dict[str, Any]:
+        """
+        The overview dict consumed by the planner, the narrative and the report.
+        """
+        return {
+            "n_rows": int(self.n_rows),
+            "n_cols": len(self.columns),
+            "columns": list(self.columns),
+            "dtypes": dict(self.dtypes),
+            "missing_percentage": self.missing_rate(),
+            "target_value_counts": dict(self.target_counts),
+            "n_unique": self.n_unique(),
+            "numeric_cols": list(self.numeric_cols),
+            "categorical_cols": list(self.categorical_cols),
+            "numeric_summary": self.numeric_summary(),
+            "top_values": {c: dict(list(v.items())[:top_k]) for c, v in self.top.items()},
+        }
+
+    def merge(self, other: "Profile") -> "Profile":
+        """
+        Combine two profiles of the same schema (e.g. consecutive chunks) without rescanning data.
+        """
+        num = {}
+        for c in self.num:
+            a, b = self.num[c], other.num.get(c)
+            if not b or not b["count"]:
+                num[c] = dict(a)
+                continue
+            if not a["count"]:
+                num[c] = dict(b)
+                continue
+            n = a["count"] + b["count"]
+            d = b["mean"] - a["mean"]
+            num[c] = {"count": n, "mean": a["mean"] + d * b["count"] / n,
+                      "m2": a["m2"] + b["m2"] + d * d * a["count"] * b["count"] / n,
+                      "min": min(a["min"], b["min"]), "max": max(a["max"], b["max"])}
+        top = {c: _merge_counts(self.top[c], other.top.get(c, {}), TOP_KEEP) for c in self.top}
+        # row sample stays uniform: each side contributes in proportion to its row count
+        n = self.n_rows + other.n_rows
+        size = min(SAMPLE_ROWS, len(self.sample) + len(other.sample))
+        take_a = min(len(self.sample), int(round(size * self.n_rows / n))) if n else 0
+        take_b = min(len(other.sample), size - take_a)
+        sample = pd.concat([self.sample.sample(n=take_a, random_state=self.seed),
+                            other.sample.sample(n=take_b, random_state=self.seed)], ignore_index=True)
+        return Profile(
+            n_rows=n,
+            columns=self.columns, dtypes=self.dtypes,
+            numeric_cols=self.numeric_cols, categorical_cols=self.categorical_cols, target=self.target,
+            missing={c: self.missing[c] + other.missing.get(c, 0) for c in self.columns},
+            num=num,
+            kmv={c: _kmv(np.concatenate([self.kmv[c], other.kmv.get(c, self.kmv[c][:0])])) for c in self.columns},
+            top=top,
+            target_counts=_merge_counts(self.target_counts, other.target_counts, TARGET_KEEP),
+            sample=sample, seed=self.seed,
+        )
+
+def _merge_counts(a: Dict[Any, int], b: Dict[Any, int], keep: int) -> Dict[Any, int]:
+    out = dict(a)
+    for k, v in b.items():
+        out[k] = out.get(k, 0) + v
+    return dict(sorted(out.items(), key=lambda kv: kv[1], reverse=True)[:keep])
+
+def profile_frame(df: pd.DataFrame, target: Optional[str] = None, seed: int = 42) -> Profile:
+    """
+    Profile a frame in one pass: null counts and numeric moments are computed block-wise for all
+    columns at once; distinct-count sketches and top values per column; plus a uniform row sample.
+    """
+    cols = df.columns.tolist()
+    is_num = {c: pd.api.types.is_numeric_dtype(t) for c, t in df.dtypes.items()}
+    num_all = [c for c in cols if is_num[c]]
+
+    missing = df.isna().sum()
+    num = {}
+    if num_all:
+        block = df[num_all]
+        if any(pd.api.types.is_bool_dtype(t) for t in block.dtypes):
+            block = block.astype({c: "float32" for c, t in block.dtypes.items() if pd.api.types.is_bool_dtype(t)})
+        agg = pd.DataFrame({"count": block.count(), "mean": block.mean(), "var": block.var(ddof=0),
+                            "min": block.min(), "max": block.max()})
+        for c, r in agg.iterrows():
+            cnt = int(r["count"])
+            num[c] = {"count": cnt, "mean": float(r["mean"]) if cnt else 0.0,
+                      "m2": float(r["var"]) * cnt if cnt else 0.0,
+                      "min": float(r["min"]) if cnt else float("inf"),
+                      "max": float(r["max"]) if cnt else float("-inf")}
+
+    kmv = {c: _kmv(pd.util.hash_pandas_object(df[c].dropna(), index=False).to_numpy()) for c in cols}
+    cat_cols = [c for c in cols if not is_num[c] and c != target]
+    top = {c: _top(df[c].value_counts(dropna=False), TOP_KEEP) for c in cat_cols}
+    target_counts = _top(df[target].value_counts(dropna=False), TARGET_KEEP) if target in df.columns else {}
+    sample = df.sample(n=min(len(df), SAMPLE_ROWS), random_state=seed) if len(df) > SAMPLE_ROWS else df.copy()
+
+    return Profile(
+        n_rows=int(len(df)),
+        columns=cols,
+        dtypes={c: str(t) for c, t in df.dtypes.items()},
+        numeric_cols=[c for c in num_all if c != target],
+        categorical_cols=cat_cols,
+        target=target,
+        missing={c: int(missing[c]) for c in cols},
+        num=num, kmv=kmv, top=top, target_counts=target_counts,
+        sample=sample.reset_index(drop=True), seed=seed,
+    )
+
+def profile_chunks(chunks: Iterable[pd.DataFrame], target: Optional[str] = None, seed: int = 42) -> Profile:
+    """
+    Profile a stream of frames (e.g. pd.read_csv(..., chunksize=...)) with bounded memory.
+    """
+    prof = None
+    for chunk in chunks:
+        p = profile_frame(chunk, target, seed)
+        prof = p if prof is None else prof.merge(p)
+    if prof is None:
+        raise ValueError("no data to profile")
+    return prof
@@ -1,61 +1,130 @@
 from __future__ import annotations
-import os
+import os, re, json, hashlib
+import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
+from src.data_profile import Profile, profile_frame
+from src.correlation import correlation_summary
+from src.parallel import run_tasks
 
 PLOT_DIR = "artefacts/eda_plots"
+INDEX_FILE = ".plot_index.json"  # plot file -> hash of the stats it was drawn from
 
-def quick_overview(df: pd.DataFrame, target: str) -> dict:
-    info = {
-        "n_rows": int(df.shape[0]),
-        "n_cols": int(df.shape[1]),
-        "columns": df.columns.tolist(),
-        "dtypes": {c: str(t) for c, t in df.dtypes.items()},
-        "missing_percentage": {c: float(df[c].isna().mean()) for c in df.columns},
-        "target_value_counts": df[target].value_counts(dropna=False).to_dict() if target in df.columns else {}
-    }
+def quick_overview(df: pd.DataFrame, target: str, profile: Profile | None = None) -> dict:
+    # all stats come from the single-pass profile; pass one in to avoid recomputing it
+    profile = profile or profile_frame(df, target)
+    return profile.to_overview()
 
-    return info
+def _safe(name) -> str:
+    return re.sub(r"[^\w.-]", "_", str(name))
 
-def plot_distribution(df: pd.DataFrame, target: str) -> list[str]:
-    paths = []
-    num_cols = [c for c in df.columns if (c != target) and (pd.api.types.is_numeric_dtype(df[c]))]
-    cat_cols = [c for c in df.columns if (c != target) and (not pd.api.types.is_numeric_dtype(df[c]))]
+def _render(kind: str, title: str, payload: dict, out: str) -> str:
+    """
+    Draw one chart with the Agg object-oriented API (no pyplot global state, safe in worker processes).
+    """
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
 
+    fig = Figure(figsize=payload.get("figsize", (6.4, 4.8)))
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+    if kind == "hist":
+        ax.stairs(payload["counts"], payload["edges"], fill=True)
+        ax.grid(True)
+    elif kind == "bar":
+        ax.bar(range(len(payload["counts"])), payload["counts"])
+        ax.set_xticks(range(len(payload["labels"])), payload["labels"], rotation=90)
+    elif kind == "heatmap":
+        import seaborn as sns
+        corr = pd.DataFrame(payload["matrix"], index=payload["labels"], columns=payload["labels"])
+        sns.heatmap(corr, annot=False, ax=ax)
+    ax.set_title(title)
+    fig.savefig(out, bbox_inches="tight")
+    return out
+
+def _hist_payload(profile: Profile, c, bins: int = 30) -> dict | None:
+    # histogram from the profile's row sample over the exact full-data range, scaled to the full count
+    s = profile.num[c]
+    vals = pd.to_numeric(profile.sample[c], errors="coerce").dropna().to_numpy(dtype=float)
+    if not s["count"] or not len(vals):
+        return None
+    counts, edges = np.histogram(vals, bins=bins, range=(s["min"], s["max"]))
+    scale = s["count"] / len(vals)
+    return {"counts": [float(round(v * scale, 3)) for v in counts], "edges": [float(e) for e in edges]}
+
+def _rank(profile: Profile, cols: list) -> list:
+    """
+    Order columns by association with a numeric target on the profile sample:
+    |Pearson r| for numeric columns, correlation ratio (eta) for categorical ones.
+    """
+    t = profile.target
+    if not t or t not in profile.sample or not pd.api.types.is_numeric_dtype(profile.sample[t]):
+        return list(cols)
+    y = profile.sample[t].astype(float)
+    n_unique = profile.n_unique()
+    score = {}
+    for c in cols:
+        x = profile.sample[c]
+        if n_unique[c] > 0.5 * profile.n_rows:
+            r = 0.0  # ID-like columns explain the sample perfectly and say nothing
+        elif pd.api.types.is_numeric_dtype(x):
+            r = x.astype(float).corr(y)
+        else:
+            grp = y.groupby(x.astype(str)).agg(["mean", "count"])
+            var = y.var(ddof=0)
+            r = np.sqrt((grp["count"] * (grp["mean"] - y.mean()) ** 2).sum() / len(y) / var) if var else 0.0
+        score[c] = 0.0 if pd.isna(r) else abs(float(r))
+    return sorted(cols, key=lambda c: score[c], reverse=True)
+
+def plot_distribution(df: pd.DataFrame | None, target: str, profile: Profile | None = None,
+                      out_dir: str = PLOT_DIR, max_plots: int = 20, n_jobs: int | None = 1,
+                      corr: dict | None = None) -> list[str]:
+    """
+    Histograms, bar charts and a correlation heatmap drawn from precomputed profile statistics.
+    max_plots caps each chart type (0 = no cap), keeping the columns most associated with the target.
+    corr is a correlation_summary() result; the heatmap shows its clustered top-pair subset.
+    Charts whose input statistics hash matches the existing PNG are not re-rendered.
+    """
+    profile = profile or profile_frame(df, target)
+    os.makedirs(out_dir, exist_ok=True)
+    num_cols, cat_cols = _rank(profile, profile.numeric_cols), _rank(profile, profile.categorical_cols)
+    if max_plots:
+        num_cols, cat_cols = num_cols[:max_plots], cat_cols[:max_plots]
+
+    specs = []  # (kind, title, payload, out)
     # Numeric hists
-    for c in num_cols[:20]: # set a cap ensuring processing speed
-        plt.figure()
-        df[c].hist(bins=30)
-        plt.title(f"Histogram for {c} Column")
-
-        out = os.path.join(PLOT_DIR, f"hist_{c}.png") # set path for storing chart
-        plt.savefig(out, bbox_inches="tight")
-        plt.close()
-        paths.append(out)
-    
+    for c in num_cols:
+        payload = _hist_payload(profile, c)
+        if payload:
+            specs.append(("hist", f"Histogram for {c} Column", payload, os.path.join(out_dir, f"hist_{_safe(c)}.png")))
     # Categorical bars
-    for c in cat_cols[:20]: # set a cap ensuring processing speed
-        plt.figure()
-        df[c].value_counts(dropna=False).head(30).plot(kind="bar")
-        plt.title(f"Bar Chart for {c} Column")
-
-        out = os.path.join(PLOT_DIR, f"bar_{c}.png") # set path for storing chart
-        plt.savefig(out, bbox_inches="tight")
-        plt.close()
-        paths.append(out)
-    
+    for c in cat_cols:
+        top = list(profile.top[c].items())[:30]
+        payload = {"labels": [str(k) for k, _ in top], "counts": [int(v) for _, v in top]}
+        specs.append(("bar", f"Bar Chart for {c} Column", payload, os.path.join(out_dir, f"bar_{_safe(c)}.png")))
     # Correlation heatmap (numeric only)
-    num_df = df[num_cols] # extract numeric columns
-
-    if num_df.shape[1] >= 2: # generate heatmap if df has more than 2 columns
-        plt.figure(figsize=(6,5))
-        sns.heatmap(num_df.corr(numeric_only=True), annot=False)
-
-        out = os.path.join(PLOT_DIR, "corr_heatmap.png") # set path for storing chart
-        plt.title("Correlation heatmap")
-        plt.savefig(out, bbox_inches="tight")
-        plt.close()
-        paths.append(out)
-    
-    return paths
\ No newline at end of file
+    if corr is None and len(profile.numeric_cols) >= 2:
+        corr = correlation_summary(df if df is not None else profile.sample, profile.numeric_cols)
+    if corr and len(corr["columns"]) >= 2:
+        k = len(corr["columns"])
+        payload = {"labels": corr["columns"], "matrix": corr["matrix"],
+                   "figsize": (6, 5) if k <= 12 else (10, 8)}
+        specs.append(("heatmap", "Correlation heatmap", payload, os.path.join(out_dir, "corr_heatmap.png")))
+
+    index_path = os.path.join(out_dir, INDEX_FILE)
+    try:
+        with open(index_path) as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        index = {}
+    todo = []
+    for kind, title, payload, out in specs:
+        h = hashlib.sha1(json.dumps([kind, title, payload], sort_keys=True).encode()).hexdigest()
+        name = os.path.basename(out)
+        if index.get(name) != h or not os.path.exists(out):
+            todo.append((kind, title, payload, out))
+            index[name] = h
+
+    run_tasks(_render, todo, n_jobs=n_jobs)
+    with open(index_path, "w") as f:
+        json.dump(index, f, indent=2)
+    return [out for *_, out in specs]
@@ -0,0 +1,212 @@
+from __future__ import annotations
+import os, json, math, time, sqlite3, warnings
+import numpy as np
+from contextlib import closing
+from typing import Any, Dict, List, Optional, Tuple
+from sklearn.base import clone
+from sklearn.model_selection import ParameterSampler
+from src import models
+from src.cv_eval import LOWER_IS_BETTER, _fit_fold
+from src.io_utils import evict_cache
+from src.learning_curve import _subsample
+from src.memo import config_key, content_key as trial_key
+from src.parallel import run_tasks, resolve_n_jobs, threads_per_worker
+
+TRIAL_DIR = "artefacts/trials"
+
+class TrialStore:
+    """
+    Completed trials in SQLite (<root>/trials.sqlite, WAL so concurrent batch jobs can share it) and fitted
+    warm-start states as joblib files under <root>/warm, LRU-evicted down to max_mb.
+    Only holds paths, so it can be passed to worker processes.
+    """
+    def __init__(self, root: str = TRIAL_DIR, max_mb: float = 1024):
+        self.root, self.max_mb = root, max_mb
+        self.path = os.path.join(root, "trials.sqlite")
+        os.makedirs(os.path.join(root, "warm"), exist_ok=True)
+        with closing(self._connect()) as con, con:
+            con.execute("CREATE TABLE IF NOT EXISTS trials (key TEXT PRIMARY KEY, dataset TEXT, preprocess TEXT, "
+                        "model TEXT, params TEXT, rows INTEGER, score REAL, metrics TEXT, fit_sec REAL, created REAL)")
+
+    def _connect(self):
+        con = sqlite3.connect(self.path, timeout=30)
+        con.execute("PRAGMA journal_mode=WAL")
+        return con
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with closing(self._connect()) as con:
+            row = con.execute("SELECT metrics, fit_sec FROM trials WHERE key = ?", (key,)).fetchone()
+        return {"metrics": json.loads(row[0]), "fit_sec": row[1]} if row else None
+
+    def put(self, key: str, *, dataset: str, preprocess: str, model: str, params: Dict[str, Any], rows: int,
+            score: float, metrics: Dict[str, Any], fit_sec: float):
+        with closing(self._connect()) as con, con:
+            con.execute("INSERT OR REPLACE INTO trials VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        (key, dataset, preprocess, model, json.dumps(params, default=str), rows, score,
+                         json.dumps(metrics), fit_sec, time.time()))
+
+    def _state_path(self, key: str) -> str:
+        return os.path.join(self.root, "warm", f"{key}.joblib")
+
+    def load_state(self, key: str) -> Optional[Dict[str, Any]]:
+        import joblib
+        fp = self._state_path(key)
+        if not os.path.exists(fp):
+            return None
+        try:
+            state = joblib.load(fp)
+        except Exception:  # unreadable/partial file: treat as a miss
+            return None
+        os.utime(fp)  # eviction is least-recently-used by mtime
+        return state
+
+    def save_state(self, key: str, model, resource: int):
+        import joblib
+        fp = self._state_path(key)
+        tmp = f"{fp}.{os.getpid()}.tmp"
+        joblib.dump({"model": model, "resource": int(resource)}, tmp)
+        os.replace(tmp, fp)
+        evict_cache(os.path.dirname(fp), self.max_mb, keep=fp)
+
+def _rungs(n_configs: int, n_rows: int, eta: int, min_rows: int) -> List[Tuple[int, int]]:
+    # successive halving: (configs, rows) per rung, ending with the survivors on every row
+    k = max(1, math.ceil(math.log(max(n_configs, 1), eta)) + 1) if n_configs > 1 else 1
+    out = []
+    for i in range(k):
+        rows = n_rows if i == k - 1 else max(min_rows, int(n_rows / eta ** (k - 1 - i)))
+        out.append((max(1, math.ceil(n_configs / eta ** i)), min(rows, n_rows)))
+    return out
+
+def search(problem: str, preprocessor, estimators: List[Tuple[str, Any]], X, y, *,
+           n_trials: int = 8,
+           eta: int = 3,
+           min_rows: int = 1_000,
+           val_rows: int = 50_000,
+           primary_metric: str = "f1_macro",
+           store: Optional[TrialStore] = None,
+           dataset_key: Optional[str] = None,
+           n_jobs: int | None = 1,
+           random_state: int = 42,
+           deadline: float | None = None) -> Dict[str, Any]:
+    """
+    Random search with successive halving per candidate: the estimator's current configuration plus
+    n_trials-1 samples from models.SEARCH_SPACES start on a small stratified row subsample and the best
+    1/eta move on to eta times more rows, up to all rows. Every trial is scored on the same stratified
+    validation slice of the training rows. With a store and dataset_key, completed trials (keyed by
+    dataset + preprocessing config + estimator config + rows + validation protocol) are read back
+    instead of refitted. Returns the best params per candidate and the overall winner.
+    """
+    t0 = time.perf_counter()
+    sign = -1.0 if primary_metric in LOWER_IS_BETTER else 1.0
+    all_idx = np.arange(len(y))
+    val_idx = _subsample(y, all_idx, min(val_rows, max(1, len(y) // 5)), random_state)
+    pool_idx = np.setdiff1d(all_idx, val_idx)
+    protocol = {"n": len(y), "val": len(val_idx), "seed": random_state, "problem": problem}
+    pre_key = config_key(preprocessor)
+
+    pre = clone(preprocessor)  # fitted once; every trial trains on row subsets of the same matrix
+    Xt_pool = pre.fit_transform(X.iloc[pool_idx], y.iloc[pool_idx])
+    Xt_val, y_pool, y_val = pre.transform(X.iloc[val_idx]), y.iloc[pool_idx], y.iloc[val_idx]
+    prep_sec = time.perf_counter() - t0
+
+    workers = resolve_n_jobs(n_jobs, max(1, n_trials) * len(estimators))
+    n_threads = threads_per_worker(workers)
+    use_store = store is not None and dataset_key is not None
+    out: Dict[str, Any] = {"metric": primary_metric, "candidates": {}, "fitted": 0, "reused": 0}
+    for name, est in estimators:
+        space = models.SEARCH_SPACES.get(name, {})
+        configs = [{}]
+        if space and n_trials > 1:
+            size = int(np.prod([len(v) for v in space.values()]))
+            configs += [p for p in ParameterSampler(space, min(n_trials - 1, size), random_state=random_state)]
+        alive, trials = list(range(len(configs))), []
+        scores: Dict[int, float] = {}
+        rows_reached: Dict[int, int] = {}
+        for n_keep, rows in _rungs(len(configs), len(pool_idx), eta, min_rows):
+            if deadline is not None and time.monotonic() >= deadline:
+                break
+            alive = sorted(alive, key=lambda i: -sign * scores.get(i, 0.0))[:n_keep] if scores else alive[:n_keep]
+            idx = _subsample(y_pool, np.arange(len(pool_idx)), rows, random_state)
+            todo, keys, scored = [], {}, set()
+            for i in alive:
+                cand = clone(est).set_params(**configs[i])
+                keys[i] = trial_key(dataset_key, pre_key, config_key(cand), rows, protocol)
+                hit = store.get(keys[i]) if use_store else None
+                if hit is not None:
+                    scores[i] = hit["metrics"][primary_metric]
+                    trials.append({"params": configs[i], "rows": rows, "score": scores[i], "fit_sec": hit["fit_sec"],
+                                   "cached": True})
+                    scored.add(i)
+                    out["reused"] += 1
+                else:
+                    todo.append((problem, i, cand, rows, Xt_pool[idx], y_pool.iloc[idx], Xt_val, y_val, n_threads))
+            for r in run_tasks(_fit_fold, todo, n_jobs=workers, deadline=deadline):
+                if r is None:
+                    continue
+                i, _, metrics, sec = r
+                metrics.pop("timing", None)
+                scores[i] = metrics[primary_metric]
+                trials.append({"params": configs[i], "rows": rows, "score": scores[i], "fit_sec": round(sec, 4),
+                               "cached": False})
+                scored.add(i)
+                out["fitted"] += 1
+                if use_store:
+                    store.put(keys[i], dataset=dataset_key, preprocess=pre_key, model=name, params=configs[i],
+                              rows=rows, score=scores[i], metrics=metrics, fit_sec=sec)
+            # configs without a score on this rung (cancelled at the deadline) drop out
+            rows_reached.update({i: rows for i in scored})
+            alive = [i for i in alive if i in scored]
+        if not alive:
+            continue
+        best = max(alive, key=lambda i: sign * scores[i])
+        out["candidates"][name] = {"best_params": configs[best], "best_score": scores[best],
+                                   "best_rows": rows_reached[best],
+                                   "trials": trials}
+    # the winner must have reached the largest rung any candidate reached, so scores are comparable
+    done = out["candidates"]
+    top = max((c["best_rows"] for c in done.values()), default=0)
+    finalists = [n for n, c in done.items() if c["best_rows"] == top]
+    out["winner"] = max(finalists, key=lambda n: sign * done[n]["best_score"]) if finalists else None
+    out["preprocess_sec"] = round(prep_sec, 4)
+    out["seconds"] = round(time.perf_counter() - t0, 4)
+    return out
+
+def fit_warm(store: Optional[TrialStore], state_key: Optional[str], resource: Optional[str],
+             problem: str, name: str, pipe, X_train, y_train, X_test, y_test):
+    """
+    _fit_candidate for warm-start-capable models: a cached fitted Pipeline for the same dataset,
+    preprocessing and params with as many trees/iterations is reused as is; one with fewer is grown
+    with warm_start (forests fit only the added trees, gradient boosting only the added iterations) and
+    cached again. Other models fit normally.
+    """
+    from src.automl_or_baseline import _fit_candidate, _metric
+    if store is None or state_key is None or resource is None:
+        return _fit_candidate(problem, name, pipe, X_train, y_train, X_test, y_test)
+    param = f"est__{resource}"
+    target = int(pipe.get_params()[param])
+    state = store.load_state(state_key)
+    cache = state is None or state["resource"] < target  # never replace a larger state with a smaller one
+    if state is None or state["resource"] > target:
+        name, model, metrics = _fit_candidate(problem, name, pipe, X_train, y_train, X_test, y_test)
+        metrics["warm_start"] = {"from": 0, "to": target}
+    else:
+        model = state["model"]
+        t0 = time.perf_counter()
+        if state["resource"] < target:
+            flag = param.rsplit("__", 1)[0] + "__warm_start"
+            model.set_params(**{param: target, flag: True})
+            model.steps[-1][1].fit(model[:-1].transform(X_train), y_train)
+            model.set_params(**{flag: False})
+        t1 = time.perf_counter()
+        y_pred = model.predict(X_test)
+        t2 = time.perf_counter()
+        metrics = _metric(problem, y_test, y_pred)
+        metrics["timing"] = {"fit_sec": round(t1 - t0, 4), "predict_sec": round(t2 - t1, 4),
+                             "predict_rows_per_sec": round(len(y_test) / (t2 - t1), 1) if t2 > t1 else None}
+        metrics["warm_start"] = {"from": state["resource"], "to": target}
+    if cache:
+        try:
+            store.save_state(state_key, model, target)
+        except Exception as e:  # full disk or an unpicklable model: it is already fitted, only the later reuse is lost
+            warnings.warn(f"warm-start state write failed ({type(e).__name__}): {e}")
+    return name, model, metrics
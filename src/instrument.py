@@ -0,0 +1,99 @@
+from __future__ import annotations
+import os, json, time, threading, functools
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional
+
+from src.io_utils import _peak_rss_mb
+
+class Recorder:
+    """
+    Per-run stage metrics: wall time, CPU time of the stage's thread, growth of the process peak RSS
+    and rows/sec. Stages may run concurrently (one thread each), so the RSS peak is shared between
+    overlapping stages and child-process CPU (loky workers) is not part of cpu_sec.
+    Optionally collects a Chrome trace and a merged cProfile.
+    """
+    def __init__(self, trace: bool = False, profile: bool = False):
+        self.t0 = time.perf_counter()
+        self.stages: Dict[str, Dict[str, Any]] = {}
+        self.events: List[Dict[str, Any]] = []  # Chrome trace "complete" events
+        self.trace, self.profile = trace, profile
+        self._stats = None  # pstats.Stats merged across stages
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    @contextmanager
+    def stage(self, name: str, rows: Optional[int] = None):
+        rec = {"rows": rows}
+        self._local.current = rec
+        prof = None
+        if self.profile:
+            import cProfile
+            prof = cProfile.Profile()
+            try:
+                prof.enable()
+            except ValueError:  # another profiler already active in this interpreter
+                prof = None
+        rss0, cpu0, start = _peak_rss_mb(), time.thread_time(), time.perf_counter()
+        try:
+            yield rec
+        finally:
+            end, cpu1, rss1 = time.perf_counter(), time.thread_time(), _peak_rss_mb()
+            if prof is not None:
+                prof.disable()
+            self._local.current = None
+            wall = end - start
+            rows = rec.pop("rows")
+            rec.update({
+                "start_sec": round(start - self.t0, 4),
+                "wall_sec": round(wall, 4),
+                "cpu_sec": round(cpu1 - cpu0, 4),
+                "peak_rss_mb": rss1,
+                "peak_rss_delta_mb": round(rss1 - rss0, 1) if rss0 is not None else None,
+                "rows": rows,
+                "rows_per_sec": round(rows / wall, 1) if rows and wall > 0 else None,
+            })
+            with self._lock:
+                self.stages[name] = rec
+                self.events.append({"name": name, "cat": "stage", "ph": "X", "pid": os.getpid(),
+                                    "tid": threading.get_ident(), "ts": round((start - self.t0) * 1e6),
+                                    "dur": round(wall * 1e6), "args": {k: v for k, v in rec.items() if v is not None}})
+                if prof is not None:
+                    import pstats
+                    if self._stats is None:
+                        self._stats = pstats.Stats(prof)
+                    else:
+                        self._stats.add(prof)
+
+    def note(self, **fields):
+        """
+        Attach fields (e.g. rows=len(df)) to the stage running in the calling thread.
+        """
+        rec = getattr(self._local, "current", None)
+        if rec is not None:
+            rec.update(fields)
+
+    def wrap(self, name: str, fn: Callable) -> Callable:
+        @functools.wraps(fn)
+        def run(*args, **kwargs):
+            with self.stage(name):
+                return fn(*args, **kwargs)
+        return run
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return dict(sorted(self.stages.items(), key=lambda kv: kv[1]["start_sec"]))
+
+    def export(self, run_id: str, log_dir: str = "logs") -> Dict[str, str]:
+        """
+        Write logs/trace_<run_id>.json (open in chrome://tracing or Perfetto) and
+        logs/profile_<run_id>.prof (pstats / snakeviz) when enabled; returns the paths written.
+        """
+        out = {}
+        if self.trace:
+            out["trace"] = os.path.join(log_dir, f"trace_{run_id}.json")
+            with open(out["trace"], "w") as f:
+                json.dump({"traceEvents": self.events, "displayTimeUnit": "ms"}, f)
+        if self.profile and self._stats is not None:
+            out["cprofile"] = os.path.join(log_dir, f"profile_{run_id}.prof")
+            self._stats.dump_stats(out["cprofile"])
+        return out
@@ -1,12 +1,269 @@
 from __future__ import annotations
-import os, json, time
+import os, io, json, time, hashlib, warnings
+import numpy as np
 import pandas as pd
+from typing import Dict
 
 RUN_TS = lambda: time.strftime("%Y%m%d-%H%M%S")
+CACHE_DIR = "artefacts/cache"
 
-def load_csv(path: str) -> pd.DataFrame:
-    df = pd.read_csv(path)
-    df = df.dropna(axis=1, how="all").dropna(axis=0, how="all") # drop fully empty rows and columns
+def _peak_rss_mb():
+    try:
+        import resource, sys
+    except ImportError:  # not available on Windows
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(rss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)  # bytes on macOS, KB on linux
+
+def _infer_schema(sample: pd.DataFrame, max_cat_ratio=0.5, max_categories=10000) -> dict:
+    """
+    Pick a compact dtype per column from a sample: 'int'/'float' numerics are downcast,
+    low-cardinality strings become 'category', anything else is left alone.
+    """
+    schema = {}
+    for c, t in sample.dtypes.items():
+        if pd.api.types.is_integer_dtype(t):
+            schema[c] = "int"
+        elif pd.api.types.is_float_dtype(t):
+            schema[c] = "float"
+        elif pd.api.types.is_object_dtype(t) or pd.api.types.is_string_dtype(t):
+            s = sample[c].dropna()
+            nun = s.nunique()
+            if len(s) and nun <= max_categories and nun <= max_cat_ratio * len(s):
+                schema[c] = "category"
+    return schema
+
+def _float32_if_exact(col: pd.Series):
+    # float32 only when every value survives the round trip (IDs/counts above 2**24 and values needing more
+    # than ~7 significant digits do not); None otherwise
+    values = col.to_numpy(dtype=np.float64)
+    f32 = values.astype(np.float32)
+    return pd.Series(f32, index=col.index, name=col.name) if np.array_equal(f32, values, equal_nan=True) else None
+
+def _compact(df: pd.DataFrame, schema: dict) -> pd.DataFrame:
+    for c, kind in schema.items():
+        if c not in df.columns:
+            continue
+        try:
+            if kind == "int":
+                col = pd.to_numeric(df[c], downcast="integer")
+                if not pd.api.types.is_integer_dtype(col):  # NaNs showed up: float32 if exact, else nullable Int64
+                    f32 = _float32_if_exact(col)
+                    col = f32 if f32 is not None else col.astype("Int64")
+                df[c] = col
+            elif kind == "float":
+                col = pd.to_numeric(df[c])
+                f32 = _float32_if_exact(col)
+                df[c] = f32 if f32 is not None else col.astype(np.float64)
+            elif kind == "category":
+                df[c] = df[c].astype("category")
+        except (ValueError, TypeError):
+            pass  # sample was not representative; keep the parsed dtype for this chunk
+    return df
+
+def _concat_chunks(chunks: list, keep_cols: list) -> pd.DataFrame:
+    # align categories across chunks so concat keeps the category dtype instead of falling back to object
+    for c in keep_cols:
+        if all(isinstance(ch[c].dtype, pd.CategoricalDtype) for ch in chunks):
+            cats = chunks[0][c].cat.categories
+            for ch in chunks[1:]:
+                cats = cats.union(ch[c].cat.categories)
+            for ch in chunks:
+                ch[c] = ch[c].cat.set_categories(cats)
+    return pd.concat([ch[keep_cols] for ch in chunks], ignore_index=True)
+
+def csv_column_kinds(path: str, sample_rows: int = 50_000, usecols=None) -> Dict[str, str]:
+    """
+    "int" / "float" / "text" per column, judged from the first sample_rows rows (the dtypes
+    iter_csv_chunks keeps stable across chunks; stored by refresh runs to read appended rows alike).
+    """
+    head = pd.read_csv(path, nrows=sample_rows, usecols=usecols)
+    return {c: "int" if pd.api.types.is_integer_dtype(t) else "float" if pd.api.types.is_numeric_dtype(t) else "text"
+            for c, t in head.dtypes.items()}
+
+class _ByteRange(io.RawIOBase):
+    # a binary file read from its current position up to byte `end`
+    def __init__(self, f, end: int):
+        self.f, self.left = f, end - f.tell()
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        n = self.f.readinto(memoryview(b)[:max(0, min(len(b), self.left))])
+        self.left -= n
+        return n
+
+def iter_csv_chunks(path: str, chunksize: int = 100_000, sample_rows: int = 50_000, usecols=None, *,
+                    kinds: Dict[str, str] | None = None, start: int = 0, end: int | None = None, first_row: int = 0):
+    """
+    Stream a CSV as frames with a stable dtype per column across chunks (numeric columns as int64, or
+    float64 once values are missing; everything else as strings; chosen from the first sample_rows
+    rows), so chunk profiles merge and a transformer fitted on one chunk accepts the next. The index
+    keeps the file row number.
+    start/end read only the rows in that byte range (start must be a line boundary after the header);
+    pass the kinds and first_row of the earlier read so the appended rows get the same dtypes and numbers.
+    """
+    kinds = kinds or csv_column_kinds(path, sample_rows, usecols)
+    if start:
+        f = open(path, "rb")
+        f.seek(start)
+        src = io.TextIOWrapper(io.BufferedReader(_ByteRange(f, end if end is not None else os.path.getsize(path))),
+                               encoding="utf-8", newline="")
+        reader = pd.read_csv(src, chunksize=chunksize, header=None, names=list(kinds),
+                             usecols=usecols, dtype={c: str for c, k in kinds.items() if k == "text"})
+    else:
+        src, reader = None, pd.read_csv(path, chunksize=chunksize, usecols=usecols)
+    try:
+        for chunk in reader:
+            chunk = chunk.dropna(axis=0, how="all")
+            if first_row:
+                chunk.index += first_row
+            for c in chunk.columns:
+                s = chunk[c]
+                if kinds.get(c, "text") != "text":
+                    if not pd.api.types.is_numeric_dtype(s):
+                        s = chunk[c] = pd.to_numeric(s, errors="coerce")  # stray text -> NaN
+                    if kinds[c] == "int" and not s.isna().any():
+                        chunk[c] = s.astype(np.int64)
+                    elif not pd.api.types.is_float_dtype(s):
+                        chunk[c] = s.astype(np.float64)
+                elif pd.api.types.is_numeric_dtype(s) or s.isna().all():
+                    chunk[c] = s.astype(object).where(s.isna(), s.astype(str))  # "123"-only chunk stays text
+            yield chunk
+    finally:
+        if src is not None:
+            src.close()
+
+def dataset_fingerprint(path: str, content_hash: bool = False) -> str:
+    """
+    Identify a dataset file by path + size + mtime, or by a hash of its bytes (survives copies/touches).
+    """
+    st = os.stat(path)
+    h = hashlib.sha1()
+    if content_hash:
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                h.update(block)
+        h.update(str(st.st_size).encode())
+    else:
+        h.update(json.dumps([os.path.abspath(path), st.st_size, st.st_mtime_ns]).encode())
+    return h.hexdigest()[:20]
+
+def _has_pyarrow() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+def _cache_read(fp: str) -> pd.DataFrame:
+    df = pd.read_parquet(fp) if fp.endswith(".parquet") else pd.read_pickle(fp)
+    os.utime(fp)  # bump mtime: eviction is least-recently-used by mtime
+    return df
+
+def _cache_write(df: pd.DataFrame, fp: str, max_mb: float):
+    tmp = fp + ".tmp"
+    if fp.endswith(".parquet"):
+        df.to_parquet(tmp)
+    else:
+        df.to_pickle(tmp)
+    os.replace(tmp, fp)  # atomic, so a concurrent run never reads a half-written file
+    evict_cache(os.path.dirname(fp), max_mb, keep=fp)
+
+def evict_cache(cache_dir: str, max_mb: float, keep: str | None = None):
+    """
+    Delete least-recently-used files until the cache directory is under max_mb.
+    """
+    files = [os.path.join(cache_dir, f) for f in os.listdir(cache_dir) if not f.endswith(".tmp")]
+    files = sorted(files, key=os.path.getmtime)
+    total = sum(os.path.getsize(f) for f in files)
+    for f in files:
+        if total <= max_mb * 2**20:
+            break
+        if f != keep:
+            total -= os.path.getsize(f)
+            os.remove(f)
+
+def load_csv(path: str, *, chunksize: int | None = None, engine: str | None = None,
+             compact: bool = False, sample_rows: int = 50_000, stats: dict | None = None,
+             cache_dir: str | None = None, cache_max_mb: float = 2048, content_hash: bool = False) -> pd.DataFrame:
+    """
+    Read a CSV and drop fully empty rows and columns.
+    chunksize streams the file: a compact schema is inferred from the first sample_rows rows
+    (downcast numerics, low-cardinality strings to category), empty rows are dropped per chunk and
+    empty columns from the accumulated non-null counts. engine='pyarrow' uses the multithreaded
+    pyarrow parser when installed (no chunking). compact applies the schema to a non-streamed read.
+    cache_dir keeps a Parquet (pickle without pyarrow) copy keyed by the file fingerprint and load
+    mode, so later loads skip CSV parsing; the directory is LRU-evicted down to cache_max_mb.
+    Pass a dict as stats to receive bytes read, rows, seconds, frame memory and peak RSS.
+    """
+    t0 = time.perf_counter()
+    if engine == "pyarrow" and not _has_pyarrow():
+        warnings.warn("pyarrow not installed, falling back to the default CSV parser")
+        engine = None
+
+    cache_fp = None
+    if cache_dir:
+        mode = f"{'compact' if (chunksize or compact) else 'plain'}-{engine or 'c'}"
+        ext = ".parquet" if _has_pyarrow() else ".pkl"
+        cache_fp = os.path.join(cache_dir, f"{dataset_fingerprint(path, content_hash)}-{mode}{ext}")
+        if os.path.exists(cache_fp):
+            df = _cache_read(cache_fp)
+            if stats is not None:
+                stats.update({"path": path, "cache": "hit", "cache_path": cache_fp,
+                              "bytes_read": os.path.getsize(cache_fp), "rows": int(df.shape[0]),
+                              "cols": int(df.shape[1]), "seconds": round(time.perf_counter() - t0, 3),
+                              "frame_mb": round(float(df.memory_usage(deep=True).sum()) / 2**20, 2),
+                              "peak_rss_mb": _peak_rss_mb()})
+            return df
+
+    n_chunks = 0
+    if chunksize and engine != "pyarrow":
+        schema = _infer_schema(pd.read_csv(path, nrows=sample_rows))
+        chunks, non_null = [], None
+        for chunk in pd.read_csv(path, chunksize=chunksize):
+            chunk = _compact(chunk.dropna(axis=0, how="all"), schema)
+            cnt = chunk.notna().sum()
+            non_null = cnt if non_null is None else non_null.add(cnt, fill_value=0)
+            chunks.append(chunk)
+            n_chunks += 1
+        if not chunks:
+            raise ValueError(f"{path} has no data rows")
+        keep = [c for c in chunks[0].columns if non_null[c] > 0]
+        df = _concat_chunks(chunks, keep)
+        del chunks
+    else:
+        df = pd.read_csv(path, engine=engine) if engine else pd.read_csv(path)
+        # one mask pass and one copy instead of two full-frame dropna copies
+        notna = df.notna()
+        cols = notna.any(axis=0)
+        rows = notna.loc[:, cols].any(axis=1)
+        df = df.loc[rows, cols]  # drop fully empty rows and columns
+        if compact:
+            df = _compact(df.copy(), _infer_schema(df.head(sample_rows)))
+
+    if cache_fp:
+        os.makedirs(cache_dir, exist_ok=True)
+        try:
+            _cache_write(df, cache_fp, cache_max_mb)
+        except Exception as e:  # the cache is an optimisation, never a reason to fail the run
+            warnings.warn(f"dataset cache write failed ({type(e).__name__}): {e}")
+            cache_fp = None
+
+    if stats is not None:
+        stats.update({
+            "path": path,
+            "cache": "miss" if cache_fp else "off",
+            "bytes_read": os.path.getsize(path),
+            "rows": int(df.shape[0]),
+            "cols": int(df.shape[1]),
+            "chunks": n_chunks,
+            "engine": engine or "c",
+            "seconds": round(time.perf_counter() - t0, 3),
+            "frame_mb": round(float(df.memory_usage(deep=True).sum()) / 2**20, 2),
+            "peak_rss_mb": _peak_rss_mb(),
+        })
     return df
 
 def detect_problem_type(df: pd.DataFrame, target: str) -> str:
@@ -28,4 +285,4 @@ def write_json(obj, path: str):
         json.dump(obj, f, indent=2)
 
 def save_run_log(run_id: str, log: dict):
-    write_json(log, f"logs/run_{run_id}.json")
\ No newline at end of file
+    write_json(log, f"logs/run_{run_id}.json")
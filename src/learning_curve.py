@@ -0,0 +1,119 @@
+from __future__ import annotations
+import time, numpy as np
+from typing import Any, Dict, List, Sequence, Tuple
+from sklearn.base import clone
+from sklearn.model_selection import train_test_split
+from src.preprocess import stratify_labels
+from src.cv_eval import LOWER_IS_BETTER, _prepare_fold, _fit_fold
+from src.parallel import run_tasks, resolve_n_jobs, threads_per_worker
+
+def _subsample(y, idx: np.ndarray, n: int, random_state: int) -> np.ndarray:
+    # stratified like make_splits; falls back to a plain random sample when a class is too rare
+    if n >= len(idx):
+        return idx
+    strat = stratify_labels(y.iloc[idx])
+    try:
+        sel, _ = train_test_split(idx, train_size=n, random_state=random_state, stratify=strat)
+    except ValueError:
+        sel, _ = train_test_split(idx, train_size=n, random_state=random_state)
+    return np.sort(sel)
+
+def _extrapolate(ns: Sequence[int], values: Sequence[float], n_full: int, log_y: bool = False) -> float:
+    """
+    Fit value = a + b*log(n) (log(value) for times, i.e. a power law) and evaluate at n_full.
+    """
+    if len(ns) < 2:
+        return float(values[-1]) * (n_full / ns[-1] if log_y else 1.0)  # one point: linear cost, flat score
+    x = np.log(np.asarray(ns, dtype=float))
+    y = np.log(np.maximum(values, 1e-9)) if log_y else np.asarray(values, dtype=float)
+    b, a = np.polyfit(x, y, 1)
+    v = a + b * np.log(n_full)
+    return float(np.exp(v)) if log_y else float(v)
+
+def select_by_learning_curve(problem: str, preprocessor, estimators: List[Tuple[str, Any]], X, y, *,
+                             fractions: Sequence[float] = (0.05, 0.1, 0.2, 0.4),
+                             min_rows: int = 1_000,
+                             val_rows: int = 50_000,
+                             primary_metric: str = "f1_macro",
+                             n_jobs: int | None = 1,
+                             random_state: int = 42,
+                             deadline: float | None = None) -> Dict[str, Any]:
+    """
+    Rank candidates on increasing stratified subsamples of the training rows, scored on a fixed
+    stratified validation slice. After each rung a learning curve (score vs log rows) is fitted per
+    candidate: candidates whose extrapolated full-data score cannot reach the leader's current score
+    are dropped, and selection stops once the same candidate leads on both the observed and the
+    extrapolated score for two rungs. Fit times are extrapolated the same way (power law) to estimate
+    what evaluating every candidate on all rows would have cost.
+    """
+    t0 = time.perf_counter()
+    sign = -1.0 if primary_metric in LOWER_IS_BETTER else 1.0
+    all_idx = np.arange(len(y))
+    n_val = min(val_rows, max(1, len(y) // 5))
+    val_idx = _subsample(y, all_idx, n_val, random_state)
+    pool_idx = np.setdiff1d(all_idx, val_idx)
+    n_full = len(y)
+    sizes = sorted({max(min_rows, int(f * len(pool_idx))) for f in fractions if int(f * len(pool_idx)) < len(pool_idx)})
+    sizes = [n for n in sizes if n < len(pool_idx)] or [len(pool_idx)]
+
+    workers = resolve_n_jobs(n_jobs, len(estimators))
+    n_threads = threads_per_worker(workers)
+    ests = dict(estimators)
+    alive = list(ests)
+    curves = {n: {"rows": [], "scores": [], "fit_sec": []} for n in ests}
+    rungs, eliminated, leaders = [], {}, []
+    extrapolated, stopped = {}, "rungs exhausted"
+    for r, n_rows in enumerate(sizes):
+        if deadline is not None and time.monotonic() >= deadline:
+            stopped = "deadline"
+            break
+        tr_idx = _subsample(y, pool_idx, n_rows, random_state + r)
+        prepared = _prepare_fold(preprocessor, X, y, tr_idx, val_idx)
+        Xt_tr, Xt_va, y_tr, y_va, prep_sec = prepared
+        tasks = [(problem, n, clone(ests[n]), r, Xt_tr, y_tr, Xt_va, y_va, n_threads) for n in alive]
+        done = [d for d in run_tasks(_fit_fold, tasks, n_jobs=workers, deadline=deadline) if d is not None]
+        rung = {"rows": int(n_rows), "prep_sec": round(float(prep_sec), 4), "scores": {}, "fit_sec": {}}
+        for name, _, metrics, sec in done:
+            curves[name]["rows"].append(int(n_rows))
+            curves[name]["scores"].append(float(metrics[primary_metric]))
+            curves[name]["fit_sec"].append(float(sec))
+            rung["scores"][name], rung["fit_sec"][name] = float(metrics[primary_metric]), round(float(sec), 4)
+        rungs.append(rung)
+        alive = [n for n in alive if n in rung["scores"]]  # unfinished at the deadline
+        if not alive:
+            stopped = "deadline"
+            break
+        extrapolated = {n: _extrapolate(curves[n]["rows"], curves[n]["scores"], n_full) for n in alive}
+        observed_best = max(alive, key=lambda n: sign * rung["scores"][n])
+        if r >= 1:  # curves need two points
+            floor = sign * rung["scores"][observed_best]
+            for n in list(alive):
+                if n != observed_best and sign * extrapolated[n] < floor:
+                    alive.remove(n)
+                    eliminated[n] = int(n_rows)
+        predicted_best = max(alive, key=lambda n: sign * extrapolated[n])
+        leaders.append(predicted_best if predicted_best == observed_best else None)
+        if len(alive) == 1:
+            stopped = "single candidate left"
+            break
+        if len(leaders) >= 2 and leaders[-1] is not None and leaders[-1] == leaders[-2]:
+            stopped = "ranking settled"
+            break
+
+    winner = max(alive, key=lambda n: sign * extrapolated[n]) if alive and extrapolated else None
+    spent = sum(rg["prep_sec"] + sum(rg["fit_sec"].values()) for rg in rungs)
+    full_cost = {n: round(_extrapolate(c["rows"], c["fit_sec"], n_full, log_y=True), 4)
+                 for n, c in curves.items() if c["rows"]}
+    return {
+        "metric": primary_metric,
+        "winner": winner,
+        "n_train": int(n_full),
+        "val_rows": int(len(val_idx)),
+        "rungs": rungs,
+        "stopped": stopped,
+        "eliminated_at_rows": eliminated,
+        "extrapolated_full_score": {n: round(v, 6) for n, v in extrapolated.items()},
+        "estimated_full_fit_sec": full_cost,
+        "selection_fit_sec": round(spent, 4),
+        "selection_wall_sec": round(time.perf_counter() - t0, 4),
+    }
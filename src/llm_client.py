@@ -0,0 +1,148 @@
+from __future__ import annotations
+import os, json, time, hashlib, threading, warnings
+from typing import Any, Callable, Dict
+
+CACHE_DIR = "artefacts/llm_cache"
+
+_lock = threading.Lock()
+_clients: Dict[str, Any] = {}
+_calls: list = []  # one entry per generate() call, for the run log
+
+class GeminiBackend:
+    """
+    Google Gemini via google-generativeai; the SDK is only imported when this backend is used.
+    """
+    def __init__(self):
+        api_key = os.getenv("GOOGLE_API_KEY")
+        if not api_key:
+            raise RuntimeError("GOOGLE_API_KEY not set")
+        import google.generativeai as genai
+        genai.configure(api_key=api_key)
+        self.model_name = os.getenv("GEMINI_MODEL", "gemini-1.5-flash")
+        self._model = genai.GenerativeModel(self.model_name, generation_config={"temperature": 0.2})
+
+    def generate(self, prompt: str, kind: str) -> str:
+        resp = self._model.generate_content(prompt)
+        # safety block handling
+        if hasattr(resp, "prompt_feedback") and getattr(resp.prompt_feedback, "block_reason", None):
+            raise RuntimeError(f"Gemini blocked: {resp.prompt_feedback.block_reason}")
+        # handle possible SDK shapes
+        text = getattr(resp, "text", None)
+        if not text:
+            try:
+                text = resp.candidates[0].content.parts[0].text
+            except Exception:
+                text = ""
+        return text or ""
+
+class StubBackend:
+    """
+    Offline provider. Serves LLM_STUB_DIR/<prompt sha256>.txt or LLM_STUB_DIR/<kind>.txt when present,
+    otherwise a minimal default (an empty JSON object for plan/repair, so the planner falls back to
+    its defaults).
+    """
+    model_name = "stub"
+
+    def __init__(self):
+        self.stub_dir = os.getenv("LLM_STUB_DIR", "")
+
+    def generate(self, prompt: str, kind: str) -> str:
+        if self.stub_dir:
+            sha = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+            for name in (f"{sha}.txt", f"{kind}.txt"):
+                fp = os.path.join(self.stub_dir, name)
+                if os.path.exists(fp):
+                    with open(fp, encoding="utf-8") as f:
+                        return f.read()
+        if kind in ("plan", "repair"):
+            return "{}"
+        return "Narrative generated offline by the stub LLM backend; no model was called."
+
+BACKENDS: Dict[str, Callable[[], Any]] = {"gemini": GeminiBackend, "stub": StubBackend}
+
+def register_backend(name: str, factory: Callable[[], Any]):
+    """
+    Plug in another provider: factory() returns an object with .model_name and .generate(prompt, kind).
+    """
+    BACKENDS[name] = factory
+
+def get_client(name: str | None = None):
+    """
+    Process-wide client per backend (LLM_BACKEND, default gemini); configured once, reused by every call.
+    """
+    name = name or os.getenv("LLM_BACKEND", "gemini")
+    with _lock:
+        if name not in _clients:
+            if name not in BACKENDS:
+                raise RuntimeError(f"unknown LLM backend '{name}' (known: {sorted(BACKENDS)})")
+            _clients[name] = BACKENDS[name]()
+        return _clients[name]
+
+def _cache_path(model_name: str, prompt: str) -> str:
+    key = hashlib.sha256(f"{model_name}\n{prompt}".encode("utf-8")).hexdigest()
+    return os.path.join(CACHE_DIR, f"{key}.json")
+
+def _evict(max_entries: int, max_mb: float):
+    # oldest entries first, down to max_entries and then to max_mb on disk
+    from src.io_utils import evict_cache
+    files = sorted((os.path.join(CACHE_DIR, f) for f in os.listdir(CACHE_DIR) if f.endswith(".json")),
+                   key=os.path.getmtime)
+    for f in files[:max(0, len(files) - max_entries)]:
+        os.remove(f)
+    evict_cache(CACHE_DIR, max_mb)
+
+def generate(prompt: str, kind: str = "text") -> str:
+    """
+    Send a prompt through the shared client, answering from the on-disk response cache
+    (keyed by model name + prompt hash, LLM_CACHE_TTL_SEC / LLM_CACHE_MAX_ENTRIES / LLM_CACHE_MAX_MB)
+    when possible. A failed cache write only warns: the response is returned either way.
+    """
+    client = get_client()
+    use_cache = os.getenv("LLM_CACHE", "1") == "1" and not isinstance(client, StubBackend)
+    ttl = float(os.getenv("LLM_CACHE_TTL_SEC", str(7 * 24 * 3600)))
+    t0 = time.perf_counter()
+    fp = _cache_path(client.model_name, prompt)
+    if use_cache and os.path.exists(fp) and time.time() - os.path.getmtime(fp) <= ttl:
+        try:
+            with open(fp, encoding="utf-8") as f:
+                text = json.load(f)["text"]
+            _record(kind, True, time.perf_counter() - t0)
+            return text
+        except (OSError, ValueError, KeyError):
+            pass  # unreadable entry: fall through and refresh it
+
+    text = client.generate(prompt, kind)
+    _record(kind, False, time.perf_counter() - t0)
+    if use_cache and text:
+        tmp = f"{fp}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"model": client.model_name, "kind": kind, "created": time.time(), "text": text}, f)
+            os.replace(tmp, fp)
+            _evict(int(os.getenv("LLM_CACHE_MAX_ENTRIES", "500")), float(os.getenv("LLM_CACHE_MAX_MB", "50")))
+        except OSError as e:  # full or read-only cache dir: the LLM already answered, so the caller still gets it
+            warnings.warn(f"LLM response cache write failed ({type(e).__name__}): {e}")
+            if os.path.exists(tmp):
+                os.remove(tmp)
+    return text
+
+def _record(kind: str, cached: bool, latency: float):
+    with _lock:
+        _calls.append({"kind": kind, "cached": cached, "latency_sec": round(latency, 4)})
+
+def stats() -> Dict[str, Any]:
+    """
+    Latency and cache hit rate of the calls made so far in this process.
+    """
+    with _lock:
+        calls = list(_calls)
+    hits = sum(c["cached"] for c in calls)
+    return {
+        "backend": os.getenv("LLM_BACKEND", "gemini"),
+        "calls": len(calls),
+        "cache_hits": hits,
+        "hit_rate": round(hits / len(calls), 3) if calls else None,
+        "latency_sec_total": round(sum(c["latency_sec"] for c in calls), 4),
+        "detail": calls,
+    }
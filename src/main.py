@@ -1,14 +1,30 @@
 from __future__ import annotations
-import os, argparse, joblib, json
+import os, sys, argparse, json, subprocess
 from dotenv import load_dotenv
 load_dotenv()
 
-from src.io_utils import ensure_dirs, load_csv, detect_problem_type, RUN_TS, write_json, save_run_log
-from src.eda import quick_overview, plot_distribution
-from src.preprocess import split_xy, build_transformer, make_splits
-from src.automl_or_baseline import run_automl_or_baseline
-from src.report_md import make_markdown
-from src.agent import plan as agent_plan, repair as agent_repair
+# only light modules at import time: sklearn, matplotlib/seaborn, tabulate and the LLM SDK are
+# imported inside the stage that needs them, so `--help`, `--no-eda` and fallback-plan runs stay fast
+from src.io_utils import ensure_dirs, load_csv, detect_problem_type, RUN_TS, write_json, save_run_log, CACHE_DIR
+from src.dag import run_dag
+from src.instrument import Recorder
+
+# stage modules in the order the pipeline first needs them (for --profile-startup)
+STAGE_MODULES = ["src.data_profile", "src.eda", "src.correlation", "matplotlib.backends.backend_agg", "seaborn",
+                 "src.agent", "src.preprocess", "src.automl_or_baseline", "src.artefacts", "src.llm_narrative",
+                 "src.report_md", "google.generativeai"]
+
+# imported once before the DAG starts: two stage threads importing scipy/sklearn for the first time at the same
+# moment can see a partially initialised module (ImportError). Plotting libraries and the LLM SDK stay lazy
+DAG_IMPORTS = ["scipy.sparse", "scipy.stats", "scipy.cluster.hierarchy", "scipy.spatial.distance",
+               "sklearn.compose", "sklearn.ensemble", "sklearn.linear_model", "sklearn.naive_bayes",
+               "sklearn.neural_network", "src.data_profile", "src.eda", "src.correlation", "src.agent",
+               "src.preprocess", "src.cv_eval", "src.automl_or_baseline", "src.artefacts", "src.streaming",
+               "src.memo", "src.report_md"]
+# settings that change the fitted model (besides the plan); part of the model stage's memo key
+MODEL_ENV = ("AGENT_SHARE_PREPROCESSING", "AGENT_CV_FOLDS", "AGENT_ENFORCE_BUDGET", "AGENT_SELECTION",
+             "AGENT_SUBSAMPLE_MIN_ROWS", "AGENT_HPO_TRIALS", "AGENT_STREAM_EPOCHS", "AGENT_STREAM_CHUNKSIZE",
+             "AGENT_MODEL_PRUNE_TOL", "AGENT_MODEL_MAX_DEPTH")
 
 def maybe_make_narrative(dsname, problem, overview, metrics, model_name):
     if os.getenv("ENABLE_LLM_NARRATIVE","0") != "1":
@@ -20,152 +36,439 @@ def maybe_make_narrative(dsname, problem, overview, metrics, model_name):
         print(f"[warn] LLM narrative disabled due to: {e}")
         return None
 
-def main(csv_path: str, target: str, dataset_name: str|None=None):
+def _fallback_plan(problem: str, n_rows: int = 0) -> dict:
+    # Always have a safe default plan
+    from src.models import default_candidates
+    return {
+        "preprocess": {
+            "impute_numeric": "median",
+            "impute_categorical": "most_frequent",
+            "scale_numeric": True,
+            "one_hot_encode": True,
+            "high_cardinality_encoding": "target",
+            "onehot_max_cardinality": 50,
+            "onehot_min_frequency": None,
+            "drop_id_columns": True
+        },
+        "modeling": {
+            "strategy": "baseline",
+            "candidates": default_candidates(problem, n_rows)
+        },
+        "evaluation": {
+            "primary_metric": "f1_macro" if problem == "classification" else "rmse",
+            "cv_folds": 5
+        },
+        "time_budget_sec": 180
+    }
+
+def import_stage_modules():
+    import importlib
+    for m in DAG_IMPORTS:
+        importlib.import_module(m)
+
+def _memoized(memo, name, fn, key_fn, data, valid, stage_log, memo_log, run_id):
+    """
+    Wrap a stage so its result is read from the memo store when the stage's inputs (data identity,
+    key_fn(**deps), library versions, code) hash to a result of an earlier run. stage_log is the
+    stage's own log dict: it is stored with the result and restored on a hit.
+    """
+    def run(**deps):
+        key = memo.key(name, data, key_fn(**deps))
+        hit = memo.get(name, key)
+        if hit is not None and (valid is None or valid(hit["value"])):
+            stage_log.update(hit["log"])
+            memo_log[name] = {"hit": True, "from_run": hit["run_id"], "key": key}
+            return hit["value"]
+        value = fn(**deps)
+        memo.put(name, key, {"value": value, "run_id": run_id, "log": dict(stage_log)})
+        memo_log[name] = {"hit": False, "key": key}
+        return value
+    return run
+
+def main(csv_path: str, target: str, dataset_name: str|None=None, use_cache: bool=True,
+         run_id: str|None=None, eda: bool=True) -> dict:
+    """
+    Run the pipeline as a DAG of stages: plotting, planning and the train/test split run
+    concurrently, the narrative is drafted while artefacts are written, so end-to-end latency
+    follows the critical path (load -> profile -> plan -> transformer -> model -> report).
+    eda=False skips correlations and plots (the plotting libraries are never imported).
+    Returns a short summary of the run (used by src.batch).
+    """
     ensure_dirs()
-    run_id = RUN_TS()
+    import_stage_modules()
+    run_id = run_id or RUN_TS()
     log = {"run_id": run_id, "steps": []}
+    dsname = dataset_name or os.path.splitext(os.path.basename(csv_path))[0]
+    n_jobs = int(os.getenv("AGENT_N_JOBS", "-1"))  # worker processes for plots and candidate fits (-1 = all cores)
+    # wall/CPU/RSS/rows per stage; AGENT_TRACE=1 adds a Chrome trace, AGENT_CPROFILE=1 a merged cProfile
+    low_memory = os.getenv("AGENT_LOW_MEMORY", "0") == "1"  # float32 blocks, one compact matrix
+    rec = Recorder(trace=os.getenv("AGENT_TRACE", "0") == "1", profile=os.getenv("AGENT_CPROFILE", "0") == "1")
+    # out-of-core mode: the CSV is never loaded whole; it is profiled by chunks and trained with partial_fit
+    streaming = os.getenv("AGENT_STREAMING", "auto")
+    file_mb = os.path.getsize(csv_path) / 2**20
+    out_of_core = streaming == "1" or (streaming == "auto" and file_mb > float(os.getenv("AGENT_STREAMING_MB", "2048")))
+    stream_chunksize = int(os.getenv("AGENT_STREAM_CHUNKSIZE", "100000"))
+    # data identity shared by the stage memo, the candidate memo and the trial store; --no-cache disables all
+    memo = dataset_key = None
+    hpo_trials = int(os.getenv("AGENT_HPO_TRIALS", "0"))  # configs per candidate (0 = fixed hyperparameters)
+    if use_cache and (hpo_trials or os.getenv("AGENT_MEMO", "1") == "1"):
+        from src.io_utils import dataset_fingerprint
+        dataset_key = f"{dataset_fingerprint(csv_path, os.getenv('AGENT_CACHE_CONTENT_HASH', '0') == '1')}:{target}"
+    if use_cache and os.getenv("AGENT_MEMO", "1") == "1":
+        from src.memo import MemoStore, MEMO_DIR
+        memo = MemoStore(MEMO_DIR, max_mb=float(os.getenv("AGENT_MEMO_MAX_MB", "2048")))
+    memo_log = {}
+    # each stage writes only its own entries; they are merged into the run log after the DAG, so no
+    # stage iterates a dict another thread is writing to
+    logs = {}
 
-    df = load_csv(csv_path)
-    assert target in df.columns, f"Target '{target}' not in columns"
+    def load():
+        if out_of_core:
+            logs["load"]["load"] = {"path": csv_path, "mode": "streaming", "file_mb": round(file_mb, 2)}
+            return None
+        load_stats = {}
+        chunksize = int(os.getenv("AGENT_CSV_CHUNKSIZE", "0")) or None  # stream the CSV in chunks with compact dtypes
+        df = load_csv(csv_path, chunksize=chunksize, engine=os.getenv("AGENT_CSV_ENGINE") or None,
+                      compact=os.getenv("AGENT_CSV_COMPACT", "0") == "1", stats=load_stats,
+                      # parsed-dataset cache keyed by path+size+mtime (or content hash); --no-cache bypasses it
+                      cache_dir=CACHE_DIR if use_cache and os.getenv("AGENT_DATA_CACHE", "1") == "1" else None,
+                      cache_max_mb=float(os.getenv("AGENT_CACHE_MAX_MB", "2048")),
+                      content_hash=os.getenv("AGENT_CACHE_CONTENT_HASH", "0") == "1")
+        logs["load"]["load"] = load_stats
+        rec.note(rows=len(df))
+        assert target in df.columns, f"Target '{target}' not in columns"
+        return df
 
-    problem = detect_problem_type(df, target)
-    overview = quick_overview(df, target)
-    plots = plot_distribution(df, target)
-    log["overview"] = {k: v for k,v in overview.items() if k in ["n_rows","n_cols","dtypes"]}
+    def profile(load):
+        from src.data_profile import profile_frame, profile_chunks
+        from src.eda import quick_overview
+        if load is None:  # mergeable per-chunk profiles; the problem type is read off the row sample
+            from src.io_utils import iter_csv_chunks
+            prof = profile_chunks(iter_csv_chunks(csv_path, stream_chunksize), target)
+            assert target in prof.columns, f"Target '{target}' not in columns"
+            problem = detect_problem_type(prof.sample, target)
+        else:
+            problem = detect_problem_type(load, target)
+            prof = profile_frame(load, target)  # one pass; shared by EDA, preprocessing, planner and report
+        rec.note(rows=prof.n_rows)
+        overview = quick_overview(load, target, profile=prof)
+        logs["profile"]["overview"] = {k: v for k,v in overview.items() if k in ["n_rows","n_cols","dtypes"]}
+        return problem, prof, overview
+
+    def plots(load, profile):
+        if not eda:
+            return {"pairs": []}, []
+        from src.correlation import correlation_summary
+        from src.eda import plot_distribution, PLOT_DIR
+        prof = profile[1]
+        rec.note(rows=prof.n_rows)
+        data = load if load is not None else prof.sample  # out-of-core: the profile's row sample
+        corr = correlation_summary(data, prof.numeric_cols)  # blocked float32, top pairs only
+        logs["plots"]["correlation_top_pairs"] = corr["pairs"]
+        # per-dataset plot folder so unchanged charts are recognised and skipped on re-runs
+        paths = plot_distribution(load, target, profile=prof, out_dir=os.path.join(PLOT_DIR, dsname),
+                                  max_plots=int(os.getenv("AGENT_MAX_PLOTS", "20")), n_jobs=n_jobs, corr=corr)
+        return corr, paths
 
     # ==== Agent Planning ====
-    try:
-        pl = agent_plan(overview, problem)
-        log["plan_initial"] = pl
-    except Exception as e:
-        # Always set a safe default plan so `pl` exists
-        print(f"[plan] error: {e}")
-        pl = {
-            "preprocess": {
-                "impute_numeric": "median",
-                "impute_categorical": "most_frequent",
-                "scale_numeric": True,
-                "one_hot_encode": True
-            },
-            "modeling": {
-                "strategy": "baseline",
-                "candidates": [
-                    "RandomForestClassifier" if problem == "classification" else "RandomForestRegressor",
-                    "LogisticRegression" if problem == "classification" else "Ridge"
-                ]
-            },
-            "evaluation": {
-                "primary_metric": "f1_macro" if problem == "classification" else "rmse",
-                "cv_folds": 5
-            },
-            "time_budget_sec": 180
-        }
-        log["plan_initial_error"] = str(e)
-        log["plan_initial_fallback"] = pl
-
-    # ---- Sanitize plan: task-correct & keep up to 2 candidates ----
-    if problem == "classification":
-        allowed = {"LogisticRegression", "RandomForestClassifier"}
-        pl["evaluation"]["primary_metric"] = "f1_macro"
-    else:
-        allowed = {"Ridge", "RandomForestRegressor"}
-        pl["evaluation"]["primary_metric"] = "rmse"
-
-    cands = pl["modeling"].get("candidates", [])
-    filtered = [c for c in cands if c in allowed]
-    if not filtered:
-        filtered = list(allowed)  # default for safety
-
-    max_cands = int(os.getenv("AGENT_MAX_CANDIDATES", "2"))
-    seen = set()
-    pl["modeling"]["candidates"] = [x for x in filtered if not (x in seen or seen.add(x))][:max_cands]
+    def plan(profile):
+        problem, _, overview = profile
+        try:
+            if os.getenv("ENABLE_LLM_PLAN", "1") != "1":
+                raise RuntimeError("LLM planning disabled (ENABLE_LLM_PLAN=0)")
+            from src.agent import plan as agent_plan
+            pl = agent_plan(overview, problem)
+            logs["plan"]["plan_initial"] = pl
+        except Exception as e:
+            print(f"[plan] error: {e}")
+            pl = _fallback_plan(problem, overview.get("n_rows", 0))
+            logs["plan"]["plan_initial_error"] = str(e)
+            logs["plan"]["plan_initial_fallback"] = pl
+
+        # ---- Sanitize plan: task-correct & keep up to 2 candidates ----
+        if out_of_core:
+            pl["modeling"]["strategy"] = "streaming"  # the data does not fit in memory
+        from src.models import candidate_names, default_candidates
+        strategy = pl["modeling"].get("strategy", "baseline")
+        pl["evaluation"]["primary_metric"] = "f1_macro" if problem == "classification" else "rmse"
+        allowed = set(candidate_names(problem, strategy))
+
+        cands = pl["modeling"].get("candidates", [])
+        filtered = [c for c in cands if c in allowed]
+        if not filtered:
+            filtered = default_candidates(problem, overview.get("n_rows", 0), strategy)  # default for safety
+
+        max_cands = int(os.getenv("AGENT_MAX_CANDIDATES", "2"))
+        seen = set()
+        pl["modeling"]["candidates"] = [x for x in filtered if not (x in seen or seen.add(x))][:max_cands]
+        return pl
+
+    # the split does not depend on the plan, so it runs while the planner is waiting on the LLM
+    def split(load, profile):
+        if load is None:
+            return None
+        from src.preprocess import split_xy, make_splits
+        rec.note(rows=len(load))
+        X, y = split_xy(load, target)
+        return (X, y, *make_splits(X, y))
 
     # ==== Execute with guardrails + one repair attempt per stage ====
-    try:
-        X, y = split_xy(df, target)
-        pre, *_ = build_transformer(
-            X,
-            impute_numeric=pl["preprocess"]["impute_numeric"],
-            impute_categorical=pl["preprocess"]["impute_categorical"],
-            scale_numeric=pl["preprocess"]["scale_numeric"],
-            one_hot_encode=pl["preprocess"]["one_hot_encode"],
-        )
-    except Exception as e:
-        log["repair_preprocess_error"] = str(e)
-        try:
-            patch = agent_repair("preprocess", str(e), problem)
-            log["repair_preprocess_patch"] = patch
-            pp = {**pl["preprocess"], **patch.get("preprocess", {})}
-            pre, *_ = build_transformer(
+    def transformer(profile, plan, split):
+        from src.preprocess import build_transformer
+        from src.agent import repair as agent_repair
+        problem, prof, _ = profile
+        # column typing/cardinality only; out-of-core runs use the profile's row sample
+        pl, X = plan, split[0] if split is not None else prof.sample.drop(columns=[target])
+
+        def build(pp):
+            pre, _, _, routing = build_transformer(
                 X,
                 impute_numeric=pp["impute_numeric"],
                 impute_categorical=pp["impute_categorical"],
                 scale_numeric=pp["scale_numeric"],
                 one_hot_encode=pp["one_hot_encode"],
+                # cardinality-aware encoding; fallback/repair plans may omit these keys
+                high_cardinality_encoding=pp.get("high_cardinality_encoding", "target"),
+                onehot_max_cardinality=pp.get("onehot_max_cardinality", 50),
+                onehot_min_frequency=pp.get("onehot_min_frequency"),
+                drop_id_columns=pp.get("drop_id_columns", True),
+                low_memory=low_memory,
+                profile=prof,
             )
-            pl["preprocess"] = pp
-        except Exception as e2:
-            log["repair_preprocess_failed"] = str(e2)
-            raise
-
-    X_tr, X_te, y_tr, y_te = make_splits(X, y)
+            logs["transformer"]["encoding"] = routing
+            return pre
 
-    try:
-        model, metrics, model_name = run_automl_or_baseline(
-            problem, pre, X_tr, y_tr, X_te, y_te,
-            strategy=pl["modeling"].get("strategy","baseline"),
-            candidates=pl["modeling"].get("candidates"),
-            time_budget_sec=int(pl.get("time_budget_sec",180))
-        )
-    except Exception as e:
-        log["repair_modeling_error"] = str(e)
         try:
-            patch = agent_repair("modeling", str(e), problem)
-            log["repair_modeling_patch"] = patch
-            # Adjust strategy/candidates
-            md = {**pl["modeling"], **patch.get("modeling", {})}
-            model, metrics, model_name = run_automl_or_baseline(
+            pre = build(pl["preprocess"])
+        except Exception as e:
+            logs["transformer"]["repair_preprocess_error"] = str(e)
+            try:
+                patch = agent_repair("preprocess", str(e), problem)
+                logs["transformer"]["repair_preprocess_patch"] = patch
+                pp = {**pl["preprocess"], **patch.get("preprocess", {})}
+                pre = build(pp)
+                pl["preprocess"] = pp
+            except Exception as e2:
+                logs["transformer"]["repair_preprocess_failed"] = str(e2)
+                raise
+        return pre
+
+    def model(profile, plan, split, transformer):
+        from src.automl_or_baseline import run_automl_or_baseline
+        from src.agent import repair as agent_repair
+        problem, pl, pre = profile[0], plan, transformer
+        share_pre = os.getenv("AGENT_SHARE_PREPROCESSING", "1") == "1"  # fit the transformer once for all candidates
+        cv_folds = int(os.getenv("AGENT_CV_FOLDS", pl["evaluation"].get("cv_folds", 5)))  # 0/1 = single holdout split
+        enforce_budget = os.getenv("AGENT_ENFORCE_BUDGET", "1") == "1"  # apply time_budget_sec to baselines too
+        selection = os.getenv("AGENT_SELECTION", "auto")  # full / subsample (learning curves) / auto by row count
+        store = None
+        if hpo_trials and use_cache:  # trials and warm-start states shared across runs on the same data
+            from src.hpo import TrialStore, TRIAL_DIR
+            store = TrialStore(os.getenv("AGENT_TRIAL_STORE", TRIAL_DIR),
+                               max_mb=float(os.getenv("AGENT_TRIAL_CACHE_MAX_MB", "1024")))
+
+        def fit(md):
+            if md.get("strategy") == "streaming":
+                import time
+                from src.streaming import run_streaming
+                rec.note(rows=profile[1].n_rows)
+                budget = int(pl.get("time_budget_sec", 180))
+                return run_streaming(problem, pre, csv_path, target, md.get("candidates"),
+                                     chunksize=stream_chunksize,
+                                     epochs=int(os.getenv("AGENT_STREAM_EPOCHS", "1")),
+                                     deadline=time.monotonic() + budget if enforce_budget else None)
+            if split is None:
+                raise RuntimeError("data is streamed (out-of-core); only strategy='streaming' can train on it")
+            _, _, X_tr, X_te, y_tr, y_te = split
+            rec.note(rows=len(X_tr))  # training rows
+            if selection == "auto":
+                big = len(X_tr) >= int(os.getenv("AGENT_SUBSAMPLE_MIN_ROWS", "200000"))
+                mode = "subsample" if big else "full"
+            else:
+                mode = selection
+            return run_automl_or_baseline(
                 problem, pre, X_tr, y_tr, X_te, y_te,
                 strategy=md.get("strategy","baseline"),
                 candidates=md.get("candidates"),
-                time_budget_sec=int(pl.get("time_budget_sec",180))
+                time_budget_sec=int(pl.get("time_budget_sec",180)),
+                n_jobs=n_jobs,
+                share_preprocessing=share_pre,
+                cv_folds=cv_folds,
+                primary_metric=pl["evaluation"]["primary_metric"],
+                enforce_budget=enforce_budget,
+                selection=mode,
+                hpo_trials=hpo_trials,
+                trial_store=store,
+                dataset_key=dataset_key,
+                memo=memo
             )
-            pl["modeling"] = md
-        except Exception as e2:
-            log["repair_modeling_failed"] = str(e2)
-            raise
+
+        def reduce(result):
+            # opt-in size reduction of tree models, judged on a slice of the training rows (needs the
+            # in-memory split); the reduced model is re-scored on the test split, so the run's metrics
+            # are those of the model that is saved
+            tol, depth = os.getenv("AGENT_MODEL_PRUNE_TOL"), int(os.getenv("AGENT_MODEL_MAX_DEPTH", "0"))
+            if split is None or not (tol or depth):
+                return result
+            from src.artefacts import reduce_model
+            from src.automl_or_baseline import _metric
+            pipe, metrics, name = result
+            _, _, X_train, X_test, y_train, y_test = split
+            primary = pl["evaluation"]["primary_metric"]
+            pipe, reduction = reduce_model(pipe, problem, X_train, y_train, primary_metric=primary,
+                                           tolerance=float(tol or 0), max_depth=depth or None)
+            scores = _metric(problem, y_test, pipe.predict(X_test))
+            reduction["test"] = {"before": metrics.get(primary), "after": scores[primary]}
+            return pipe, {**metrics, **scores, "reduction": reduction}, name
+
+        try:
+            return reduce(fit(pl["modeling"]))
+        except Exception as e:
+            logs["model"]["repair_modeling_error"] = str(e)
+            try:
+                patch = agent_repair("modeling", str(e), problem)
+                logs["model"]["repair_modeling_patch"] = patch
+                # Adjust strategy/candidates
+                md = {**pl["modeling"], **patch.get("modeling", {})}
+                result = reduce(fit(md))
+                pl["modeling"] = md
+                return result
+            except Exception as e2:
+                logs["model"]["repair_modeling_failed"] = str(e2)
+                raise
 
     # Save artifacts
-    os.makedirs("artefacts", exist_ok=True)
-    import joblib
-    joblib.dump(model, f"artefacts/best_model_{run_id}.pkl")
-    write_json(metrics, f"artefacts/metrics_{run_id}.json")
+    def save(model):
+        from src.artefacts import save_model
+        os.makedirs("artefacts", exist_ok=True)
+        pipe, metrics, name = model
+        # size, write/load time and mapped MB of the saved model; AGENT_MODEL_VERIFY=1 also reloads compressed ones
+        logs["save"]["artefact"] = save_model(pipe, f"artefacts/best_model_{run_id}.pkl",
+                                              compress=os.getenv("AGENT_MODEL_COMPRESS", "0"),
+                                              extra={"model": name, "reduction": metrics.get("reduction")},
+                                              verify=os.getenv("AGENT_MODEL_VERIFY", "0") == "1")
+        write_json(metrics, f"artefacts/metrics_{run_id}.json")
 
-    dsname = dataset_name or os.path.splitext(os.path.basename(csv_path))[0]
-    narrative = maybe_make_narrative(dsname, problem, overview, metrics, model_name)
+    def narrative(profile, model):
+        return maybe_make_narrative(dsname, profile[0], profile[2], model[1], model[2])
 
     # Write report (now with decisions)
-    agent_decisions_md = "```json\n" + json.dumps({
-        "plan": pl,
-        "repairs": {k:v for k,v in log.items() if k.startswith("repair")}
-    }, indent=2) + "\n```"
+    def report(profile, plots, plan, model, narrative, save):
+        from src.report_md import make_markdown
+        problem, _, overview = profile
+        (corr, paths), (_, metrics, model_name) = plots, model
+        # transformer and model (the stages that repair) have finished: their logs are no longer written
+        repairs = {k: v for name in ("transformer", "model") for k, v in logs[name].items() if k.startswith("repair")}
+        agent_decisions_md = "```json\n" + json.dumps({
+            "plan": plan,
+            "repairs": repairs
+        }, indent=2) + "\n```"
 
-    md = make_markdown(dsname, problem, overview, plots, model_name, metrics, narrative=narrative)
-    md += "\n\n## Agent Decisions\n" + agent_decisions_md + "\n"
-    report_path = f"reports/{dsname}_{run_id}.md"
-    with open(report_path, "w", encoding="utf-8") as f:
-        f.write(md)
+        md = make_markdown(dsname, problem, overview, paths, model_name, metrics, narrative=narrative,
+                           corr_pairs=corr["pairs"], stage_timings=rec.summary())
+        md += "\n\n## Agent Decisions\n" + agent_decisions_md + "\n"
+        report_path = f"reports/{dsname}_{run_id}.md"
+        with open(report_path, "w", encoding="utf-8") as f:
+            f.write(md)
+        return report_path
+
+    stages = {
+        "load": (load, []),
+        "profile": (profile, ["load"]),
+        "plots": (plots, ["load", "profile"]),
+        "plan": (plan, ["profile"]),
+        "split": (split, ["load", "profile"]),
+        "transformer": (transformer, ["profile", "plan", "split"]),
+        "model": (model, ["profile", "plan", "split", "transformer"]),
+        "save": (save, ["model"]),
+        "narrative": (narrative, ["profile", "model"]),
+        "report": (report, ["profile", "plots", "plan", "model", "narrative", "save"]),
+    }
+    logs.update({name: {} for name in stages})
+    if memo is not None:
+        # load options change dtypes, so they are part of the data identity
+        data = [dataset_key, out_of_core, [os.getenv(k) for k in ("AGENT_CSV_CHUNKSIZE", "AGENT_CSV_ENGINE", "AGENT_CSV_COMPACT")]]
+        planner = [os.getenv(k) for k in ("ENABLE_LLM_PLAN", "LLM_BACKEND", "GEMINI_MODEL", "LLM_STUB_DIR",
+                                          "AGENT_MAX_CANDIDATES")]
+        memo_keys = {
+            "profile": lambda load: [stream_chunksize if out_of_core else None],
+            "plots": lambda load, profile: [eda, dsname, os.getenv("AGENT_MAX_PLOTS", "20")],
+            "plan": lambda profile: planner,
+            "transformer": lambda profile, plan, split: [plan["preprocess"], low_memory],
+            "model": lambda profile, plan, split, transformer: [plan, low_memory, [os.getenv(k) for k in MODEL_ENV]],
+        }
+        # a plots hit is only usable while its chart files are still on disk
+        valid = {"plots": lambda value: all(os.path.exists(p) for p in value[1])}
+        for name, key_fn in memo_keys.items():
+            fn, deps = stages[name]
+            stages[name] = (_memoized(memo, name, fn, key_fn, data, valid.get(name), logs[name], memo_log, run_id), deps)
+    stages = {name: (rec.wrap(name, fn), deps) for name, (fn, deps) in stages.items()}
+    results, _ = run_dag(stages, max_workers=int(os.getenv("AGENT_DAG_WORKERS", "4")))
 
     # Persist full run log
-    log["problem"] = problem
+    for name in stages:
+        log.update(logs[name])
+    report_path = results["report"]
+    log["problem"] = results["profile"][0]
     log["report"] = report_path
+    log["stages"] = rec.summary()  # start offset, wall/CPU time, peak RSS growth and rows/sec per stage
+    log["candidate_timing"] = results["model"][1].get("candidate_timing")
+    log["profiling"] = rec.export(run_id)
+    if memo is not None:
+        log["memo"] = {"stages": memo_log, **memo.stats}  # from_run links a reused result to the run that made it
+    from src.llm_client import stats as llm_stats
+    log["llm"] = llm_stats()  # latency + response-cache hit rate
     save_run_log(run_id, log)
     print(f"Done. Report: {report_path}")
 
+    _, metrics, model_name = results["model"]
+    primary = results["plan"]["evaluation"]["primary_metric"]
+    return {"run_id": run_id, "problem": log["problem"], "model": model_name,
+            "metric": primary, "score": metrics.get(primary), "report": report_path,
+            "run_log": f"logs/run_{run_id}.json"}
+
+def profile_startup():
+    """
+    Import src.main and then each stage's modules in a fresh interpreter (-X importtime) and print
+    the time per stage module plus the slowest top-level packages.
+    """
+    code = ("import sys, time, importlib\n"
+            "for m in ['src.main'] + %r:\n"
+            "    t = time.perf_counter()\n"
+            "    try: importlib.import_module(m)\n"
+            "    except Exception: pass\n"
+            "    print(f'@@{m}|{time.perf_counter() - t:.4f}', file=sys.stderr)\n" % STAGE_MODULES)
+    err = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                         capture_output=True, text=True).stderr.splitlines()
+    stages, packages = [], {}
+    for line in err:
+        if line.startswith("@@"):
+            name, sec = line[2:].split("|")
+            stages.append((name, float(sec)))
+        elif line.startswith("import time:") and not line.endswith("imported package"):
+            _, cumulative, name = line.split("|")
+            if not name.startswith("  "):  # top-level imports only; their time includes all sub-imports
+                pkg = name.strip().split(".")[0]
+                packages[pkg] = packages.get(pkg, 0) + int(cumulative) / 1e6
+    print(f"{'stage import':40s} {'sec':>8s}")
+    for name, sec in stages:
+        print(f"{name:40s} {sec:8.3f}")
+    print(f"\n{'top-level package':40s} {'sec':>8s}")
+    for pkg, sec in sorted(packages.items(), key=lambda kv: kv[1], reverse=True)[:15]:
+        print(f"{pkg:40s} {sec:8.3f}")
+
 if __name__ == "__main__":
     ap = argparse.ArgumentParser()
-    ap.add_argument("--csv", required=True)
-    ap.add_argument("--target", required=True)
+    ap.add_argument("--csv")
+    ap.add_argument("--target")
     ap.add_argument("--name", default=None)
+    ap.add_argument("--no-cache", action="store_true", help="re-parse the CSV instead of using the dataset cache")
+    ap.add_argument("--no-eda", action="store_true", help="skip correlations and plots (plotting libraries are not loaded)")
+    ap.add_argument("--profile-startup", action="store_true", help="print an import-time breakdown and exit")
     args = ap.parse_args()
-    main(args.csv, args.target, args.name)
+    if args.profile_startup:
+        profile_startup()
+        sys.exit(0)
+    if not args.csv or not args.target:
+        ap.error("--csv and --target are required")
+    main(args.csv, args.target, args.name, use_cache=not args.no_cache, eda=not args.no_eda)
@@ -0,0 +1,95 @@
+from __future__ import annotations
+import os, sys, glob, json, hashlib, threading, warnings
+from typing import Any, Dict, Optional, Tuple
+
+from src.io_utils import evict_cache
+
+MEMO_DIR = "artefacts/memo"
+_env: Optional[Dict[str, str]] = None
+
+def environment() -> Dict[str, str]:
+    """
+    Library versions and a hash of this package's source: part of every memo key, so upgrading a
+    library or editing the code invalidates earlier results instead of reusing them.
+    """
+    global _env
+    if _env is None:
+        from importlib.metadata import version, PackageNotFoundError
+        env = {"python": sys.version.split()[0]}
+        for pkg in ("numpy", "pandas", "scikit-learn", "scipy"):
+            try:
+                env[pkg] = version(pkg)
+            except PackageNotFoundError:
+                env[pkg] = "missing"
+        h = hashlib.sha1()
+        for fp in sorted(glob.glob(os.path.join(os.path.dirname(os.path.abspath(__file__)), "*.py"))):
+            with open(fp, "rb") as f:
+                h.update(f.read())
+        env["code"] = h.hexdigest()[:12]
+        _env = env
+    return _env
+
+def content_key(*parts) -> str:
+    return hashlib.sha1(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()[:24]
+
+def _describe(v) -> str:
+    # stable text for a parameter value: functions by name (their repr holds a memory address)
+    if callable(v) and hasattr(v, "__qualname__") and not hasattr(v, "get_params"):
+        return f"{getattr(v, '__module__', '')}.{v.__qualname__}"
+    return repr(v)
+
+def config_key(est, exclude: Tuple[str, ...] = ()) -> str:
+    """
+    Hash of an estimator's / transformer's full configuration (deep params; nested objects are covered
+    by their own params, so the container lists are skipped; n_jobs/verbose do not change results).
+    """
+    params = {k: _describe(v) for k, v in est.get_params(deep=True).items()
+              if k not in exclude and not hasattr(v, "get_params") and k.rsplit("__", 1)[-1] not in ("steps", "transformers")
+              and not k.endswith(("n_jobs", "verbose"))}
+    params["__class__"] = type(est).__name__
+    return content_key(params)
+
+class MemoStore:
+    """
+    Content-addressed results: <root>/<stage>-<key>.joblib, where the key hashes the stage's inputs plus
+    environment(). LRU-evicted (by mtime) down to max_mb after every write. Writes are atomic, so
+    concurrent stages and batch jobs can share the directory.
+    """
+    def __init__(self, root: str = MEMO_DIR, max_mb: float = 2048):
+        self.root, self.max_mb = root, max_mb
+        os.makedirs(root, exist_ok=True)
+        self.stats = {"hits": 0, "misses": 0}
+        self._lock = threading.Lock()
+
+    def key(self, stage: str, *parts) -> str:
+        return content_key(stage, environment(), *parts)
+
+    def _path(self, stage: str, key: str) -> str:
+        return os.path.join(self.root, f"{stage}-{key}.joblib")
+
+    def get(self, stage: str, key: str) -> Optional[Any]:
+        import joblib
+        fp = self._path(stage, key)
+        value = None
+        if os.path.exists(fp):
+            try:
+                value = joblib.load(fp)
+                os.utime(fp)  # eviction is least-recently-used by mtime
+            except Exception:  # unreadable/partial entry: recompute it
+                value = None
+        with self._lock:
+            self.stats["hits" if value is not None else "misses"] += 1
+        return value
+
+    def put(self, stage: str, key: str, value: Any):
+        import joblib
+        fp = self._path(stage, key)
+        tmp = f"{fp}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            joblib.dump(value, tmp)
+            os.replace(tmp, fp)
+            evict_cache(self.root, self.max_mb, keep=fp)
+        except Exception as e:  # unpicklable stage result or full disk: the stage just recomputes next run
+            warnings.warn(f"memo write failed for {stage} ({type(e).__name__}): {e}")
+            if os.path.exists(tmp):
+                os.remove(tmp)
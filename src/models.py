@@ -0,0 +1,169 @@
+from __future__ import annotations
+from typing import Any, Callable, Dict, List, Optional
+
+# estimator classes are imported inside the factories, so the planner can list names without sklearn
+
+LARGE_ROWS = 100_000  # above this, histogram boosting and stochastic solvers beat exact/tree-per-row fits
+
+def _to_dense(X):
+    import scipy.sparse as sp
+    return X.toarray() if sp.issparse(X) else X
+
+def _dense(est):
+    # HistGradientBoosting does not take sparse input; one-hot blocks are narrow enough to densify
+    from sklearn.pipeline import Pipeline
+    from sklearn.preprocessing import FunctionTransformer
+    return Pipeline([("dense", FunctionTransformer(_to_dense, accept_sparse=True)), ("est", est)])
+
+# Factories get the training shape so solvers and sizes can follow it: n_rows, sparse (None = unknown).
+# Estimators with their own parallelism ask for all cores; the fit paths cap n_jobs per worker.
+
+def _logistic_regression(n_rows: int, sparse: Optional[bool]):
+    from sklearn.linear_model import LogisticRegression
+    if n_rows >= LARGE_ROWS:  # stochastic average gradient scales linearly in rows; saga also handles sparse
+        return LogisticRegression(solver="saga" if sparse else "sag", max_iter=100, tol=1e-3)
+    return LogisticRegression(max_iter=300)
+
+def _ridge(n_rows: int, sparse: Optional[bool]):
+    from sklearn.linear_model import Ridge
+    return Ridge(alpha=1.0, solver="sag" if sparse and n_rows >= LARGE_ROWS else "auto", random_state=42)
+
+def _forest_clf(n_rows: int, sparse: Optional[bool]):
+    from sklearn.ensemble import RandomForestClassifier
+    return RandomForestClassifier(n_estimators=300 if n_rows < LARGE_ROWS else 100, n_jobs=-1, random_state=42)
+
+def _forest_reg(n_rows: int, sparse: Optional[bool]):
+    from sklearn.ensemble import RandomForestRegressor
+    return RandomForestRegressor(n_estimators=300 if n_rows < LARGE_ROWS else 100, n_jobs=-1, random_state=42)
+
+def _extra_trees_clf(n_rows: int, sparse: Optional[bool]):
+    from sklearn.ensemble import ExtraTreesClassifier
+    return ExtraTreesClassifier(n_estimators=300 if n_rows < LARGE_ROWS else 100, n_jobs=-1, random_state=42)
+
+def _extra_trees_reg(n_rows: int, sparse: Optional[bool]):
+    from sklearn.ensemble import ExtraTreesRegressor
+    return ExtraTreesRegressor(n_estimators=300 if n_rows < LARGE_ROWS else 100, n_jobs=-1, random_state=42)
+
+def _hgb_clf(n_rows: int, sparse: Optional[bool]):
+    from sklearn.ensemble import HistGradientBoostingClassifier
+    return _dense(HistGradientBoostingClassifier(max_iter=200, early_stopping="auto", random_state=42))
+
+def _hgb_reg(n_rows: int, sparse: Optional[bool]):
+    from sklearn.ensemble import HistGradientBoostingRegressor
+    return _dense(HistGradientBoostingRegressor(max_iter=200, early_stopping="auto", random_state=42))
+
+def _sgd_clf(n_rows: int, sparse: Optional[bool]):
+    from sklearn.linear_model import SGDClassifier
+    return SGDClassifier(loss="log_loss", alpha=1e-4, tol=1e-3, n_jobs=-1, random_state=42)  # n_jobs: one-vs-rest
+
+def _sgd_reg(n_rows: int, sparse: Optional[bool]):
+    from sklearn.compose import TransformedTargetRegressor
+    from sklearn.linear_model import SGDRegressor
+    from sklearn.preprocessing import StandardScaler
+    # standardized target: SGD diverges on raw targets in the 1e5 range
+    return TransformedTargetRegressor(SGDRegressor(alpha=1e-4, eta0=0.001, tol=1e-3, random_state=42),
+                                      transformer=StandardScaler())
+
+# partial_fit learners for the streaming strategy (bare estimators: streaming.py scales the target itself)
+def _stream_sgd_clf(n_rows: int, sparse: Optional[bool]):
+    from sklearn.linear_model import SGDClassifier
+    return SGDClassifier(loss="log_loss", alpha=1e-4, random_state=42)
+
+def _stream_nb(n_rows: int, sparse: Optional[bool]):
+    from sklearn.naive_bayes import GaussianNB
+    return GaussianNB()
+
+def _stream_sgd_reg(n_rows: int, sparse: Optional[bool]):
+    from sklearn.linear_model import SGDRegressor
+    return SGDRegressor(alpha=1e-4, eta0=0.001, random_state=42)  # 0.01 diverges on rare one-hot levels
+
+def _stream_mlp(n_rows: int, sparse: Optional[bool]):
+    from sklearn.neural_network import MLPRegressor
+    return MLPRegressor(hidden_layer_sizes=(32,), random_state=42)
+
+REGISTRY: Dict[str, Dict[str, Dict[str, Callable]]] = {
+    "baseline": {
+        "classification": {
+            "LogisticRegression": _logistic_regression,
+            "RandomForestClassifier": _forest_clf,
+            "HistGradientBoostingClassifier": _hgb_clf,
+            "ExtraTreesClassifier": _extra_trees_clf,
+            "SGDClassifier": _sgd_clf,
+        },
+        "regression": {
+            "Ridge": _ridge,
+            "RandomForestRegressor": _forest_reg,
+            "HistGradientBoostingRegressor": _hgb_reg,
+            "ExtraTreesRegressor": _extra_trees_reg,
+            "SGDRegressor": _sgd_reg,
+        },
+    },
+    "streaming": {
+        "classification": {"SGDClassifier": _stream_sgd_clf, "GaussianNB": _stream_nb},
+        "regression": {"SGDRegressor": _stream_sgd_reg, "MLPRegressor": _stream_mlp},
+    },
+}
+
+# hyperparameter spaces for src.hpo (parameter paths as accepted by the factory's estimator set_params)
+_FOREST_SPACE = {"max_depth": [None, 8, 16, 32], "min_samples_leaf": [1, 2, 5, 10], "max_features": ["sqrt", 0.3, 0.6, 1.0]}
+_HGB_SPACE = {"est__learning_rate": [0.03, 0.1, 0.2], "est__max_leaf_nodes": [15, 31, 63],
+              "est__min_samples_leaf": [10, 20, 50], "est__l2_regularization": [0.0, 0.1, 1.0]}
+SEARCH_SPACES: Dict[str, Dict[str, list]] = {
+    "LogisticRegression": {"C": [0.01, 0.1, 1.0, 10.0]},
+    "Ridge": {"alpha": [0.1, 1.0, 10.0, 100.0]},
+    "RandomForestClassifier": _FOREST_SPACE,
+    "RandomForestRegressor": _FOREST_SPACE,
+    "ExtraTreesClassifier": _FOREST_SPACE,
+    "ExtraTreesRegressor": _FOREST_SPACE,
+    "HistGradientBoostingClassifier": _HGB_SPACE,
+    "HistGradientBoostingRegressor": _HGB_SPACE,
+    "SGDClassifier": {"alpha": [1e-5, 1e-4, 1e-3], "penalty": ["l2", "elasticnet"]},
+    "SGDRegressor": {"regressor__alpha": [1e-5, 1e-4, 1e-3], "regressor__penalty": ["l2", "elasticnet"]},
+}
+# models that can continue from a fitted state: the parameter that grows (trees / iterations); its sibling
+# warm_start parameter is switched on to add only the difference. SGD is not listed: a warm-started fit
+# restarts from the old coefficients but runs up to max_iter epochs again, so nothing is saved
+WARM_START: Dict[str, str] = {
+    "RandomForestClassifier": "n_estimators",
+    "RandomForestRegressor": "n_estimators",
+    "ExtraTreesClassifier": "n_estimators",
+    "ExtraTreesRegressor": "n_estimators",
+    "HistGradientBoostingClassifier": "est__max_iter",
+    "HistGradientBoostingRegressor": "est__max_iter",
+}
+
+def _family(problem: str, strategy: str = "baseline") -> Dict[str, Callable]:
+    task = "classification" if problem == "classification" else "regression"
+    return REGISTRY["streaming" if strategy == "streaming" else "baseline"][task]
+
+def candidate_names(problem: str, strategy: str = "baseline") -> List[str]:
+    return list(_family(problem, strategy))
+
+def all_candidate_names() -> List[str]:
+    seen = {}
+    for family in REGISTRY.values():
+        for models in family.values():
+            seen.update(dict.fromkeys(models))
+    return list(seen)
+
+def default_candidates(problem: str, n_rows: int = 0, strategy: str = "baseline") -> List[str]:
+    """
+    Candidates to try when the plan names none (or none that exist), strongest first for the data size.
+    """
+    if strategy == "streaming":
+        return candidate_names(problem, strategy)
+    if problem == "classification":
+        trees = "HistGradientBoostingClassifier" if n_rows >= LARGE_ROWS else "RandomForestClassifier"
+        return [trees, "LogisticRegression"]
+    trees = "HistGradientBoostingRegressor" if n_rows >= LARGE_ROWS else "RandomForestRegressor"
+    return [trees, "Ridge"]
+
+def make(name: str, problem: str, n_rows: int = 0, sparse: Optional[bool] = None,
+         strategy: str = "baseline") -> Any:
+    """
+    A fresh, unfitted estimator for `name`, configured for n_rows training rows (sparse input when known).
+    """
+    family = _family(problem, strategy)
+    if name not in family:
+        raise KeyError(f"unknown {strategy} candidate for {problem}: {name!r} (known: {list(family)})")
+    return family[name](int(n_rows), sparse)
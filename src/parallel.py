@@ -0,0 +1,55 @@
+from __future__ import annotations
+import os, time, threading
+from typing import Callable, List, Optional, Sequence
+
+# the loky executor is process-wide; concurrent pipeline stages take turns so one stage never
+# resizes or kills (deadline) the pool while another stage's tasks are running in it
+_pool_lock = threading.Lock()
+
+def cpu_count() -> int:
+    try:
+        return len(os.sched_getaffinity(0))  # respects cgroup/taskset limits on linux
+    except AttributeError:
+        return os.cpu_count() or 1
+
+def resolve_n_jobs(n_jobs: Optional[int], n_tasks: int) -> int:
+    """
+    Translate a sklearn-style n_jobs (None/1 = serial, -1 = all cores) into a worker count.
+    """
+    if not n_jobs:
+        return 1
+    n = cpu_count() + 1 + n_jobs if n_jobs < 0 else n_jobs
+    return max(1, min(n, n_tasks))
+
+def threads_per_worker(n_workers: int) -> int:
+    """
+    CPU budget for each task so inner n_jobs/BLAS threads don't oversubscribe the box.
+    """
+    return max(1, cpu_count() // max(1, n_workers))
+
+def run_tasks(fn: Callable, tasks: Sequence[tuple], n_jobs: Optional[int] = 1,
+              deadline: Optional[float] = None) -> List:
+    """
+    Run fn(*args) for every args tuple in tasks and return results in task order.
+    With more than one worker the tasks go to a loky process pool (fn must be importable).
+    deadline is a time.monotonic() timestamp: tasks still running then are cancelled, their
+    workers killed, and None is returned in their slots.
+    """
+    workers = resolve_n_jobs(n_jobs, len(tasks))
+    if workers <= 1 and deadline is None:
+        return [fn(*t) for t in tasks]
+
+    # a deadline always goes through the pool, even with one worker, so a running fit can be killed
+    from concurrent.futures import wait
+    from joblib.externals.loky import get_reusable_executor
+    with _pool_lock:
+        ex = get_reusable_executor(max_workers=workers)
+        futs = [ex.submit(fn, *t) for t in tasks]
+        if deadline is None:
+            return [f.result() for f in futs]
+        done, pending = wait(futs, timeout=max(0.0, deadline - time.monotonic()))
+        if pending:
+            for f in pending:
+                f.cancel()
+            ex.shutdown(wait=False, kill_workers=True)
+        return [f.result() if f in done else None for f in futs]
@@ -1,9 +1,13 @@
 from __future__ import annotations
+import numpy as np
 import pandas as pd
-from sklearn.model_selection import train_test_split
+import scipy.sparse as sp
+from sklearn.model_selection import KFold, train_test_split
 from sklearn.compose import ColumnTransformer
 from sklearn.pipeline import Pipeline
-from sklearn.preprocessing import OneHotEncoder, StandardScaler
+from sklearn.preprocessing import (FunctionTransformer, OneHotEncoder, OrdinalEncoder, StandardScaler,
+                                   TargetEncoder)
+from sklearn.feature_extraction import FeatureHasher
 from sklearn.impute import SimpleImputer
 
 def split_xy(df: pd.DataFrame, target: str):
@@ -11,36 +15,182 @@ def split_xy(df: pd.DataFrame, target: str):
     y = df[target]
     return X, y
 
+HIGH_CARDINALITY_ENCODINGS = ("target", "ordinal", "hashing", "drop")
+
+def _hash_tokens(X):
+    # "col=value" strings per cell, so equal values in different columns hash apart
+    X = np.asarray(X, dtype=object).astype(str)
+    return np.stack([np.char.add(f"{j}=", X[:, j]) for j in range(X.shape[1])], axis=1)
+
+def _to_float32(X):
+    if isinstance(X, pd.DataFrame):
+        return X.to_numpy(dtype=np.float32, na_value=np.nan)
+    return np.asarray(X, dtype=np.float32)
+
+def _compact_matrix(X):
+    # one float32 matrix for every estimator: CSR when sparse, C-contiguous when dense
+    if sp.issparse(X):
+        X = X.tocsr().astype(np.float32, copy=False)
+        X.sort_indices()
+        return X
+    return np.ascontiguousarray(X, dtype=np.float32)
+
+def _target_encoder():
+    # cross-fitted, so no target leakage. scikit-learn 1.8 takes a splitter as cv and deprecates
+    # shuffle/random_state (a FutureWarning on every fit); older releases only accept an int cv plus those two
+    from packaging.version import Version
+    from sklearn import __version__ as sk_version
+    if Version(sk_version).release >= (1, 8):
+        return TargetEncoder(cv=KFold(5, shuffle=True, random_state=42))
+    return TargetEncoder(random_state=42)
+
+def _cardinality(X: pd.DataFrame, cols, profile=None):
+    """
+    Distinct and non-missing counts per column, from the profile sketches when one is given.
+    """
+    if profile is not None:
+        n_unique = profile.n_unique()
+        return {c: (n_unique[c], profile.n_rows - profile.missing[c]) for c in cols}
+    return {c: (int(X[c].nunique()), int(X[c].notna().sum())) for c in cols}
+
+def _is_row_index(X: pd.DataFrame, c, n_distinct: int, n_present: int, profile=None) -> bool:
+    # integer column holding every value of a contiguous range once (1..n): a row number, not a feature
+    if not pd.api.types.is_integer_dtype(X[c]) or n_present < 2 or n_distinct < 0.99 * n_present:
+        return False
+    if profile is not None and c in profile.num:
+        lo, hi = profile.num[c]["min"], profile.num[c]["max"]
+    else:
+        lo, hi = X[c].min(), X[c].max()
+    return abs((hi - lo + 1) - n_present) <= 0.01 * n_present
+
 def build_transformer(X: pd.DataFrame, *,
                       impute_numeric="median",
                       impute_categorical="most_frequent",
                       scale_numeric=True,
-                      one_hot_encode=True):
-    num_cols = [c for c in X.columns if pd.api.types.is_numeric_dtype(X[c])]
-    cat_cols = [c for c in X.columns if not pd.api.types.is_numeric_dtype(X[c])]
+                      one_hot_encode=True,
+                      high_cardinality_encoding="target",
+                      onehot_max_cardinality=50,
+                      onehot_min_frequency=None,
+                      drop_id_columns=True,
+                      id_ratio=0.95,
+                      hash_features=256,
+                      low_memory=False,
+                      sparse_threshold=0.3,
+                      profile=None):
+    """
+    Impute/scale numerics and encode categoricals by cardinality: columns with at most
+    onehot_max_cardinality distinct values are one-hot encoded (rare levels folded by min_frequency),
+    wider ones use high_cardinality_encoding (target / ordinal / hashing / drop). Near-unique text
+    columns (distinct/non-missing >= id_ratio) and integer row numbers are dropped when drop_id_columns.
+    low_memory keeps every block in float32 and appends a step that returns one float32 matrix (CSR
+    or C-contiguous dense); ColumnTransformer goes dense only when the output density is at least
+    sparse_threshold.
+    Returns (transformer, numeric columns, categorical columns, routing).
+    """
+    if profile is not None:  # reuse the numeric/categorical split from the data profile
+        num_cols = [c for c in profile.numeric_cols if c in X.columns]
+        cat_cols = [c for c in profile.categorical_cols if c in X.columns]
+    else:
+        num_cols = [c for c in X.columns if pd.api.types.is_numeric_dtype(X[c])]
+        cat_cols = [c for c in X.columns if not pd.api.types.is_numeric_dtype(X[c])]
+    if high_cardinality_encoding not in HIGH_CARDINALITY_ENCODINGS:
+        raise ValueError(f"high_cardinality_encoding must be one of {HIGH_CARDINALITY_ENCODINGS}, "
+                         f"got {high_cardinality_encoding!r}")
+
+    card = _cardinality(X, num_cols + cat_cols, profile)
+    routing = {"onehot": [], "high_cardinality": [], "dropped": []}
+    if drop_id_columns:
+        for c in num_cols:
+            if _is_row_index(X, c, *card[c], profile=profile):
+                routing["dropped"].append(c)
+        for c in cat_cols:
+            n_distinct, n_present = card[c]
+            if n_present and n_distinct >= id_ratio * n_present and n_distinct > onehot_max_cardinality:
+                routing["dropped"].append(c)
+    num_cols = [c for c in num_cols if c not in routing["dropped"]]
+    cat_cols = [c for c in cat_cols if c not in routing["dropped"]]
+    for c in cat_cols:
+        routing["onehot" if card[c][0] <= onehot_max_cardinality else "high_cardinality"].append(c)
 
+    dtype = np.float32 if low_memory else np.float64
     num_steps = [("impute", SimpleImputer(strategy=impute_numeric))]
+    if low_memory:  # cast before imputing so the imputer and scaler keep float32
+        num_steps.insert(0, ("float32", FunctionTransformer(_to_float32)))
     if scale_numeric:
         num_steps.append(("scale", StandardScaler(with_mean=False)))
     num_pipe = Pipeline(num_steps)
 
-    if one_hot_encode:
-        cat_pipe = Pipeline([
-            ("impute", SimpleImputer(strategy=impute_categorical)),
-            ("onehot", OneHotEncoder(handle_unknown="ignore", sparse_output=True))
-        ])
-    else:
+    if not one_hot_encode:
         # still impute but skip encoding
-        cat_pipe = Pipeline([
+        routing["onehot"], routing["high_cardinality"] = cat_cols, []
+        parts = [("cat", Pipeline([("impute", SimpleImputer(strategy=impute_categorical))]), cat_cols)]
+    else:
+        parts = [("cat", Pipeline([
             ("impute", SimpleImputer(strategy=impute_categorical)),
-        ])
+            ("onehot", OneHotEncoder(handle_unknown="infrequent_if_exist", sparse_output=True,
+                                     max_categories=onehot_max_cardinality, min_frequency=onehot_min_frequency,
+                                     dtype=dtype))
+        ]), routing["onehot"])]
+        hc = routing["high_cardinality"]
+        if hc and high_cardinality_encoding == "drop":
+            routing["dropped"] += hc
+            routing["high_cardinality"] = []
+        elif hc:
+            if high_cardinality_encoding == "target":
+                enc = [("encode", _target_encoder())]
+                if low_memory:
+                    enc.append(("float32", FunctionTransformer(_to_float32)))
+                if scale_numeric:
+                    enc.append(("scale", StandardScaler()))
+            elif high_cardinality_encoding == "ordinal":
+                enc = [("encode", OrdinalEncoder(handle_unknown="use_encoded_value", unknown_value=-1,
+                                                 min_frequency=onehot_min_frequency, dtype=dtype))]
+            else:
+                enc = [("tokens", FunctionTransformer(_hash_tokens)),
+                       ("encode", FeatureHasher(n_features=hash_features, input_type="string", dtype=dtype))]
+            parts.append(("cat_high", Pipeline([("impute", SimpleImputer(strategy=impute_categorical))] + enc), hc))
+
+    pre = ColumnTransformer([("num", num_pipe, num_cols)] + parts, sparse_threshold=sparse_threshold)
+    if low_memory:
+        pre = Pipeline([("columns", pre), ("compact", FunctionTransformer(_compact_matrix))])
+    return pre, num_cols, cat_cols, routing
+
+def _matrix_mb(M) -> float:
+    if sp.issparse(M):
+        return (M.data.nbytes + M.indices.nbytes + M.indptr.nbytes) / 2**20
+    return np.asarray(M).nbytes / 2**20
+
+def memory_report(df: pd.DataFrame, target: str, **transformer_kwargs) -> dict:
+    """
+    Peak traced memory (tracemalloc) of split_xy + build_transformer + fit_transform on df for the
+    standard and the low_memory path, with the size/format of the matrix each one produces.
+    """
+    import gc, time, tracemalloc
+    out = {"input_mb": round(float(df.memory_usage(deep=True).sum()) / 2**20, 2)}
+    for mode in (False, True):
+        gc.collect()
+        tracemalloc.start()
+        t0 = time.perf_counter()
+        X, y = split_xy(df, target)
+        pre, *_ = build_transformer(X, low_memory=mode, **transformer_kwargs)
+        M = pre.fit_transform(X, y)
+        sec = time.perf_counter() - t0
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        out["low_memory" if mode else "standard"] = {
+            "peak_mb": round(peak / 2**20, 2), "seconds": round(sec, 3),
+            "output": "sparse" if sp.issparse(M) else "dense", "dtype": str(M.dtype),
+            "shape": list(M.shape), "output_mb": round(_matrix_mb(M), 2),
+        }
+        del X, y, pre, M
+    std, low = out["standard"]["peak_mb"], out["low_memory"]["peak_mb"]
+    out["peak_reduction"] = round(1 - low / std, 3) if std else None
+    return out
 
-    pre = ColumnTransformer([
-        ("num", num_pipe, num_cols),
-        ("cat", cat_pipe, cat_cols),
-    ])
-    return pre, num_cols, cat_cols
+def stratify_labels(y):
+    # stratify on integer/categorical or low-cardinality targets, None otherwise
+    return y if (pd.api.types.is_integer_dtype(y) or isinstance(y.dtype, pd.CategoricalDtype) or y.nunique() < 50) else None
 
 def make_splits(X, y, test_size=0.2, random_state=42):
-    strat = y if (pd.api.types.is_integer_dtype(y) or pd.api.types.is_categorical_dtype(y) or y.nunique() < 50) else None
+    strat = stratify_labels(y)
     return train_test_split(X, y, test_size=test_size, random_state=random_state, stratify=strat)
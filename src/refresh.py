@@ -0,0 +1,294 @@
+from __future__ import annotations
+import os, json, time, hashlib, argparse
+import numpy as np
+import pandas as pd
+from typing import Any, Dict, List, Optional
+
+from src import models
+from src.data_profile import Profile, profile_chunks
+from src.io_utils import RUN_TS, ensure_dirs, write_json, iter_csv_chunks, csv_column_kinds, detect_problem_type
+
+REFRESH_DIR = "artefacts/refresh"
+PSI_THRESHOLD = 0.2   # population stability index above which a numeric column counts as drifted
+TVD_THRESHOLD = 0.1   # total variation distance above which a categorical column counts as drifted
+MAX_TVD_CARDINALITY = 50  # wider categoricals (build_transformer's default onehot_max_cardinality) get no TVD
+PRIMARY = {"classification": "f1_macro", "regression": "rmse"}
+
+def _state_path(csv_path: str, target: str, root: str = REFRESH_DIR) -> str:
+    key = hashlib.sha1(f"{os.path.abspath(csv_path)}:{target}".encode()).hexdigest()[:20]
+    return os.path.join(root, f"{key}.joblib")
+
+def _fingerprint(path: str, offset: int, block: int = 1 << 20) -> str:
+    # first and last MB before offset: changes when rows already processed are rewritten, not when rows are appended
+    h = hashlib.sha1(str(offset).encode())
+    with open(path, "rb") as f:
+        h.update(f.read(min(block, offset)))
+        f.seek(max(0, offset - block))
+        h.update(f.read(offset - f.tell()))
+    return h.hexdigest()[:20]
+
+def _data_end(path: str) -> int:
+    # end of the last complete line, so a row still being written is left for the next refresh
+    size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        pos = size
+        while pos > 0:
+            f.seek(max(0, pos - (1 << 16)))
+            buf = f.read(pos - f.tell())
+            i = buf.rfind(b"\n")
+            if i >= 0:
+                return pos - len(buf) + i + 1
+            pos -= len(buf)
+    return 0
+
+def psi(expected: pd.Series, actual: pd.Series, bins: int = 10) -> float:
+    """
+    Population stability index of actual vs expected on the expected sample's quantile bins.
+    """
+    e, a = pd.to_numeric(expected, errors="coerce").dropna(), pd.to_numeric(actual, errors="coerce").dropna()
+    if not len(e) or not len(a):
+        return 0.0
+    edges = np.unique(np.quantile(e, np.linspace(0, 1, bins + 1))[1:-1])
+    pe = np.bincount(np.searchsorted(edges, e, side="right"), minlength=len(edges) + 1) / len(e)
+    pa = np.bincount(np.searchsorted(edges, a, side="right"), minlength=len(edges) + 1) / len(a)
+    pe, pa = np.clip(pe, 1e-4, None), np.clip(pa, 1e-4, None)
+    return float(np.sum((pa - pe) * np.log(pa / pe)))
+
+def tvd(expected: Dict[Any, int], actual: Dict[Any, int]) -> float:
+    """
+    Total variation distance between two value-count dicts (values outside both top lists are ignored).
+    """
+    ne, na = sum(expected.values()), sum(actual.values())
+    if not ne or not na:
+        return 0.0
+    keys = set(map(str, expected)) | set(map(str, actual))
+    pe = {str(k): v / ne for k, v in expected.items()}
+    pa = {str(k): v / na for k, v in actual.items()}
+    return float(0.5 * sum(abs(pe.get(k, 0.0) - pa.get(k, 0.0)) for k in keys))
+
+def drift_report(old: Profile, new: Profile, problem: str, psi_threshold: float = PSI_THRESHOLD,
+                 tvd_threshold: float = TVD_THRESHOLD, used: Optional[List[str]] = None,
+                 high_cardinality: Optional[List[str]] = None) -> Dict[str, Any]:
+    """
+    Per-column drift of the new segment against the history: PSI for numeric columns (on the profiles'
+    row samples), TVD for categorical columns (on their top value counts) and for a class target, plus
+    the change in missing rate. Columns over the thresholds are listed under "drifted", or under
+    "drifted_unused" when not in `used` (columns the model ignores, e.g. dropped IDs, never trigger a retrain).
+    High-cardinality columns (the model's routing, or more than MAX_TVD_CARDINALITY distinct values when
+    no routing is given) get no TVD: a fresh segment of near-unique values always differs from the
+    history's top counts. They are listed under "skipped_high_cardinality".
+    """
+    out: Dict[str, Any] = {"psi": {}, "tvd": {}, "missing_delta": {}}
+    for c in old.numeric_cols:
+        out["psi"][c] = round(psi(old.sample[c], new.sample[c]), 4)
+    if high_cardinality is None:
+        n_unique = old.n_unique()
+        high_cardinality = [c for c in old.categorical_cols if n_unique[c] > MAX_TVD_CARDINALITY]
+    out["skipped_high_cardinality"] = [c for c in old.categorical_cols if c in high_cardinality]
+    for c in old.categorical_cols:
+        if c not in high_cardinality:
+            out["tvd"][c] = round(tvd(old.top[c], new.top.get(c, {})), 4)
+    t = old.target
+    if problem == "regression":
+        out["psi"][t] = round(psi(old.sample[t], new.sample[t]), 4)
+    elif t:
+        out["tvd"][t] = round(tvd(old.target_counts, new.target_counts), 4)
+    old_miss, new_miss = old.missing_rate(), new.missing_rate()
+    out["missing_delta"] = {c: round(new_miss[c] - old_miss[c], 4) for c in old.columns
+                            if abs(new_miss.get(c, 0.0) - old_miss[c]) >= 0.05}
+    over = sorted([c for c, v in out["psi"].items() if v > psi_threshold]
+                  + [c for c, v in out["tvd"].items() if v > tvd_threshold])
+    out["drifted"] = [c for c in over if used is None or c in used or c == t]
+    out["drifted_unused"] = [c for c in over if c not in out["drifted"]]
+    out["max_psi"] = max(out["psi"].values(), default=0.0)
+    out["max_tvd"] = max(out["tvd"].values(), default=0.0)
+    return out
+
+def _registry_name(model) -> str:
+    est = model.steps[-1][1]
+    return type(est.steps[-1][1] if hasattr(est, "steps") else est).__name__  # HGB sits behind a densify step
+
+def _evaluate(problem: str, model, chunks) -> Dict[str, float]:
+    # metrics over (X, y) chunks with running statistics, as the streaming holdout pass
+    from src.streaming import _scores
+    acc = {"confusion": None, "sse": 0.0, "n": 0}
+    for X, y in chunks:
+        y_pred, yt = model.predict(X), y.to_numpy()
+        if problem == "classification":
+            C = pd.crosstab(pd.Series(yt, name="true"), pd.Series(y_pred, name="pred"))
+            acc["confusion"] = C if acc["confusion"] is None else acc["confusion"].add(C, fill_value=0)
+        else:
+            acc["sse"] += float(((yt.astype(float) - y_pred) ** 2).sum())
+            acc["n"] += len(yt)
+    return _scores(problem, acc)
+
+def _update(problem: str, model, X: pd.DataFrame, y: pd.Series, grow: float) -> Dict[str, Any]:
+    """
+    Train the fitted Pipeline further on the new rows only, without refitting the preprocessor:
+    partial_fit when the estimator has it; otherwise warm_start (forests add grow * n trees fitted on the
+    new rows, gradient boosting adds grow * max_iter iterations). Returns what was done, or mode "none".
+    """
+    name, est = model.steps[-1]
+    Xt = model[:-1].transform(X)
+    info: Dict[str, Any] = {"rows": int(len(y))}
+    if hasattr(est, "partial_fit"):
+        classes = getattr(est, "classes_", None)
+        if problem == "classification" and classes is not None:
+            known = y.isin(classes).to_numpy()  # partial_fit cannot add classes
+            info["rows_unknown_class"] = int((~known).sum())
+            Xt, y = Xt[known], y[known]
+        if len(y):
+            est.partial_fit(Xt, y.to_numpy())
+        info["mode"] = "partial_fit"
+        return info
+    resource = models.WARM_START.get(_registry_name(model))
+    if resource is None:
+        info["mode"] = "none"
+        return info
+    param = f"{name}__{resource}"
+    flag = param.rsplit("__", 1)[0] + "__warm_start"
+    before = int(model.get_params()[param])
+    after = before + max(1, int(round(before * grow)))
+    model.set_params(**{param: after, flag: True})
+    est.fit(Xt, y)
+    model.set_params(**{flag: False})
+    info.update({"mode": "warm_start", "param": resource, "from": before, "to": after})
+    return info
+
+def refresh(csv_path: str, target: str, *,
+            model_path: Optional[str] = None,
+            state_dir: str = REFRESH_DIR,
+            chunksize: int = 100_000,
+            holdout_every: int = 5,
+            psi_threshold: float = PSI_THRESHOLD,
+            tvd_threshold: float = TVD_THRESHOLD,
+            metric_drop: float = 0.05,
+            grow: float = 0.2,
+            force: bool = False) -> Dict[str, Any]:
+    """
+    Bring an append-only CSV's profile and model up to date without re-reading its history.
+    The stored state holds the byte offset and row count reached by the last refresh, a fingerprint of
+    the bytes before it, the merged Profile, the column dtypes and the current model. Only rows after
+    the offset are read (and held in memory, one append at a time); they are profiled and merged into the stored profile, compared with it for
+    drift, and every holdout_every-th new row scores the model. When a column drifts past the thresholds,
+    the metric is more than metric_drop (relative) worse than the stored one, or force is set, the model
+    is trained further on the other new rows (partial_fit / warm_start, see _update) and saved as a new
+    artefact. A first refresh (or a file whose processed bytes changed) profiles the whole file once
+    and adopts model_path (by default the current model) as the model to keep up to date.
+    """
+    from src.artefacts import load_model, save_model, _worse_by
+    from src.score import training_schema
+    t0 = time.perf_counter()
+    run_id = RUN_TS()
+    sp = _state_path(csv_path, target, state_dir)
+    end = _data_end(csv_path)
+    state = None
+    if os.path.exists(sp):
+        import joblib
+        state = joblib.load(sp)
+    out: Dict[str, Any] = {"run_id": run_id, "csv": csv_path, "target": target, "state": sp}
+    if state is not None and (end < state["offset"] or _fingerprint(csv_path, state["offset"]) != state["fingerprint"]):
+        out["reset"] = "rows before the stored offset changed; rebuilding the state from the whole file"
+        model_path = model_path or state["model_path"]  # keep the current model unless another is given
+        state = None
+
+    if state is None:
+        if not model_path:
+            raise ValueError("no refresh state for this file yet: pass --model with the model to keep up to date")
+        kinds = csv_column_kinds(csv_path)
+        prof = profile_chunks(iter_csv_chunks(csv_path, chunksize, kinds=kinds), target)
+        problem = detect_problem_type(prof.sample, target)
+        metric_name = PRIMARY[problem]
+        stem = os.path.basename(model_path).replace("best_model_", "metrics_").rsplit(".", 1)[0]
+        mp = os.path.join(os.path.dirname(model_path), f"{stem}.json")
+        baseline = json.load(open(mp, encoding="utf-8")).get(metric_name) if os.path.exists(mp) else None
+        state = {"offset": end, "rows": prof.n_rows, "kinds": kinds, "profile": prof, "problem": problem,
+                 "metric": metric_name, "baseline": baseline, "model_path": model_path, "history": []}
+        out.update({"mode": "initial", "rows_total": prof.n_rows, "bytes_read": end})
+    elif end == state["offset"]:
+        out.update({"mode": "unchanged", "rows_total": state["rows"], "bytes_read": 0})
+        state = None  # nothing to save
+    else:
+        problem, metric_name = state["problem"], state["metric"]
+        t1 = time.perf_counter()
+        chunks = list(iter_csv_chunks(csv_path, chunksize, kinds=state["kinds"], start=state["offset"], end=end,
+                                      first_row=state["rows"]))
+        chunks = [ch for ch in chunks if len(ch)]
+        new = profile_chunks(chunks, target) if chunks else None
+        out.update({"mode": "append", "bytes_read": end - state["offset"], "read_profile_sec": round(time.perf_counter() - t1, 4)})
+        if new is not None:
+            out["rows_new"] = new.n_rows
+            labelled = [ch[ch[target].notna()] for ch in chunks]
+            hold = [(ch[ch.index % holdout_every == 0].drop(columns=[target]), ch.loc[ch.index % holdout_every == 0, target])
+                    for ch in labelled]
+            hold = [(X, y) for X, y in hold if len(y)]
+            model = load_model(state["model_path"], mmap=False)  # trained further in place
+            schema = training_schema(model)
+            out["drift"] = drift_report(state["profile"], new, problem, psi_threshold, tvd_threshold,
+                                        used=schema["used"], high_cardinality=schema["high_cardinality"])
+            n_hold = int(sum(len(y) for _, y in hold))
+            before = _evaluate(problem, model, hold)[metric_name] if hold else None
+            drop = _worse_by(state["baseline"], before, metric_name) if before is not None and state["baseline"] is not None else None
+            out["metric"] = {"name": metric_name, "stored": state["baseline"], "new_rows": before, "holdout_rows": n_hold,
+                             "relative_drop": round(drop, 4) if drop is not None else None}
+            reasons = (["drift"] if out["drift"]["drifted"] else []) + (["metric"] if drop is not None and drop > metric_drop else []) \
+                      + (["forced"] if force else [])
+            out["retrain"] = {"reasons": reasons}
+            if reasons:
+                train = pd.concat([ch[ch.index % holdout_every != 0] for ch in labelled])
+                t2 = time.perf_counter()
+                info = _update(problem, model, train.drop(columns=[target]), train[target], grow)
+                info["sec"] = round(time.perf_counter() - t2, 4)
+                out["retrain"].update(info)
+                if info["mode"] != "none":
+                    after = _evaluate(problem, model, hold)[metric_name] if hold else None
+                    out["retrain"].update({"metric_after": after, "holdout_rows": n_hold})
+                    path = f"artefacts/best_model_{run_id}.pkl"
+                    out["artefact"] = save_model(model, path, extra={"model": _registry_name(model), "refresh_of": state["model_path"]})
+                    # the baseline is kept: the score after the update comes from one append's holdout slice (often a
+                    # few dozen rows) and would make every later metric_drop check compare against noise
+                    write_json({metric_name: state["baseline"], "refresh": out["retrain"]}, f"artefacts/metrics_{run_id}.json")
+                    state["model_path"] = path
+                else:
+                    out["retrain"]["note"] = "estimator supports neither partial_fit nor warm_start; run src.main to refit"
+            elif state["baseline"] is None:
+                state["baseline"] = before
+            state["profile"] = state["profile"].merge(new)
+            state["rows"] += new.n_rows
+        state["offset"] = end
+        out["rows_total"] = state["rows"]
+
+    if state is not None:
+        import joblib
+        state["fingerprint"] = _fingerprint(csv_path, state["offset"])
+        state["history"] = (state["history"] + [{"run_id": run_id, "mode": out["mode"], "rows": state["rows"],
+                                                 "retrained": bool(out.get("artefact"))}])[-100:]
+        os.makedirs(state_dir, exist_ok=True)
+        tmp = f"{sp}.{os.getpid()}.tmp"
+        joblib.dump(state, tmp)
+        os.replace(tmp, sp)
+        out["model"] = state["model_path"]
+    out["seconds"] = round(time.perf_counter() - t0, 4)
+    return out
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Incrementally refresh the profile and model of an append-only CSV")
+    ap.add_argument("--csv", required=True)
+    ap.add_argument("--target", required=True)
+    ap.add_argument("--model", default=None, help="artefacts/best_model_<run_id>.pkl to adopt on the first refresh")
+    ap.add_argument("--chunksize", type=int, default=100_000)
+    ap.add_argument("--psi", type=float, default=PSI_THRESHOLD, help="numeric drift threshold (PSI)")
+    ap.add_argument("--tvd", type=float, default=TVD_THRESHOLD, help="categorical drift threshold (TVD)")
+    ap.add_argument("--metric-drop", type=float, default=0.05, help="relative metric drop that triggers retraining")
+    ap.add_argument("--grow", type=float, default=0.2, help="share of trees/iterations added by a warm-start update")
+    ap.add_argument("--force", action="store_true", help="retrain on the new rows regardless of drift")
+    args = ap.parse_args()
+
+    ensure_dirs()
+    result = refresh(args.csv, args.target, model_path=args.model, chunksize=args.chunksize, psi_threshold=args.psi,
+                     tvd_threshold=args.tvd, metric_drop=args.metric_drop, grow=args.grow, force=args.force)
+    log = f"logs/refresh_{result['run_id']}.json"
+    write_json(result, log)
+    drift = result.get("drift", {})
+    print(f"Refresh ({result['mode']}): {result.get('rows_new', 0)} new rows, {result['bytes_read']} bytes read, "
+          f"drifted: {drift.get('drifted', [])}, retrain: {result.get('retrain', {}).get('mode', 'no')} -> {log}")
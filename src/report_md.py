@@ -8,7 +8,8 @@ def _rel_for_report(img_path: str, report_dir: str = "reports") -> str:
     return rel.replace("\\", "/")  # normalize for markdown
 
 def make_markdown(dataset_name: str, problem: str, overview: dict, plot_paths: list[str], 
-                  model_name: str, metrics: dict, narrative: str | None = None) -> str:
+                  model_name: str, metrics: dict, narrative: str | None = None,
+                  corr_pairs: list | None = None, stage_timings: dict | None = None) -> str:
     lines = [] #content
     lines += [f"# AutoML Agent Report - {dataset_name}"]
 
@@ -23,6 +24,20 @@ def make_markdown(dataset_name: str, problem: str, overview: dict, plot_paths: l
               json.dumps({k:v for k,v in sorted(overview['missing_percentage'].items(), key=lambda kv: kv[1], reverse=True)[:10]}, indent=2),
               "```",
               ""]
+    summary = overview.get("numeric_summary", {})
+    n_unique = overview.get("n_unique", {})
+    if summary or n_unique:
+        rows = [[c, n_unique.get(c), s["min"], s["median"], s["max"], s["mean"], s["std"]] for c, s in list(summary.items())[:20]]
+        rows += [[c, n_unique.get(c), "", "", "", "", ""] for c in overview.get("categorical_cols", [])[:10]]
+        lines += ["## Column Profile",
+                  "```\n" + tabulate(rows, headers=["column","distinct","min","median","max","mean","std"],
+                                     floatfmt=".4g") + "\n```",
+                  ""]
+    if corr_pairs:
+        lines += ["## Top Correlated Pairs",
+                  "```\n" + tabulate([[p["a"], p["b"], p["r"]] for p in corr_pairs[:10]],
+                                     headers=["column_a","column_b","r"]) + "\n```",
+                  ""]
     if plot_paths:
         lines += ["## EDA Plots", ""]
         for p in plot_paths[:12]:
@@ -33,11 +48,51 @@ def make_markdown(dataset_name: str, problem: str, overview: dict, plot_paths: l
     lines += ["## Model & Metrics",
               f"- Selected model: **{model_name}**",
               "",
-              "```\n" + tabulate([[k, v] for k,v in metrics.items()], headers=["metric","value"]) + "\n```",
+              "```\n" + tabulate([[k, v] for k,v in metrics.items() if not isinstance(v, (dict, list))],
+                                 headers=["metric","value"]) + "\n```",
               ""]
+    cv = metrics.get("cv")
+    if cv:
+        rows = [[n, r["mean"], r["std"], r["folds_run"], "yes" if r["pruned"] else "", round(sum(r["fold_sec"]), 2)]
+                for n, r in cv["candidates"].items()]
+        lines += [f"### Cross-validation ({cv['folds']} folds, {cv['metric']})",
+                  "```\n" + tabulate(rows, headers=["candidate","mean","std","folds","pruned","fit_sec"]) + "\n```",
+                  ""]
+    hp = metrics.get("hpo")
+    if hp:
+        rows = [[n, c["best_score"], c["best_rows"], json.dumps(c["best_params"]), len(c["trials"])]
+                for n, c in hp["candidates"].items()]
+        lines += [f"### Hyperparameter Search ({hp['metric']}, {hp['fitted']} trials fitted, {hp['reused']} reused)",
+                  "```\n" + tabulate(rows, headers=["candidate","best_score","rows","best_params","trials"]) + "\n```",
+                  ""]
+    lc = metrics.get("learning_curve")
+    if lc:
+        rows = [[n] + [rg["scores"].get(n, "") for rg in lc["rungs"]] + [lc["extrapolated_full_score"].get(n, ""),
+                lc["eliminated_at_rows"].get(n, "")] for n in lc["estimated_full_fit_sec"]]
+        lines += [f"### Subsample Selection ({lc['metric']}, {lc['stopped']})",
+                  "```\n" + tabulate(rows, headers=["candidate"] + [f"{rg['rows']} rows" for rg in lc["rungs"]]
+                                     + [f"extrapolated @{lc['n_train']}", "dropped at"]) + "\n```",
+                  f"- Estimated compute saved vs fitting every candidate on all rows: {lc['saved_sec']}s "
+                  f"({lc['saved_frac']:.0%} of {lc['estimated_exhaustive_fit_sec']}s)" if lc.get("saved_frac") is not None
+                  else "",
+                  ""]
+    timing = metrics.get("candidate_timing")
+    if timing:
+        rows = [[n, t["fit_sec"], t["predict_sec"], t["predict_rows_per_sec"]] for n, t in timing.items()]
+        lines += ["### Candidate Timing",
+                  "```\n" + tabulate(rows, headers=["candidate","fit_sec","predict_sec","predict_rows/s"]) + "\n```",
+                  ""]
     
     if narrative:
         lines += ["## Narrative", narrative.strip(), ""]
 
+    if stage_timings:
+        rows = [[n, t["start_sec"], t["wall_sec"], t["cpu_sec"], t["peak_rss_delta_mb"], t["rows_per_sec"]]
+                for n, t in stage_timings.items()]
+        lines += ["## Run Timing",
+                  "```\n" + tabulate(rows, headers=["stage","start_sec","wall_sec","cpu_sec","peak_rss_delta_mb","rows/s"],
+                                     floatfmt=("", ".4g", ".4g", ".4g", ".4g", ".0f")) + "\n```",
+                  ""]
+
     lines += ["## Notes", "- Generated by agent. Code-driven EDA & modeling; narrative by LLM.", ""]
     return "\n".join(lines)
\ No newline at end of file
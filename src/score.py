@@ -0,0 +1,232 @@
+from __future__ import annotations
+import os, time, argparse, warnings
+import numpy as np
+import pandas as pd
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence
+
+from src.io_utils import RUN_TS, ensure_dirs, write_json
+from src.parallel import cpu_count
+
+_model = None  # the Pipeline, loaded once per process by _init_scorer
+
+def _find_column_transformer(est):
+    from sklearn.compose import ColumnTransformer
+    if isinstance(est, ColumnTransformer):
+        return est
+    for _, step in getattr(est, "steps", []):  # pre may be wrapped (low-memory compact step, streaming centering)
+        found = _find_column_transformer(step)
+        if found is not None:
+            return found
+    return None
+
+def training_schema(model) -> Dict[str, Any]:
+    """
+    Columns the Pipeline was fitted on, which of them are numeric, which the transformer actually uses
+    and which it routed to the high-cardinality encoders.
+    """
+    columns = [str(c) for c in getattr(model, "feature_names_in_", [])]
+    ct = _find_column_transformer(model)
+    numeric, used, high = [], [], []
+    if ct is not None:
+        for name, _, cols in ct.transformers_:
+            if name == "remainder" or isinstance(cols, str):
+                continue
+            cols = [columns[c] if isinstance(c, (int, np.integer)) else str(c) for c in cols]
+            used += cols
+            if name == "num":
+                numeric += cols
+            elif name == "cat_high":
+                high += cols
+    return {"columns": columns, "numeric": numeric, "used": used or columns, "high_cardinality": high}
+
+class SchemaError(ValueError):
+    """
+    The input's columns do not fit the model (missing training columns, unknown --keep columns).
+    """
+
+def check_schema(header: Sequence[str], schema: Dict[str, Any]) -> Dict[str, List[str]]:
+    """
+    Compare an input header with the training columns: a missing column the transformer uses is an
+    error; unused missing columns (dropped IDs) are filled with NaN and extra columns are ignored.
+    """
+    header = [str(c) for c in header]
+    missing = [c for c in schema["columns"] if c not in header]
+    required = [c for c in missing if c in schema["used"]]
+    if required:
+        raise SchemaError(f"input is missing training columns: {required}")
+    return {"filled": missing, "ignored": [c for c in header if c not in schema["columns"]]}
+
+def _init_scorer(model_path: str, n_threads: int = 0):
+    global _model
+    from src.artefacts import load_model
+    _model = load_model(model_path)  # memory-mapped when uncompressed: workers share the arrays
+    if n_threads:
+        from src.automl_or_baseline import _with_threads
+        _with_threads(_model, n_threads)  # forests predict with n_jobs too
+
+def _score_chunk(X: pd.DataFrame, proba: bool, n_threads: Optional[int] = None):
+    from threadpoolctl import threadpool_limits
+    with threadpool_limits(limits=n_threads):
+        t0 = time.perf_counter()
+        pred = _model.predict(X)
+        P = _model.predict_proba(X) if proba else None
+        sec = time.perf_counter() - t0
+    return pred, P, sec
+
+def _prepare(chunk: pd.DataFrame, schema: Dict[str, Any], coerced: Dict[str, int]) -> pd.DataFrame:
+    X = chunk.reindex(columns=schema["columns"])  # training order; unused missing columns become NaN
+    for c in schema["numeric"]:
+        if not pd.api.types.is_numeric_dtype(X[c]):
+            num = pd.to_numeric(X[c], errors="coerce")
+            bad = int((num.isna() & X[c].notna()).sum())
+            if bad:
+                coerced[c] = coerced.get(c, 0) + bad
+            X[c] = num
+    return X
+
+class _Writer:
+    """
+    Append prediction chunks to CSV or Parquet (by extension) through a temp file, renamed on close.
+    """
+    def __init__(self, path: str):
+        self.path, self.tmp = path, f"{path}.{os.getpid()}.tmp"
+        self.parquet = path.endswith(".parquet")
+        self._pq = self._f = None
+        if self.parquet:
+            try:
+                import pyarrow  # noqa: F401
+            except ImportError:
+                raise RuntimeError("Parquet output needs pyarrow (pip install pyarrow); write .csv instead")
+        else:
+            self._f = open(self.tmp, "w", encoding="utf-8", newline="")
+        self.header = True
+
+    def write(self, df: pd.DataFrame):
+        if self.parquet:
+            import pyarrow as pa, pyarrow.parquet as pq
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            if self._pq is None:
+                self._pq = pq.ParquetWriter(self.tmp, table.schema)
+            self._pq.write_table(table)
+        else:
+            df.to_csv(self._f, header=self.header, index=False)
+            self.header = False
+
+    def close(self, ok: bool = True):
+        if self._pq is not None:
+            self._pq.close()
+        if self._f is not None:
+            self._f.close()
+        if ok and os.path.exists(self.tmp):
+            os.replace(self.tmp, self.path)
+        elif os.path.exists(self.tmp):
+            os.remove(self.tmp)
+
+def score_csv(model_path: str, csv_path: str, out_path: str, *,
+              chunksize: int = 50_000,
+              workers: int = 1,
+              proba: bool = False,
+              keep_columns: Sequence[str] = ()) -> Dict[str, Any]:
+    """
+    Stream csv_path through a saved best_model Pipeline chunk by chunk and write predictions to out_path
+    (.csv, or .parquet with pyarrow) in input order as chunks finish. The model is loaded once per process;
+    workers > 1 scores chunks in a process pool (at most 2 chunks in flight per worker, so memory stays
+    bounded). The header is checked against the training columns before any row is scored.
+    Returns rows/sec, chunk latency percentiles and the schema report.
+    """
+    t0 = time.perf_counter()
+    _init_scorer(model_path)
+    load_sec = time.perf_counter() - t0
+    schema = training_schema(_model)
+    header = list(pd.read_csv(csv_path, nrows=0).columns)
+    report = check_schema(header, schema)
+    keep_columns = list(keep_columns)
+    unknown = [c for c in keep_columns if c not in header]
+    if unknown:
+        raise SchemaError(f"--keep columns not in the input: {unknown}")
+    if proba and not hasattr(_model, "predict_proba"):
+        warnings.warn("model has no predict_proba; writing labels only")
+        proba = False
+    classes = [str(c) for c in getattr(_model, "classes_", [])] if proba else []
+
+    # categorical training columns stay text even when a chunk only holds digits
+    text = [c for c in schema["columns"] if c in header and c not in schema["numeric"]]
+    reader = pd.read_csv(csv_path, chunksize=chunksize, dtype={c: str for c in text},
+                         usecols=[c for c in header if c in schema["columns"] or c in keep_columns])
+    workers = max(1, min(workers, cpu_count()))
+    n_threads = max(1, cpu_count() // workers)
+    writer = _Writer(out_path)
+    coerced: Dict[str, int] = {}
+    latencies, rows = [], 0
+
+    def emit(chunk, result):
+        nonlocal rows
+        pred, P, sec = result
+        out = chunk[keep_columns].reset_index(drop=True) if keep_columns else pd.DataFrame(index=range(len(chunk)))
+        out["prediction"] = pred
+        if P is not None:
+            for j, c in enumerate(classes):
+                out[f"proba_{c}"] = P[:, j]
+        writer.write(out)
+        latencies.append(sec)
+        rows += len(chunk)
+
+    ok = False
+    try:
+        if workers == 1:
+            for chunk in reader:
+                emit(chunk, _score_chunk(_prepare(chunk, schema, coerced), proba, n_threads))
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_scorer,
+                                     initargs=(model_path, n_threads)) as ex:
+                pending = deque()  # (chunk, future) in input order
+                for chunk in reader:
+                    pending.append((chunk, ex.submit(_score_chunk, _prepare(chunk, schema, coerced), proba, n_threads)))
+                    while len(pending) >= 2 * workers:
+                        c, fut = pending.popleft()
+                        emit(c, fut.result())
+                while pending:
+                    c, fut = pending.popleft()
+                    emit(c, fut.result())
+        ok = True
+    finally:
+        writer.close(ok)
+
+    wall = time.perf_counter() - t0
+    lat = np.array(latencies) * 1000 if latencies else np.zeros(1)
+    report["coerced_to_nan"] = coerced  # non-numeric values in numeric training columns
+    return {
+        "model": model_path, "input": csv_path, "output": out_path,
+        "rows": rows, "chunks": len(latencies), "chunksize": chunksize, "workers": workers,
+        "model_load_sec": round(load_sec, 4), "wall_sec": round(wall, 4),
+        "rows_per_sec": round(rows / wall, 1) if wall > 0 else None,
+        "chunk_latency_ms": {f"p{q}": round(float(np.percentile(lat, q)), 2) for q in (50, 90, 99)}
+                            | {"max": round(float(lat.max()), 2)},
+        "row_latency_us_p50": round(float(np.percentile(lat, 50)) * 1000 / min(chunksize, rows), 2) if rows else None,
+        "schema": report,
+    }
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Score a CSV with a saved best_model pipeline")
+    ap.add_argument("--model", required=True, help="artefacts/best_model_<run_id>.pkl")
+    ap.add_argument("--csv", required=True, help="input rows (training columns; the target may be present)")
+    ap.add_argument("--out", required=True, help="predictions file (.csv, or .parquet with pyarrow)")
+    ap.add_argument("--chunksize", type=int, default=50_000)
+    ap.add_argument("--workers", type=int, default=1, help="processes scoring chunks in parallel")
+    ap.add_argument("--proba", action="store_true", help="add one proba_<class> column per class")
+    ap.add_argument("--keep", default="", help="comma-separated input columns copied to the output (e.g. an id)")
+    args = ap.parse_args()
+
+    ensure_dirs()
+    try:
+        stats = score_csv(args.model, args.csv, args.out, chunksize=args.chunksize, workers=args.workers,
+                          proba=args.proba, keep_columns=[c for c in args.keep.split(",") if c])
+    except SchemaError as e:  # bad input columns: a usage error; anything else keeps its traceback
+        ap.error(str(e))
+    log = f"logs/score_{RUN_TS()}.json"
+    write_json(stats, log)
+    lat = stats["chunk_latency_ms"]
+    print(f"Scored {stats['rows']} rows in {stats['wall_sec']}s ({stats['rows_per_sec']} rows/s); chunk latency "
+          f"p50 {lat['p50']} ms, p99 {lat['p99']} ms -> {args.out} ({log})")
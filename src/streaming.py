@@ -0,0 +1,195 @@
+from __future__ import annotations
+import time, numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from typing import Any, Dict, List, Optional
+from sklearn.base import BaseEstimator, RegressorMixin, clone
+from sklearn.pipeline import Pipeline
+from sklearn.naive_bayes import GaussianNB
+from sklearn.preprocessing import StandardScaler
+from src import models
+from src.io_utils import iter_csv_chunks
+
+DENSE_ONLY = (GaussianNB,)
+
+class ScaledTargetRegressor(BaseEstimator, RegressorMixin):
+    """
+    Train an incremental regressor on a standardized target (SGD diverges on raw targets in the
+    1e5 range) and predict on the original scale; mean/scale come from the sampled pass. The
+    regressor parameter is left untouched: the first (partial_)fit trains a clone, regressor_.
+    """
+    def __init__(self, regressor=None, mean: float = 0.0, scale: float = 1.0):
+        self.regressor = regressor
+        self.mean = mean
+        self.scale = scale
+
+    def fit(self, X, y):
+        self.regressor_ = clone(self.regressor)
+        self.mean_, self.scale_ = self.mean, self.scale
+        return self.partial_fit(X, y)
+
+    def partial_fit(self, X, y):
+        if not hasattr(self, "regressor_"):
+            self.regressor_ = clone(self.regressor)
+            self.mean_, self.scale_ = self.mean, self.scale
+        self.regressor_.partial_fit(X, (np.asarray(y, dtype=float) - self.mean_) / self.scale_)
+        return self
+
+    def __sklearn_is_fitted__(self):
+        # lets a saved Pipeline ending in this wrapper pass sklearn's fitted check in predict
+        return hasattr(getattr(self, "regressor_", None), "n_features_in_")
+
+    def predict(self, X):
+        return self.regressor_.predict(X) * self.scale_ + self.mean_
+
+def _bottom_k(sample: Optional[pd.DataFrame], chunk: pd.DataFrame, keys: np.ndarray, k: int) -> pd.DataFrame:
+    # uniform sample without replacement over all chunks: keep the k rows with the smallest random keys
+    chunk = chunk.assign(_key=keys)
+    both = chunk if sample is None else pd.concat([sample, chunk])
+    return both.nsmallest(k, "_key") if len(both) > k else both
+
+def _as_input(est, Xt):
+    return Xt.toarray() if sp.issparse(Xt) and isinstance(est, DENSE_ONLY) else Xt
+
+def _scores(problem: str, acc: Dict[str, Any]) -> Dict[str, float]:
+    """
+    Metrics from the accumulated holdout statistics (same keys as automl_or_baseline._metric).
+    Raises ValueError on an empty holdout instead of returning NaN scores that could win a comparison.
+    """
+    if problem != "classification":
+        if not acc["n"]:
+            raise ValueError("no holdout rows to score")
+        return {"rmse": float(np.sqrt(acc["sse"] / acc["n"]))}
+    C = acc["confusion"]
+    if C is None or not C.values.sum():
+        raise ValueError("no holdout rows to score")
+    labels = C.index.union(C.columns)
+    C = C.reindex(index=labels, columns=labels, fill_value=0).to_numpy(dtype=float)
+    tp = np.diag(C)
+    denom = 2 * tp + (C.sum(axis=0) - tp) + (C.sum(axis=1) - tp)
+    f1 = np.divide(2 * tp, denom, out=np.zeros_like(tp), where=denom > 0)
+    return {"accuracy": float(tp.sum() / C.sum()), "f1_macro": float(f1.mean())}
+
+def run_streaming(problem: str, preprocessor, csv_path: str, target: str,
+                  candidates: Optional[List[str]] = None, *,
+                  chunksize: int = 100_000,
+                  holdout_every: int = 5,
+                  sample_rows: int = 50_000,
+                  epochs: int = 1,
+                  seed: int = 42,
+                  deadline: Optional[float] = None):
+    """
+    Out-of-core training: rows whose file row number is a multiple of holdout_every form the holdout
+    stream, the rest are trained on chunk by chunk with partial_fit. The preprocessor is fitted on a
+    uniform sample of training rows from a first pass (which also collects the class labels), then
+    every candidate is updated per chunk; the holdout is scored in a final pass with accumulated
+    statistics, so memory stays bounded by chunksize. deadline (time.monotonic) stops training early.
+    Returns (model, metrics, name) like run_automl_or_baseline.
+    """
+    from src.automl_or_baseline import _is_better
+    known = models.candidate_names(problem, "streaming")  # partial_fit-capable learners
+    names = [n for n in (candidates or []) if n in known] or models.default_candidates(problem, strategy="streaming")[:1]
+    chosen = [(n, models.make(n, problem, strategy="streaming")) for n in names]
+    rng = np.random.default_rng(seed)
+    t0 = time.perf_counter()
+    info = {"chunksize": chunksize, "holdout_every": holdout_every, "epochs": epochs, "passes": 0,
+            "rows_train": 0, "rows_holdout": 0, "chunks": 0, "stopped_early": False}
+
+    def stream(holdout: bool):
+        for chunk in iter_csv_chunks(csv_path, chunksize):
+            chunk = chunk[chunk[target].notna()]
+            rows = chunk[(chunk.index % holdout_every == 0) == holdout]
+            if len(rows):
+                yield rows.drop(columns=[target]), rows[target]
+
+    # pass 1: sample for the preprocessor, class labels, target moments
+    sample, classes, n, y_sum, y_sq = None, set(), 0, 0.0, 0.0
+    for X, y in stream(holdout=False):
+        sample = _bottom_k(sample, X.assign(**{target: y}), rng.random(len(X)), sample_rows)
+        if problem == "classification":
+            classes.update(pd.unique(y))
+        else:
+            yf = y.to_numpy(dtype=float)
+            n, y_sum, y_sq = n + len(yf), y_sum + yf.sum(), y_sq + (yf ** 2).sum()
+        info["chunks"] += 1
+    info["passes"] += 1
+    if sample is None:
+        raise ValueError(f"no training rows with a target value in {csv_path}")
+    sample = sample.drop(columns=["_key"])
+    pre = clone(preprocessor).fit(sample.drop(columns=[target]), sample[target])
+    if not sp.issparse(pre.transform(sample.head(1).drop(columns=[target]))):
+        # SGD/MLP need centred inputs; the shared transformer only scales (with_mean=False for sparse data)
+        center = StandardScaler().fit(pre.transform(sample.drop(columns=[target])))
+        pre = Pipeline([("columns", pre), ("center", center)])
+    info["preprocess_sample_rows"] = int(len(sample))
+    del sample
+
+    if problem == "classification":
+        classes = np.array(sorted(classes, key=str), dtype=object if any(isinstance(c, str) for c in classes) else None)
+        learners = {name: clone(est) for name, est in chosen}
+    else:
+        mean = y_sum / n
+        scale = float(np.sqrt(max(y_sq / n - mean ** 2, 0.0))) or 1.0
+        learners = {name: ScaledTargetRegressor(clone(est), mean, scale) for name, est in chosen}
+    timing = {name: {"fit_sec": 0.0, "predict_sec": 0.0} for name in learners}
+    fitted = set()  # learners that saw at least one chunk before the deadline
+
+    # passes 2..: partial_fit chunk by chunk (rows shuffled within a chunk)
+    for _ in range(epochs):
+        for X, y in stream(holdout=False):
+            if deadline is not None and time.monotonic() > deadline:
+                info["stopped_early"] = True
+                break
+            perm = rng.permutation(len(X))
+            Xt, yt = pre.transform(X.iloc[perm]), y.iloc[perm].to_numpy()
+            for name, est in learners.items():
+                t = time.perf_counter()
+                if problem == "classification":
+                    est.partial_fit(_as_input(est, Xt), yt, classes=classes)
+                else:
+                    est.partial_fit(_as_input(est, Xt), yt)
+                timing[name]["fit_sec"] += time.perf_counter() - t
+                fitted.add(name)
+            info["rows_train"] += len(X)
+        info["passes"] += 1
+        if info["stopped_early"]:
+            break
+
+    info["not_fitted"] = [name for name in learners if name not in fitted]
+    if not fitted:
+        raise RuntimeError("the time budget ran out before any streaming candidate was trained on a chunk")
+    learners = {name: est for name, est in learners.items() if name in fitted}
+    timing = {name: t for name, t in timing.items() if name in fitted}
+
+    # final pass: score the holdout stream with running statistics
+    acc = {name: {"confusion": None, "sse": 0.0, "n": 0} for name in learners}
+    for X, y in stream(holdout=True):
+        Xt, yt = pre.transform(X), y.to_numpy()
+        for name, est in learners.items():
+            t = time.perf_counter()
+            y_pred = est.predict(_as_input(est, Xt))
+            timing[name]["predict_sec"] += time.perf_counter() - t
+            a = acc[name]
+            if problem == "classification":
+                C = pd.crosstab(pd.Series(yt, name="true"), pd.Series(y_pred, name="pred"))
+                a["confusion"] = C if a["confusion"] is None else a["confusion"].add(C, fill_value=0)
+            else:
+                a["sse"] += float(((yt.astype(float) - y_pred) ** 2).sum())
+                a["n"] += len(yt)
+        info["rows_holdout"] += len(X)
+    info["passes"] += 1
+
+    results = {name: _scores(problem, acc[name]) for name in learners}
+    best = None
+    for name in learners:  # candidate order, so ties resolve as in the baseline loop
+        if best is None or _is_better(problem, results[name], results[best]):
+            best = name
+    for name, t in timing.items():
+        t["predict_rows_per_sec"] = round(info["rows_holdout"] / t["predict_sec"], 1) if t["predict_sec"] else None
+        t["fit_sec"], t["predict_sec"] = round(t["fit_sec"], 4), round(t["predict_sec"], 4)
+    info["seconds"] = round(time.perf_counter() - t0, 3)
+    info["candidates"] = results
+    metrics = dict(results[best])
+    metrics["streaming"] = info
+    metrics["candidate_timing"] = timing
+    return Pipeline([("pre", pre), ("est", learners[best])]), metrics, best